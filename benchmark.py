@@ -0,0 +1,277 @@
+""" Benchmarks for the scoring, formatting, parsing and writing hot paths, with baseline regression checks.
+
+Board code runs on CPython against the stubs in microcontroller_code/hw_stubs.py (no hardware delays).
+
+    python benchmark.py --save bench_baseline.json        # record a baseline on this machine
+    python benchmark.py --compare bench_baseline.json     # exit 1 if any benchmark is >25% slower
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "microcontroller_code"))
+
+import hw_stubs  # noqa: E402  (must be installed before importing board modules)
+hw_stubs.install(latency_scale=0.0)
+
+import aqs_settings  # noqa: E402
+import utils  # noqa: E402
+from sample import Sample  # noqa: E402
+from sd_logger import SDLogger  # noqa: E402
+from sinks import build_sinks  # noqa: E402
+
+import ingest_metrics  # noqa: E402
+from ingest_journal import Journal  # noqa: E402
+from log_rotation import RotatingLogWriter  # noqa: E402
+import log_parser  # noqa: E402
+import mqtt_publisher  # noqa: E402
+import serial_logger  # noqa: E402
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microcontroller_code", "aqs_settings.toml")
+
+# Representative readings: (co2, temp_c, rh, voc_index, nox_index, pm)
+READINGS = [
+    (612, 22.37, 44.81, 100, 1, {"pm25 standard": 3, "pm25 env": 3}),
+    (1315, 22.04, 51.79, 180, 20, {"pm25 standard": 14, "pm25 env": 14}),
+    (2500, 29.5, 72.0, 420, 250, {"pm25 standard": 160, "pm25 env": 160}),
+    (None, None, None, None, None, None),
+]
+AQS_LINE = "$AQS,2026-02-19 16:21:49,22.04,51.79,11.62,1315,28791,100,15100,1,4,3,0"
+
+
+class FakeSerial:
+    """ Replays canned lines to serial_logger.log_serial, then stops it like Ctrl+C. """
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+
+    def readline(self):
+        try:
+            return next(self._lines)
+        except StopIteration:
+            raise KeyboardInterrupt
+
+
+def bench_air_score(n):
+    calculate_air_score = utils.calculate_air_score
+    for i in range(n):
+        co2, t, rh, voc, nox, pm = READINGS[i & 3]
+        calculate_air_score(co2, t, rh, voc, nox, pm)
+
+
+def bench_format_value(n):
+    format_value = utils.format_value
+    values = (22.3712, 612, None, 44.8)
+    for i in range(n):
+        format_value(values[i & 3], 2)
+
+
+def bench_dew_point(n):
+    dew_point = utils.calculate_dew_point
+    for i in range(n):
+        _, t, rh, _, _, _ = READINGS[i & 1]
+        dew_point(t, rh)
+
+
+def _sd_logger(tmp, csv):
+    return SDLogger(None, None, should_print=True, print_in_csv_format=csv, mount_path=tmp)
+
+
+def _sample():
+    sample = Sample()
+    sample.ready = True
+    sample.temp, sample.humidity, sample.dew_point, sample.co2 = 22.37, 44.81, 9.7, 612
+    sample.voc_raw, sample.voc_index, sample.nox_raw, sample.nox_index = 29500, 100, 15100, 1
+    sample.set_pm({"pm10 env": 1, "pm25 env": 3, "pm100 env": 4})
+    return sample
+
+
+def _bench_print(csv):
+    def bench(n):
+        sample = _sample()
+        with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull):
+            logger = _sd_logger(tmp, csv)
+            for _ in range(n):
+                sample.seq += 1  # new reading each time, so every print formats
+                logger.print_sensor_data(sample)
+    return bench
+
+
+def bench_log_data(n):
+    sample = _sample()
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = _sd_logger(tmp, True)
+        logger.start_new_log()
+        for _ in range(n):
+            sample.seq += 1
+            logger.log_data(sample)
+
+
+def bench_sink_pipeline(n):
+    """Score, console and SD sinks all due on every sample, sharing one format per sample."""
+    sample = _sample()
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        logger = SDLogger(None, _NullLED(), should_print=True, print_in_csv_format=True, mount_path=tmp)
+        logger.start_new_log()
+        pipeline = build_sinks({"sinks.enabled": "score,console,sd"}, logger)
+        for _ in range(n):
+            sample.seq += 1
+            pipeline.write_all(sample)
+
+
+class _NullLED:
+    def set_color(self, color):
+        pass
+
+    def blink_once(self, color="red", duration=0.25):
+        pass
+
+
+def bench_parse_settings(n):
+    for _ in range(n):
+        aqs_settings.parse_settings(SETTINGS_PATH)
+
+
+def bench_parse_aqs(n):
+    parse_aqs = log_parser.parse_aqs
+    for _ in range(n):
+        parse_aqs(AQS_LINE)
+
+
+def bench_mqtt_encode(n):
+    """ Per reading, encoding 60-reading MQTT batches. """
+    ts, values = log_parser.parse_aqs(AQS_LINE)
+    batch = [(ts + 5 * i, values) for i in range(60)]
+    encode_batch = mqtt_publisher.encode_batch
+    for _ in range(n // 60):
+        encode_batch(batch)
+
+
+def _bench_serial_logger(with_metrics):
+    def bench(n):
+        lines = [AQS_LINE.encode() + b"\r\n"] * n
+        metrics = ingest_metrics.MetricsRegistry().port("bench") if with_metrics else None
+        with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull):
+            with open(os.path.join(tmp, "log.txt"), "a", encoding="utf-8") as log_file:
+                serial_logger.log_serial(FakeSerial(lines), log_file, metrics)
+    return bench
+
+
+def _bench_serial_logger_journal(sync, batch_lines):
+    def bench(n):
+        lines = [AQS_LINE.encode() + b"\r\n"] * n
+        with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull):
+            with RotatingLogWriter(tmp, "log.txt", compress=False) as log_file, \
+                    Journal(os.path.join(tmp, "serial.journal"), sync=sync) as journal:
+                serial_logger.log_serial(FakeSerial(lines), log_file, journal=journal, batch_lines=batch_lines,
+                                         batch_interval=1.0)
+    return bench
+
+
+# name -> (function(n), operations per run)
+BENCHMARKS = {
+    "utils.calculate_air_score": (bench_air_score, 20_000),
+    "utils.format_value": (bench_format_value, 50_000),
+    "utils.calculate_dew_point": (bench_dew_point, 50_000),
+    "SDLogger.print_sensor_data[csv]": (_bench_print(True), 5_000),
+    "SDLogger.print_sensor_data[text]": (_bench_print(False), 5_000),
+    "SDLogger.log_data": (bench_log_data, 2_000),
+    "sinks.SinkPipeline[score,console,sd]": (bench_sink_pipeline, 2_000),
+    "aqs_settings.parse_settings": (bench_parse_settings, 1_000),
+    "log_parser.parse_aqs": (bench_parse_aqs, 20_000),
+    "mqtt_publisher.encode_batch[per reading]": (bench_mqtt_encode, 60_000),
+    "serial_logger.log_serial": (_bench_serial_logger(False), 5_000),
+    "serial_logger.log_serial[metrics]": (_bench_serial_logger(True), 5_000),
+    "serial_logger.log_serial[journal=none,batch=100]": (_bench_serial_logger_journal("none", 100), 5_000),
+    "serial_logger.log_serial[journal=record,batch=100]": (_bench_serial_logger_journal("record", 100), 1_000),
+}
+
+
+# Extra rounds run for a benchmark over the --compare threshold before it counts as a regression
+CONFIRM_ROUNDS = 3
+
+
+def run(selected, repeat):
+    """ Best-of-`repeat` time per operation for each benchmark, in nanoseconds. """
+    results = {}
+    for name in selected:
+        fn, ops = BENCHMARKS[name]
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(ops)
+            best = min(best, time.perf_counter() - start)
+        results[name] = {"ns_per_op": best / ops * 1e9, "ops": ops}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run hot-path benchmarks.")
+    parser.add_argument("--save", help="write results to this JSON baseline")
+    parser.add_argument("--compare", help="compare against this JSON baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown vs baseline as a fraction (default 0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=9, help="runs per benchmark; the fastest is kept")
+    parser.add_argument("--only", nargs="*", default=None, help="benchmark names to run")
+    args = parser.parse_args()
+
+    selected = args.only or list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    results = run(selected, args.repeat)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    regressions = []
+    width = max(36, max(len(name) for name in results) + 2)
+    print(f"{'Benchmark':<{width}}{'ns/op':>12}{'baseline':>12}{'change':>10}")
+    for name in results:
+        # A slow round is usually another process taking the CPU: only flag a benchmark that stays
+        # over the threshold for CONFIRM_ROUNDS more rounds, keeping the fastest result
+        for _ in range(CONFIRM_ROUNDS):
+            if name not in baseline or results[name]["ns_per_op"] <= baseline[name]["ns_per_op"] * (1.0 + args.threshold):
+                break
+            results[name] = min(results[name], run([name], args.repeat)[name], key=lambda r: r["ns_per_op"])
+        ns = results[name]["ns_per_op"]
+        line = f"{name:<{width}}{ns:>12.0f}"
+        if name in baseline:
+            base = baseline[name]["ns_per_op"]
+            change = ns / base - 1.0
+            line += f"{base:>12.0f}{change:>+10.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "platform": platform.platform(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
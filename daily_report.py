@@ -0,0 +1,464 @@
+""" Per-device, per-day air quality report over a log archive, in parallel across cores.
+
+Each file (or byte range of a large uncompressed file) is streamed once by a worker process, which
+returns small per-day partials: minutes above each CO2 threshold, PM2.5 exceedance minutes and an
+air score histogram in the board's 0.01 resolution. Partials merge by addition, so splitting the
+archive any way gives exactly the same report, percentiles included.
+
+    python daily_report.py logs/room*/*.txt* --device-from parent --out report.csv
+    python daily_report.py sd/*.csv --co2-thresholds 1000,1400 --format json --out report.json
+    python daily_report.py logs/*.txt* --start 2026-03-01 --end 2026-03-07   # rotated segments outside are skipped
+    python daily_report.py --benchmark --benchmark-mb 500
+
+Readings are serial_logger lines ($AQS or text), raw $AQS captures or SD card CSV logs. Time above
+a threshold counts the interval from each reading to the next one (up to --max-gap seconds, split
+at midnight) when that reading was above the threshold. Days are the logs' own wall-clock dates.
+"""
+
+import argparse
+import csv
+import functools
+import gzip
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "microcontroller_code"))
+
+from utils import calculate_air_score  # noqa: E402
+
+from fleet_align import group_files  # noqa: E402
+from log_parser import format_timestamp, parse_record, parse_sd_row, parse_timestamp, sd_header_unit  # noqa: E402
+from log_rotation import select_segments  # noqa: E402
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Uncompressed files larger than this are split into byte ranges of this size, one task each
+DEFAULT_SPLIT_BYTES = 64 * 1024 * 1024
+
+
+class DayStats:
+    """ Mergeable summary of one device-day. The score histogram maps round(score * 100) to a count,
+    which is exact because the board reports scores to 0.01. """
+
+    __slots__ = ("samples", "covered", "co2_max", "co2_above", "pm25_max", "pm25_above",
+                 "score_sum", "scores")
+
+    def __init__(self, co2_count, pm25_count):
+        self.samples = 0
+        self.covered = 0.0  # seconds between readings credited to this day
+        self.co2_max = None
+        self.co2_above = [0.0] * co2_count  # seconds above each CO2 threshold
+        self.pm25_max = None
+        self.pm25_above = [0.0] * pm25_count  # seconds above each PM2.5 threshold
+        self.score_sum = 0.0
+        self.scores = {}
+
+    def merge(self, other):
+        self.samples += other.samples
+        self.covered += other.covered
+        self.co2_max = _max(self.co2_max, other.co2_max)
+        self.pm25_max = _max(self.pm25_max, other.pm25_max)
+        self.co2_above = [a + b for a, b in zip(self.co2_above, other.co2_above)]
+        self.pm25_above = [a + b for a, b in zip(self.pm25_above, other.pm25_above)]
+        self.score_sum += other.score_sum
+        scores = self.scores
+        for k, n in other.scores.items():
+            scores[k] = scores.get(k, 0) + n
+
+    def percentile(self, p):
+        """ Nearest-rank percentile of the day's air scores, or None without scores. """
+        if not self.scores:
+            return None
+        rank = max(1, -(-self.samples * p // 100))
+        seen = 0
+        for k in sorted(self.scores):
+            seen += self.scores[k]
+            if seen >= rank:
+                return k / 100
+        return None
+
+
+def _max(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a if a >= b else b
+
+
+class Partial:
+    """ Result of scanning one file or byte range: per-day stats for one device, plus its first and
+    last readings so that the time between consecutive partials can be credited when they are merged. """
+
+    __slots__ = ("device", "days", "first", "last", "lines", "out_of_order")
+
+    def __init__(self, device):
+        self.device = device
+        self.days = {}
+        self.first = None  # (timestamp, co2, pm25)
+        self.last = None
+        self.lines = 0
+        self.out_of_order = 0
+
+
+class Credit:
+    """ Adds the time between readings to a {day: DayStats} dict, split at midnight. """
+
+    def __init__(self, co2_thresholds, pm25_thresholds, max_gap):
+        self.co2_thresholds = co2_thresholds
+        self.pm25_thresholds = pm25_thresholds
+        self.max_gap = max_gap
+
+    def day(self, days, day):
+        stats = days.get(day)
+        if stats is None:
+            stats = days[day] = DayStats(len(self.co2_thresholds), len(self.pm25_thresholds))
+        return stats
+
+    def interval(self, days, t0, t1, co2, pm25):
+        """ Credit [t0, t1) to the reading (co2, pm25) taken at t0. Gaps longer than max_gap are not counted. """
+        if not 0 < t1 - t0 <= self.max_gap:
+            return
+        while t0 < t1:
+            day = int(t0 // 86400)
+            end = min(t1, (day + 1) * 86400.0)
+            dt = end - t0
+            stats = self.day(days, day)
+            stats.covered += dt
+            if co2 is not None:
+                above = stats.co2_above
+                for i, threshold in enumerate(self.co2_thresholds):
+                    if co2 > threshold:
+                        above[i] += dt
+            if pm25 is not None:
+                above = stats.pm25_above
+                for i, threshold in enumerate(self.pm25_thresholds):
+                    if pm25 > threshold:
+                        above[i] += dt
+            t0 = end
+
+
+@functools.lru_cache(maxsize=256)
+def _minute_start(minute):
+    """ Epoch seconds of a 'YYYY-MM-DD HH:MM' prefix, or None. """
+    return parse_timestamp(minute + ":00")
+
+
+def _parse_timestamp(text):
+    """ parse_timestamp with the minute cached: consecutive lines (and the host and device stamps
+    of one line) nearly always share it. """
+    if len(text) < 19:
+        return None
+    start = _minute_start(text[:16])
+    if start is None:
+        return None
+    try:
+        return start + int(text[17:19])
+    except ValueError:
+        return None
+
+
+def _lines(path, start, end):
+    """ Decoded lines whose first byte lies in [start, end) (end None: to the end of the file). """
+    with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as f:
+        pos = start
+        if start > 0:
+            # The line straddling start belongs to the previous range
+            f.seek(start - 1)
+            pos += len(f.readline()) - 1
+        for raw in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(raw)
+            yield raw.decode("utf-8", "replace")
+
+
+def scan(task):
+    """ Worker: stream one (device, path, start, end, options) task into a Partial. """
+    device, path, start, end, opts = task
+    credit = Credit(opts["co2_thresholds"], opts["pm25_thresholds"], opts["max_gap"])
+    clock, aqs_unit = opts["clock"], opts["temp_unit"]
+    partial = Partial(device)
+    days = partial.days
+    sd_unit = opts["sd_units"].get(path)  # None unless the file is an SD card log
+    prev_ts = prev_co2 = prev_pm25 = None
+    for line in _lines(path, start, end):
+        partial.lines += 1
+        if sd_unit is not None:
+            record = parse_sd_row(line, sd_unit, _parse_timestamp)
+        else:
+            record = parse_record(line, clock, _parse_timestamp)
+            if record is not None and aqs_unit == "F" and "$AQS," in line and record[1].get("temp") is not None:
+                record[1]["temp"] = (record[1]["temp"] - 32.0) * 5.0 / 9.0
+        if record is None:
+            continue
+        ts, values = record
+        if prev_ts is not None and ts < prev_ts:
+            partial.out_of_order += 1
+            continue
+        co2 = values.get("co2")
+        pm25 = values.get("pm25")
+        score = values.get("score")
+        if score is None:
+            score = calculate_air_score(co2, values.get("temp"), values.get("humidity"),
+                                        values.get("voc_index"), values.get("nox_index"),
+                                        None if pm25 is None else {"pm25 env": pm25})
+
+        stats = credit.day(days, int(ts // 86400))
+        stats.samples += 1
+        if co2 is not None and (stats.co2_max is None or co2 > stats.co2_max):
+            stats.co2_max = co2
+        if pm25 is not None and (stats.pm25_max is None or pm25 > stats.pm25_max):
+            stats.pm25_max = pm25
+        stats.score_sum += score
+        key = round(score * 100)
+        stats.scores[key] = stats.scores.get(key, 0) + 1
+
+        if prev_ts is None:
+            partial.first = (ts, co2, pm25)
+        else:
+            credit.interval(days, prev_ts, ts, prev_co2, prev_pm25)
+        prev_ts, prev_co2, prev_pm25 = ts, co2, pm25
+    if prev_ts is not None:
+        partial.last = (prev_ts, prev_co2, prev_pm25)
+    return partial
+
+
+def _sd_unit(path):
+    """ Temperature unit from an SD log's header row, or None if the file is not an SD log.
+    Byte ranges after the first don't see the header, so it is read up front. """
+    with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as f:
+        return sd_header_unit(f.readline(256).decode("utf-8", "replace"))
+
+
+def plan_tasks(devices, opts, split_bytes):
+    """ One task per file, with uncompressed files over split_bytes cut into byte ranges. """
+    tasks = []
+    for device, paths in devices.items():
+        for path in paths:
+            size = os.path.getsize(path)
+            if path.endswith(".gz") or size <= split_bytes:
+                tasks.append((device, path, 0, None, opts))
+                continue
+            for start in range(0, size, split_bytes):
+                end = start + split_bytes
+                tasks.append((device, path, start, end if end < size else None, opts))
+    # Biggest first, so one large file doesn't start last and run alone
+    tasks.sort(key=lambda t: -((t[3] or os.path.getsize(t[1])) - t[2]))
+    return tasks
+
+
+def merge(partials, credit):
+    """ Combine partials into {device: {day: DayStats}}, crediting the time between one partial's last
+    reading and the next one's first (in time order per device). Returns (report, lines, out_of_order). """
+    report = {}
+    lines = out_of_order = 0
+    by_device = {}
+    for partial in partials:
+        lines += partial.lines
+        out_of_order += partial.out_of_order
+        if partial.first is not None:
+            by_device.setdefault(partial.device, []).append(partial)
+    for device, parts in by_device.items():
+        days = report.setdefault(device, {})
+        parts.sort(key=lambda p: p.first[0])
+        last = None
+        for part in parts:
+            for day, stats in part.days.items():
+                if day in days:
+                    days[day].merge(stats)
+                else:
+                    days[day] = stats
+            if last is not None:
+                credit.interval(days, last[0], part.first[0], last[1], last[2])
+            if last is None or part.last[0] >= last[0]:
+                last = part.last
+    return report, lines, out_of_order
+
+
+def build_report(devices, co2_thresholds, pm25_thresholds, max_gap=60.0, clock="host", temp_unit="C",
+                 workers=None, split_bytes=DEFAULT_SPLIT_BYTES):
+    """ Scan {device: [paths]} with a pool of `workers` processes (1: in this process).
+    Returns ({device: {day number: DayStats}}, lines read, out-of-order readings skipped). """
+    opts = {"co2_thresholds": tuple(co2_thresholds), "pm25_thresholds": tuple(pm25_thresholds),
+            "max_gap": max_gap, "clock": clock, "temp_unit": temp_unit,
+            "sd_units": {path: unit for paths in devices.values() for path in paths
+                         if (unit := _sd_unit(path)) is not None}}
+    tasks = plan_tasks(devices, opts, split_bytes)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        partials = [scan(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            partials = list(pool.imap_unordered(scan, tasks))
+    return merge(partials, Credit(opts["co2_thresholds"], opts["pm25_thresholds"], max_gap))
+
+
+def report_rows(report, co2_thresholds, pm25_thresholds):
+    """ Flatten a report into dicts, one per device-day, sorted by device then date. """
+    rows = []
+    for device in sorted(report):
+        for day in sorted(report[device]):
+            stats = report[device][day]
+            row = {
+                "device": device,
+                "date": format_timestamp(day * 86400)[:10],
+                "samples": stats.samples,
+                "covered_min": round(stats.covered / 60, 1),
+                "co2_max": stats.co2_max,
+            }
+            for threshold, seconds in zip(co2_thresholds, stats.co2_above):
+                row[f"co2_above_{threshold:g}_min"] = round(seconds / 60, 1)
+            row["pm25_max"] = stats.pm25_max
+            for threshold, seconds in zip(pm25_thresholds, stats.pm25_above):
+                row[f"pm25_above_{threshold:g}_min"] = round(seconds / 60, 1)
+            row["score_mean"] = round(stats.score_sum / stats.samples, 2) if stats.samples else None
+            for p in PERCENTILES:
+                row[f"score_p{p}"] = stats.percentile(p)
+            row["score_max"] = max(stats.scores) / 100 if stats.scores else None
+            rows.append(row)
+    return rows
+
+
+def write_report(rows, out, fmt):
+    if fmt == "json":
+        json.dump(rows, out, indent=1)
+        out.write("\n")
+        return
+    if not rows:
+        return
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({k: "" if v is None else v for k, v in row.items()})
+
+
+def _thresholds(text):
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def write_synthetic_archive(directory, megabytes, devices=8, interval=5.0):
+    """ serial_logger-style $AQS logs for `devices` devices, totalling about `megabytes` MB. """
+    line_bytes = 95
+    lines_per_device = int(megabytes * 1e6 / line_bytes / devices)
+    paths = []
+    for d in range(devices):
+        rnd = random.Random(d).random
+        path = os.path.join(directory, f"dev{d:02d}.txt")
+        t = 1_767_225_600.0 + rnd() * interval  # 2026-01-01
+        co2, pm25, temp, rh = 600.0, 5.0, 22.0, 45.0
+        with open(path, "w", encoding="utf-8") as f:
+            block = []
+            for _ in range(lines_per_device):
+                r = rnd()
+                co2 = min(max(co2 + (r - 0.5) * 20.0, 400.0), 3000.0)
+                pm25 = min(max(pm25 + (r - 0.5) * 2.0, 0.0), 200.0)
+                stamp = format_timestamp(t)
+                block.append(f"{stamp} - $AQS,{stamp},{temp:.2f},{rh:.2f},10.20,{co2:.0f},"
+                             f"30000,100,15000,1,{pm25 * 0.7:.0f},{pm25:.0f},{pm25 * 1.2:.0f}\n")
+                if len(block) == 10000:
+                    f.writelines(block)
+                    block = []
+                t += interval + (r - 0.5) * 0.4
+            f.writelines(block)
+        paths.append(path)
+    return paths
+
+
+def benchmark(args):
+    """ Report one synthetic archive with 1 worker and with N workers, and check the reports match. """
+    workers = args.workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_synthetic_archive(directory, args.benchmark_mb)
+        size = sum(os.path.getsize(p) for p in paths)
+        devices = group_files(paths, "file")
+        co2, pm25 = _thresholds(args.co2_thresholds), _thresholds(args.pm25_thresholds)
+        # Split files so even a single device spreads over the pool
+        split = max(1 << 20, size // (workers * 4))
+        results = {}
+        for n in sorted({1, workers}):
+            began = time.perf_counter()
+            report, lines, _ = build_report(devices, co2, pm25, args.max_gap, workers=n, split_bytes=split)
+            elapsed = time.perf_counter() - began
+            results[n] = report_rows(report, co2, pm25)
+            print(f"{n:3d} worker(s): {size / 1e6:.0f} MB, {lines / 1e6:.2f}M lines in {elapsed:.2f} s "
+                  f"({size / 1e6 / elapsed:.1f} MB/s, {lines / elapsed / 1e3:.0f}k lines/s)")
+    if workers > 1:
+        same = results[1] == results[workers]
+        print(f"Split and merged report identical to single-process: {'yes' if same else 'NO'}")
+        if not same:
+            sys.exit(1)
+    if workers > (os.cpu_count() or 1):
+        print(f"Note: {workers} workers on {os.cpu_count()} CPU(s); speed-up needs that many cores.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-device, per-day air quality report from log files.")
+    parser.add_argument("inputs", nargs="*", help="log files or globs (.txt, .csv, .gz)")
+    parser.add_argument("--device-from", choices=("file", "parent"), default="file",
+                        help="name devices by file stem or by parent directory (one directory per device)")
+    parser.add_argument("--clock", choices=("host", "device"), default="host",
+                        help="which timestamp to use when a line has both")
+    parser.add_argument("--co2-thresholds", default="800,1000,1500,2000", help="ppm, comma-separated")
+    parser.add_argument("--pm25-thresholds", default="15,35", help="ug/m3, comma-separated")
+    parser.add_argument("--max-gap", type=float, default=60.0,
+                        help="longest gap between readings (s) still counted as covered time")
+    parser.add_argument("--start", default=None, help="first day to report, YYYY-MM-DD")
+    parser.add_argument("--end", default=None, help="last day to report, YYYY-MM-DD")
+    parser.add_argument("--temp-unit", choices=("C", "F"), default="C",
+                        help="unit of $AQS temperatures (the board's display.temp_unit), for the air score")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--split-mb", type=float, default=DEFAULT_SPLIT_BYTES / 2**20,
+                        help="split uncompressed files larger than this into ranges of this size")
+    parser.add_argument("--format", choices=("csv", "json"), default=None,
+                        help="output format (default: from --out extension, else csv)")
+    parser.add_argument("--out", default="-", help="output path ('-' for stdout)")
+    parser.add_argument("--benchmark", action="store_true", help="report a synthetic archive instead of files")
+    parser.add_argument("--benchmark-mb", type=float, default=200.0, help="benchmark: archive size in MB")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args)
+        return
+    if not args.inputs:
+        parser.error("no input files")
+
+    fmt = args.format or ("json" if args.out.endswith(".json") else "csv")
+    co2, pm25 = _thresholds(args.co2_thresholds), _thresholds(args.pm25_thresholds)
+    first_day = last_day = None
+    if args.start is not None and (first_day := parse_timestamp(args.start + " 00:00:00")) is None:
+        parser.error("--start must be YYYY-MM-DD")
+    if args.end is not None and (last_day := parse_timestamp(args.end + " 00:00:00")) is None:
+        parser.error("--end must be YYYY-MM-DD")
+    devices = group_files(args.inputs, args.device_from)
+    if first_day is not None or last_day is not None:
+        # Skip rotated segments outside the days without opening them, and drop the days around them
+        # that the kept files still cover
+        devices = {name: select_segments(paths, args.start and args.start + " 00:00:00",
+                                         args.end and args.end + " 23:59:59")
+                   for name, paths in devices.items()}
+    began = time.perf_counter()
+    report, lines, out_of_order = build_report(devices, co2, pm25, args.max_gap, args.clock, args.temp_unit,
+                                               args.workers, int(args.split_mb * 2**20))
+    if first_day is not None or last_day is not None:
+        low = -1 if first_day is None else int(first_day // 86400)
+        high = float("inf") if last_day is None else int(last_day // 86400)
+        report = {device: {day: stats for day, stats in days.items() if low <= day <= high}
+                  for device, days in report.items()}
+    rows = report_rows(report, co2, pm25)
+    if args.out == "-":
+        write_report(rows, sys.stdout, fmt)
+    else:
+        with open(args.out, "w", newline="", encoding="utf-8") as out:
+            write_report(rows, out, fmt)
+        print(f"Wrote {len(rows)} device-days for {len(devices)} devices to {args.out} "
+              f"({lines} lines in {time.perf_counter() - began:.1f} s, {out_of_order} out-of-order readings skipped)")
+
+
+if __name__ == "__main__":
+    main()
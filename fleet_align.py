@@ -0,0 +1,332 @@
+""" Align many devices' readings onto a common time grid for fleet analysis.
+
+Each device stream is walked once, in time order, with only the samples either side of the current
+grid point held in memory, so any number of devices and any archive length run in bounded memory.
+Rows come out in chunks of grid points.
+
+    python fleet_align.py logs/room*/*.txt --device-from parent --step 60 --method linear --out fleet.csv
+    python fleet_align.py --benchmark --devices 200 --days 30
+"""
+
+import argparse
+import csv
+import glob
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from log_parser import RECORD_FIELDS, format_timestamp, open_log, parse_record, parse_timestamp
+from log_rotation import log_stem, manifest_entries, select_segments
+
+METHODS = ("asof", "nearest", "linear")
+
+
+class DeviceCursor:
+    """ Position of one device stream relative to the grid: the last sample at or before
+    the grid time (prev) and the first one after it (next). """
+
+    __slots__ = ("name", "_samples", "prev_ts", "prev", "next_ts", "next", "out_of_order")
+
+    def __init__(self, name, samples):
+        self.name = name
+        self._samples = iter(samples)
+        self.prev_ts = None
+        self.prev = None
+        self.next_ts = None
+        self.next = None
+        self.out_of_order = 0
+        self._fetch()
+
+    def _fetch(self):
+        """ Load the next in-order sample into next/next_ts (None when exhausted). """
+        last = self.prev_ts
+        sample = next(self._samples, None)
+        while sample is not None and last is not None and sample[0] < last:
+            self.out_of_order += 1
+            sample = next(self._samples, None)
+        if sample is None:
+            self.next_ts = self.next = None
+        else:
+            self.next_ts, self.next = sample
+
+    def seek(self, t):
+        """ Advance so that prev_ts <= t < next_ts. """
+        next_ts = self.next_ts
+        if next_ts is None or next_ts > t:
+            return
+        samples = self._samples
+        prev_ts, prev = next_ts, self.next
+        for next_ts, values in samples:
+            if next_ts < prev_ts:
+                self.out_of_order += 1
+                continue
+            if next_ts > t:
+                self.prev_ts, self.prev = prev_ts, prev
+                self.next_ts, self.next = next_ts, values
+                return
+            prev_ts, prev = next_ts, values
+        self.prev_ts, self.prev = prev_ts, prev
+        self.next_ts = self.next = None
+
+    def value_at(self, t, method, tolerance):
+        """ Resampled values at grid time t, or None if no sample is close enough. """
+        prev_ts = self.prev_ts
+        prev_ok = prev_ts is not None and t - prev_ts <= tolerance
+        if method == "asof":
+            return self.prev if prev_ok else None
+
+        next_ts = self.next_ts
+        next_ok = next_ts is not None and next_ts - t <= tolerance
+        if method == "nearest":
+            if prev_ok and (not next_ok or t - prev_ts <= next_ts - t):
+                return self.prev
+            return self.next if next_ok else None
+
+        # linear
+        if prev_ts == t:
+            return self.prev
+        if not (prev_ok and next_ok):
+            return None
+        w = (t - prev_ts) / (next_ts - prev_ts)
+        return tuple(a if b is None or a is None else a + (b - a) * w
+                     for a, b in zip(self.prev, self.next))
+
+
+# Default chunk size in cells (grid points x devices); bounds the rows held in memory at once
+CHUNK_CELLS = 32768
+
+
+def align(streams, step, method="asof", tolerance=None, start=None, end=None, chunk=None):
+    """ Resample {device: iterable of (timestamp, values tuple)} onto a grid every `step` seconds.
+
+    Yields chunks (lists of up to `chunk` rows, by default CHUNK_CELLS / devices); each row is (t, [values tuple or None per device])
+    in the order of `streams`. tolerance (default 2 * step) is how far a sample may be from a grid
+    point and still be used. The grid starts at the earliest first sample (rounded down to `step`)
+    unless start is given, and ends at end or once every stream is exhausted.
+    Returns the cursors (for out-of-order counts) as the generator's return value.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    if tolerance is None:
+        tolerance = 2 * step
+    cursors = [DeviceCursor(name, samples) for name, samples in streams.items()]
+    if chunk is None:
+        chunk = max(1, CHUNK_CELLS // max(1, len(cursors)))
+    if start is None:
+        firsts = [c.next_ts for c in cursors if c.next_ts is not None]
+        if not firsts:
+            return cursors
+        start = min(firsts) // step * step
+
+    t = start
+    rows = []
+    while end is None or t <= end:
+        if end is None and all(c.next_ts is None and (c.prev_ts is None or t - c.prev_ts > tolerance)
+                               for c in cursors):
+            break
+        values = []
+        for cursor in cursors:
+            cursor.seek(t)
+            values.append(cursor.value_at(t, method, tolerance))
+        rows.append((t, values))
+        if len(rows) >= chunk:
+            yield rows
+            rows = []
+        t += step
+    if rows:
+        yield rows
+    return cursors
+
+
+def file_samples(paths, fields, clock="host"):
+    """ Stream (timestamp, values tuple) from a device's log files, files ordered by first timestamp
+    (from the rotation manifest when it lists the file, else by reading up to its first reading). """
+    entries = manifest_entries(paths)
+
+    def first_timestamp(path):
+        entry = entries.get(path)
+        if entry is not None and entry["first"] is not None:
+            return parse_timestamp(entry["first"])
+        return _first_timestamp(path)
+
+    for path in sorted(paths, key=first_timestamp):
+        with open_log(path) as f:
+            for line in f:
+                record = parse_record(line, clock)
+                if record is not None:
+                    ts, values = record
+                    yield ts, tuple(values.get(name) for name in fields)
+
+
+def _first_timestamp(path):
+    with open_log(path) as f:
+        for line in f:
+            record = parse_record(line)
+            if record is not None:
+                return record[0]
+    return float("inf")
+
+
+def group_files(patterns, device_from):
+    """ Map device name -> list of files, by file stem (rotated segments 'stem(N)' join 'stem')
+    or by parent directory name. """
+    devices = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if device_from == "parent":
+                name = os.path.basename(os.path.dirname(os.path.abspath(path)))
+            else:
+                name = log_stem(path)
+            devices.setdefault(name, []).append(path)
+    return devices
+
+
+def write_csv(chunks, devices, fields, out, wide):
+    """ Write aligned rows as CSV: long (one row per device per grid point) or wide (one row per grid point). """
+    writer = csv.writer(out)
+    if wide:
+        writer.writerow(["timestamp"] + [f"{d}.{f}" for d in devices for f in fields])
+    else:
+        writer.writerow(["timestamp", "device"] + list(fields))
+    empty = [""] * len(fields)
+    rows = 0
+    for chunk in chunks:
+        for t, values in chunk:
+            stamp = format_timestamp(t)
+            if wide:
+                line = [stamp]
+                for v in values:
+                    line.extend(empty if v is None else ["" if x is None else x for x in v])
+                writer.writerow(line)
+            else:
+                for device, v in zip(devices, values):
+                    if v is not None:
+                        writer.writerow([stamp, device] + ["" if x is None else x for x in v])
+            rows += 1
+    return rows
+
+
+def synthetic_samples(seed, start, days, interval):
+    """ (temp, humidity, co2) from a device sampling every ~interval s with jitter and occasional
+    gaps, like a real board. Random walks are cheap on purpose so the join dominates the timing. """
+    rnd = random.Random(seed).random
+    t = start + rnd() * interval
+    end = start + days * 86400
+    co2, temp, rh = 600.0, 22.0, 45.0
+    while t < end:
+        r = rnd()
+        co2 = min(max(co2 + (r - 0.5) * 10.0, 400.0), 3000.0)
+        temp += (r - 0.5) * 0.02
+        rh += (0.5 - r) * 0.1
+        yield t, (temp, rh, co2)
+        t += interval + (r - 0.5) * 0.4
+        if r < 0.0002:
+            t += 600.0 + r * 1e7  # board unplugged / rebooted for 10-40 minutes
+
+
+def _peak_rss_mb():
+    """ Peak resident set size of this process in MB (POSIX; 0 where unavailable). """
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def benchmark(args):
+    """ Join synthetic devices and check peak memory growth against the budget. """
+    start = 1_767_225_600.0  # 2026-01-01
+    streams = {f"dev{i:03d}": synthetic_samples(i, start, args.days, args.sample_interval)
+               for i in range(args.devices)}
+    if args.trace_memory:
+        tracemalloc.start()
+    rss_before = _peak_rss_mb()
+    began = time.perf_counter()
+    rows = cells = 0
+    for chunk in align(streams, args.step, args.method, start=start, end=start + args.days * 86400 - args.step,
+                       chunk=args.chunk):
+        rows += len(chunk)
+        cells += sum(1 for _, values in chunk for v in values if v is not None)
+    elapsed = time.perf_counter() - began
+    if args.trace_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        memory = "peak traced memory"
+    else:
+        peak_mb = _peak_rss_mb() - rss_before
+        memory = "peak RSS growth"
+    samples = args.devices * args.days * 86400 / args.sample_interval
+    print(f"{args.devices} devices x {args.days} days, ~{samples / 1e6:.1f}M samples -> {rows} grid rows, "
+          f"{cells} filled cells ({args.method}, step {args.step:g} s)")
+    print(f"{elapsed:.1f} s, {samples / elapsed / 1e6:.2f}M samples/s, {memory} {peak_mb:.1f} MB "
+          f"(budget {args.memory_budget_mb:g} MB)")
+    if peak_mb > args.memory_budget_mb:
+        print("Memory budget exceeded.")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resample many devices' logs onto a common time grid.")
+    parser.add_argument("inputs", nargs="*", help="log files or globs")
+    parser.add_argument("--device-from", choices=("file", "parent"), default="file",
+                        help="name devices by file stem or by parent directory (one directory per device)")
+    parser.add_argument("--clock", choices=("host", "device"), default="host",
+                        help="which timestamp to align on when a line has both")
+    parser.add_argument("--fields", default="temp,humidity,co2,voc_index,nox_index,pm25",
+                        help=f"comma-separated fields from: {','.join(RECORD_FIELDS)}")
+    parser.add_argument("--step", type=float, default=60.0, help="grid spacing in seconds")
+    parser.add_argument("--method", choices=METHODS, default="asof")
+    parser.add_argument("--tolerance", type=float, default=None, help="max sample distance from a grid point (s)")
+    parser.add_argument("--start", default=None, help="first grid time, 'YYYY-MM-DD HH:MM:SS' (default: first sample)")
+    parser.add_argument("--end", default=None, help="last grid time, 'YYYY-MM-DD HH:MM:SS' (default: last sample)")
+    parser.add_argument("--chunk", type=int, default=None,
+                        help=f"grid points per output chunk (default {CHUNK_CELLS} cells / devices)")
+    parser.add_argument("--wide", action="store_true", help="one column per device and field")
+    parser.add_argument("--out", default="-", help="output CSV path ('-' for stdout)")
+    parser.add_argument("--benchmark", action="store_true", help="join synthetic devices instead of files")
+    parser.add_argument("--devices", type=int, default=200, help="benchmark: number of devices")
+    parser.add_argument("--days", type=float, default=30.0, help="benchmark: days per device")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="benchmark: seconds between samples")
+    parser.add_argument("--memory-budget-mb", type=float, default=32.0, help="benchmark: peak memory budget")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="benchmark: measure with tracemalloc (exact Python allocations, much slower)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args)
+        return
+    if not args.inputs:
+        parser.error("no input files")
+
+    fields = [f.strip() for f in args.fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in RECORD_FIELDS]
+    if unknown:
+        parser.error(f"unknown fields: {', '.join(unknown)}")
+    start = end = None
+    if args.start is not None and (start := parse_timestamp(args.start)) is None:
+        parser.error("--start must be 'YYYY-MM-DD HH:MM:SS'")
+    if args.end is not None and (end := parse_timestamp(args.end)) is None:
+        parser.error("--end must be 'YYYY-MM-DD HH:MM:SS'")
+    devices = group_files(args.inputs, args.device_from)
+    if start is not None or end is not None:
+        # Skip rotated segments outside the range (widened by the tolerance) without opening them
+        margin = args.tolerance if args.tolerance is not None else 2 * args.step
+        low = None if start is None else format_timestamp(start - margin)
+        high = None if end is None else format_timestamp(end + margin)
+        devices = {name: select_segments(paths, low, high) for name, paths in devices.items()}
+    streams = {name: file_samples(paths, fields, args.clock) for name, paths in devices.items()}
+    chunks = align(streams, args.step, args.method, args.tolerance, start, end, chunk=args.chunk)
+
+    if args.out == "-":
+        rows = write_csv(chunks, list(devices), fields, sys.stdout, args.wide)
+    else:
+        with open(args.out, "w", newline="", encoding="utf-8") as out:
+            rows = write_csv(chunks, list(devices), fields, out, args.wide)
+        print(f"Wrote {rows} grid rows for {len(devices)} devices to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
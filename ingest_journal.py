@@ -0,0 +1,363 @@
+""" Crash-safe write-ahead journal for the host ingestion path.
+
+serial_logger appends every received line to a memory-mapped journal before it goes to the log file,
+so the log file can be flushed in large batches without losing lines when the process is killed
+or the host loses power. After each batch is flushed, a checkpoint records how far the journal
+has been applied and where the log file ended; on restart the records after the checkpoint are
+replayed into the log file and a torn or corrupt tail is dropped.
+
+Layout: two checkpoint slots (written alternately, the valid one with the higher sequence wins),
+then records from HEADER_SIZE on:
+
+    u32 payload length | u32 crc32(generation + payload) | payload
+
+Everything past the last record is zero. The journal is rewound to the start (and the used part
+zeroed) once it is half full at a checkpoint; the generation changes then, so records left over
+from an earlier pass can never pass their checksum.
+
+    python ingest_journal.py --crash-test 50      # kill -9 serial_logger.log_serial repeatedly, check nothing is lost
+    python ingest_journal.py --benchmark          # journal overhead per record
+"""
+
+import argparse
+import mmap
+import os
+import random
+import re
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+HEADER_SIZE = 4096
+SLOT_SIZE = 2048
+DEFAULT_CAPACITY = 16 << 20
+SYNC_MODES = ("record", "none")
+
+_MAGIC = b"AQSJ"
+_SLOT = struct.Struct("<4sQIQQH")  # magic, sequence, generation, committed offset, storage size, path length
+_CRC = struct.Struct("<I")
+_RECORD = struct.Struct("<II")     # payload length, crc32
+_PAGE = mmap.ALLOCATIONGRANULARITY  # mmap.flush offsets must be aligned to this
+_ZEROS = bytes(1 << 20)
+
+
+class Journal:
+    """ Append-only, memory-mapped journal of log lines with checkpoints.
+
+    sync="record" flushes each record's pages to disk as it is appended (survives power loss);
+    sync="none" leaves that to the OS (survives the process being killed, not a power cut).
+    Opening an existing journal scans it: records after the last checkpoint are in `pending`.
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY, sync: str = "record"):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {SYNC_MODES}")
+        self.path = path
+        self.sync = sync
+        self._file = open(path, "a+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE + capacity:
+            self._file.truncate(HEADER_SIZE + capacity)
+            size = HEADER_SIZE + capacity
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self._seq = 0
+        self.generation = 0
+        self.committed = HEADER_SIZE
+        self.storage_path = None
+        self.storage_size = 0
+        self._read_checkpoint()
+        self.pending, self.tail, self.discarded = self._scan()
+        if self.discarded:
+            # Everything past the tail is kept zeroed, so a torn record is never mistaken for a new one
+            self._zero(self.tail, size)
+
+    # --- checkpoints ---
+
+    def _read_checkpoint(self):
+        best = None
+        for offset in (0, SLOT_SIZE):
+            slot = self._parse_slot(offset)
+            if slot is not None and (best is None or slot[0] > best[0]):
+                best = slot
+        if best is not None:
+            self._seq, self.generation, self.committed, self.storage_size, self.storage_path = best
+        self._seed = zlib.crc32(_CRC.pack(self.generation))
+
+    def _parse_slot(self, offset):
+        mm = self._mm
+        magic, seq, generation, committed, storage_size, path_len = _SLOT.unpack_from(mm, offset)
+        end = offset + _SLOT.size + path_len
+        if magic != _MAGIC or end + _CRC.size > offset + SLOT_SIZE:
+            return None
+        if zlib.crc32(mm[offset:end]) != _CRC.unpack_from(mm, end)[0]:
+            return None  # torn checkpoint write; the other slot is still good
+        path = mm[offset + _SLOT.size:end].decode("utf-8") or None
+        return seq, generation, committed, storage_size, path
+
+    def _write_checkpoint(self):
+        self._seq += 1
+        offset = SLOT_SIZE * (self._seq & 1)
+        path = (self.storage_path or "").encode("utf-8")
+        if _SLOT.size + len(path) + _CRC.size > SLOT_SIZE:
+            raise ValueError(f"storage path too long for the journal header: {self.storage_path}")
+        slot = _SLOT.pack(_MAGIC, self._seq, self.generation, self.committed, self.storage_size, len(path)) + path
+        self._mm[offset:offset + len(slot) + _CRC.size] = slot + _CRC.pack(zlib.crc32(slot))
+        if self.sync != "none":
+            self._mm.flush(0, HEADER_SIZE)
+
+    def checkpoint(self, storage_path: str | None, storage_size: int):
+        """ Mark every appended record as applied to storage, which now ends at storage_size bytes.
+        Call only after the storage write is flushed (and fsynced, for power-loss safety). Rewinds
+        the journal to the start once it is more than half full, since nothing in it is needed. """
+        self.committed = self.tail
+        self.storage_path = storage_path
+        self.storage_size = storage_size
+        self.pending = []
+        if self.tail - HEADER_SIZE > (len(self._mm) - HEADER_SIZE) // 2:
+            self.generation = (self.generation + 1) & 0xFFFFFFFF
+            self._seed = zlib.crc32(_CRC.pack(self.generation))
+            self._zero(HEADER_SIZE, self.tail)
+            self.tail = self.committed = HEADER_SIZE
+        self._write_checkpoint()
+
+    def _zero(self, start: int, end: int):
+        mm = self._mm
+        for offset in range(start, end, len(_ZEROS)):
+            n = min(len(_ZEROS), end - offset)
+            mm[offset:offset + n] = _ZEROS[:n]
+
+    # --- records ---
+
+    def _scan(self):
+        """ (payloads after the checkpoint, offset of the first free byte, whether a torn tail was dropped). """
+        mm = self._mm
+        size = len(mm)
+        seed = self._seed
+        pos = self.committed
+        pending = []
+        while pos + _RECORD.size <= size:
+            length, crc = _RECORD.unpack_from(mm, pos)
+            end = pos + _RECORD.size + length
+            if length == 0 or end > size:
+                break
+            payload = mm[pos + _RECORD.size:end]
+            if zlib.crc32(payload, seed) != crc:
+                break
+            pending.append(payload)
+            pos = end
+        discarded = pos + _RECORD.size <= size and mm[pos:pos + _RECORD.size] != bytes(_RECORD.size)
+        return pending, pos, discarded
+
+    def append(self, payload: bytes):
+        """ Append one record. The journal file grows if the record does not fit. """
+        tail = self.tail
+        end = tail + _RECORD.size + len(payload)
+        mm = self._mm
+        if end > len(mm):
+            self._grow(end)
+            mm = self._mm
+        mm[tail + _RECORD.size:end] = payload
+        _RECORD.pack_into(mm, tail, len(payload), zlib.crc32(payload, self._seed))
+        if self.sync == "record":
+            start = tail - tail % _PAGE
+            mm.flush(start, end - start)
+        self.tail = end
+
+    def _grow(self, needed: int):
+        size = len(self._mm)
+        while size < needed:
+            size *= 2
+        self._mm.flush()
+        self._file.truncate(size)
+        self._mm.resize(size)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def recover(journal: Journal, log_file) -> int:
+    """ Replay the journal's pending lines after a crash and checkpoint. Lines go back into the log file
+    recorded at the last checkpoint (cut back to its checkpointed size, dropping any partial batch that
+    reached it), or into log_file if that file is gone. Returns the number of lines replayed. """
+    if not journal.pending:
+        return 0
+    lines = [payload.decode("utf-8", errors="replace") for payload in journal.pending]
+    path = journal.storage_path
+    if path and os.path.exists(path):
+        with open(path, "r+b") as f:
+            f.truncate(min(journal.storage_size, os.fstat(f.fileno()).st_size))
+        with open(path, "a", encoding="utf-8", errors="replace") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            size = os.fstat(f.fileno()).st_size
+        journal.checkpoint(path, size)
+    else:
+        for line in lines:
+            log_file.write(line)
+        log_file.flush()
+        os.fsync(log_file.fileno())
+        journal.checkpoint(log_file.path, os.fstat(log_file.fileno()).st_size)
+    return len(lines)
+
+
+# --- kill -9 test and benchmark ---
+
+class _SequenceSerial:
+    """ Serial port stand-in producing numbered lines; before handing out line n it records in a
+    shared ack file that lines < n went through log_serial (and so into the journal). """
+
+    def __init__(self, first: int, ack_path: str, delay: float):
+        self._n = first
+        self._delay = delay
+        self._ack_file = open(ack_path, "r+b")
+        self._ack = mmap.mmap(self._ack_file.fileno(), 8)
+
+    def readline(self):
+        struct.pack_into("<q", self._ack, 0, self._n)
+        if self._delay:
+            time.sleep(self._delay)
+        line = f"$SEQ,{self._n}\r\n".encode()
+        self._n += 1
+        return line
+
+
+def _stored_sequence(directory: str) -> list[int]:
+    """ All $SEQ numbers in the crash test's log segments, in segment order. """
+    segments = []
+    for name in os.listdir(directory):
+        match = re.match(r"^crash(?:\((\d+)\))?\.txt$", name)
+        if match:
+            segments.append((int(match.group(1) or 0), name))
+    numbers = []
+    for _, name in sorted(segments):
+        with open(os.path.join(directory, name), "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                _, _, payload = line.partition(" - ")
+                if payload.startswith("$SEQ,"):
+                    numbers.append(int(payload[5:]))
+    return numbers
+
+
+def _crash_child(args):
+    """ Run serial_logger.log_serial on numbered lines with aggressive batching until killed. """
+    import serial_logger
+    from log_rotation import RotatingLogWriter
+
+    numbers = _stored_sequence(args.dir)
+    journal = Journal(os.path.join(args.dir, "crash.journal"), capacity=args.capacity, sync=args.sync)
+    log_file = RotatingLogWriter(args.dir, "crash.txt", compress=False)
+    sys.stdout = open(os.devnull, "w")
+    serial_logger.log_serial(_SequenceSerial(numbers[-1] + 1 if numbers else 0, os.path.join(args.dir, "ack"), args.delay),
+                             log_file, journal=journal, batch_lines=args.batch_lines,
+                             batch_interval=args.batch_interval)
+
+
+def crash_test(args):
+    """ Repeatedly start log_serial in a child, kill -9 it at a random moment, optionally scribble over
+    the journal tail (a torn write), recover, and check the log holds every acknowledged line once. """
+    from log_rotation import RotatingLogWriter
+
+    directory = tempfile.mkdtemp(prefix="aqs_journal_")
+    ack_path = os.path.join(directory, "ack")
+    with open(ack_path, "wb") as f:
+        f.write(bytes(8))
+    rng = random.Random(args.seed)
+    recovered_total = torn_total = 0
+    try:
+        for round_no in range(1, args.crash_test + 1):
+            child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--crash-child", "--dir", directory,
+                                      "--sync", args.sync, "--capacity", str(args.capacity),
+                                      "--batch-lines", str(args.batch_lines),
+                                      "--batch-interval", str(args.batch_interval), "--delay", str(args.delay)],
+                                     cwd=os.path.dirname(os.path.abspath(__file__)))
+            time.sleep(rng.uniform(0.3, 1.0))
+            os.kill(child.pid, signal.SIGKILL)
+            child.wait()
+            with open(ack_path, "rb") as f:
+                acked = struct.unpack("<q", f.read(8))[0]
+
+            journal_path = os.path.join(directory, "crash.journal")
+            if args.torn and rng.random() < 0.5:
+                with Journal(journal_path, capacity=args.capacity, sync="none") as journal:
+                    tail = journal.tail
+                with open(journal_path, "r+b") as f:
+                    f.seek(tail)
+                    f.write(bytes(rng.randrange(1, 256) for _ in range(rng.randint(8, 200))))
+            with Journal(journal_path, capacity=args.capacity, sync=args.sync) as journal, \
+                    RotatingLogWriter(directory, "crash.txt", compress=False) as log_file:
+                torn_total += journal.discarded
+                recovered = recover(journal, log_file)
+            recovered_total += recovered
+
+            numbers = _stored_sequence(directory)
+            expected = list(range(len(numbers)))
+            if numbers != expected or len(numbers) < acked:
+                print(f"round {round_no}: FAILED - {len(numbers)} lines stored, {acked} acknowledged, "
+                      f"in order and unique: {numbers == expected}")
+                sys.exit(1)
+            print(f"round {round_no}: {acked} lines acknowledged, {len(numbers)} stored, "
+                  f"{recovered} replayed from the journal{', torn tail dropped' if journal.discarded else ''}")
+        print(f"\nOK: {args.crash_test} kill -9 rounds, no lost or duplicated lines "
+              f"({recovered_total} lines replayed, {torn_total} torn tails dropped)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def benchmark(args):
+    """ Time Journal.append per record for each sync mode. """
+    payload = b"2026-02-19 16:21:50 - $AQS,2026-02-19 16:21:49,22.04,51.79,11.62,1315,28791,100,15100,1,4,3,0\n"
+    with tempfile.TemporaryDirectory() as tmp:
+        for sync in SYNC_MODES:
+            n = args.records if sync == "none" else max(args.records // 20, 1)
+            with Journal(os.path.join(tmp, f"{sync}.journal"), capacity=args.capacity, sync=sync) as journal:
+                start = time.perf_counter()
+                for _ in range(n):
+                    journal.append(payload)
+                elapsed = time.perf_counter() - start
+            print(f"sync={sync:<7} {elapsed / n * 1e6:8.2f} us/record ({n} records of {len(payload)} bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crash tests and benchmarks for the ingestion journal.")
+    parser.add_argument("--crash-test", type=int, default=0, metavar="ROUNDS", help="run this many kill -9 rounds")
+    parser.add_argument("--torn", action="store_true", help="crash test: also write garbage over the journal tail")
+    parser.add_argument("--benchmark", action="store_true", help="time journal appends")
+    parser.add_argument("--records", type=int, default=200_000, help="benchmark: records to append")
+    parser.add_argument("--sync", choices=SYNC_MODES, default="record")
+    parser.add_argument("--capacity", type=int, default=1 << 20, help="journal size in bytes (it grows if needed)")
+    parser.add_argument("--batch-lines", type=int, default=500, help="crash test: lines per log file flush")
+    parser.add_argument("--batch-interval", type=float, default=5.0, help="crash test: max seconds between flushes")
+    parser.add_argument("--delay", type=float, default=0.0, help="crash test: seconds between lines")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--crash-child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.crash_child:
+        _crash_child(args)
+    elif args.crash_test:
+        crash_test(args)
+    elif args.benchmark:
+        benchmark(args)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+""" Ingestion health metrics for the host tools: Prometheus text endpoint and periodic JSON dump.
+
+The hot path only does attribute increments and, for histograms, one bisect into fixed buckets.
+The lag is observed once per new device timestamp and flush latency once every FLUSH_SAMPLE flushes,
+so most lines read no clock. Formatting happens when the endpoint is scraped or the JSON dump runs,
+on their own threads.
+
+    metrics = MetricsRegistry()
+    port = metrics.port("/dev/ttyACM0")          # per-port counters and histograms
+    serve_metrics(metrics, 9108)                  # http://127.0.0.1:9108/metrics
+    dump_metrics_periodically(metrics, "metrics.json", 10.0)
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from log_parser import AQS_FIELDS, parse_timestamp
+
+# Bucket upper bounds (seconds)
+LAG_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0, 3600.0)
+FLUSH_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+# Flush latency is timed on one flush in this many (serial_logger flushes every line by default)
+FLUSH_SAMPLE = 8
+
+_AQS_COMMAS = len(AQS_FIELDS) + 1  # '$AQS', timestamp, then one per field
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+class Histogram:
+    """ Cumulative-bucket histogram with fixed upper bounds (plus +Inf). """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            total += n
+            yield bound, total
+
+
+class PortMetrics:
+    """ Counters and histograms for one serial port. """
+
+    def __init__(self, port: str):
+        self.port = port
+        self.bytes = Counter()
+        self.lines = Counter()
+        self.decode_errors = Counter()
+        self.parse_errors = Counter()
+        self.serial_errors = Counter()
+        self.flushes = Counter()
+        self.unflushed_lines = Counter()  # lines written but not yet flushed (current batch); set by log_serial
+        # Timed flushes only (one in FLUSH_SAMPLE); flushes counts them all
+        self.lag = Histogram(LAG_BUCKETS)
+        self.flush_latency = Histogram(FLUSH_BUCKETS)
+        self._last_stamp = None
+        self._last_ts = None
+        self._utc_offset = 0
+        self._offset_until = float("-inf")
+
+    def observe_line(self, raw_line: bytes, line: str):
+        """ Count a received line; for $AQS lines, check the field count, and record the device-to-host
+        lag when the device timestamp changes (repeats of the last stamp add no lag information). """
+        self.bytes.value += len(raw_line)
+        self.lines.value += 1
+        if "\ufffd" in line:
+            self.decode_errors.value += 1
+        start = line.find("$AQS")
+        if start < 0:
+            return
+        if start > 0 or line.count(",") != _AQS_COMMAS:
+            self.parse_errors.value += 1  # corrupted prefix or missing/extra fields
+            return
+        stamp = line[5:24]
+        if stamp == self._last_stamp:
+            if self._last_ts is None:
+                self.parse_errors.value += 1
+            return
+        self._last_stamp = stamp
+        self._last_ts = parse_timestamp(stamp)
+        if self._last_ts is None:
+            self.parse_errors.value += 1
+            return
+        received = time.time()
+        # Device RTC is naive local time; shift the host clock onto the same naive scale as parse_timestamp
+        if received >= self._offset_until:
+            self._utc_offset = time.localtime(received).tm_gmtoff
+            self._offset_until = received + 60.0
+        lag = received + self._utc_offset - self._last_ts
+        self.lag.observe(lag if lag > 0.0 else 0.0)
+
+
+class MetricsRegistry:
+    """ All ports plus gauges sampled at scrape time (e.g. unflushed lines, compression backlog). """
+
+    def __init__(self):
+        self.ports = {}
+        self.gauges = {}
+        self.started = time.time()
+
+    def port(self, name: str) -> PortMetrics:
+        if name not in self.ports:
+            self.ports[name] = PortMetrics(name)
+        return self.ports[name]
+
+    def gauge(self, name: str, read, port: str | None = None):
+        """ Register a callable sampled when metrics are exported. """
+        self.gauges[(name, port)] = read
+
+    def snapshot(self) -> dict:
+        """ Plain-data view of every metric, used by both exporters. """
+        ports = {}
+        for name, m in list(self.ports.items()):
+            ports[name] = {
+                "bytes_total": m.bytes.value,
+                "lines_total": m.lines.value,
+                "decode_errors_total": m.decode_errors.value,
+                "parse_errors_total": m.parse_errors.value,
+                "serial_errors_total": m.serial_errors.value,
+                "flushes_total": m.flushes.value,
+                "lag_seconds": _histogram_dict(m.lag),
+                "flush_seconds": _histogram_dict(m.flush_latency),
+            }
+        gauges = {}
+        for (name, port), read in list(self.gauges.items()):
+            try:
+                gauges[name if port is None else f"{name}[{port}]"] = read()
+            except Exception:
+                continue
+        return {"time": time.time(), "uptime_seconds": time.time() - self.started, "ports": ports, "gauges": gauges}
+
+    def prometheus(self) -> str:
+        """ Prometheus text exposition format (version 0.0.4). """
+        out = []
+        ports = list(self.ports.values())
+        for metric, attr, help_text in (
+            ("aqs_ingest_bytes_total", "bytes", "Bytes read from the serial port."),
+            ("aqs_ingest_lines_total", "lines", "Non-empty lines received."),
+            ("aqs_ingest_decode_errors_total", "decode_errors", "Lines containing bytes that were not valid UTF-8."),
+            ("aqs_ingest_parse_errors_total", "parse_errors", "$AQS lines that failed to parse."),
+            ("aqs_ingest_serial_errors_total", "serial_errors", "Errors raised while reading or writing a line."),
+            ("aqs_writer_flushes_total", "flushes", "Log file flushes."),
+        ):
+            out.append(f"# HELP {metric} {help_text}")
+            out.append(f"# TYPE {metric} counter")
+            for m in ports:
+                out.append(f'{metric}{{port="{_escape(m.port)}"}} {getattr(m, attr).value}')
+        for metric, attr, help_text in (
+            ("aqs_ingest_lag_seconds", "lag", "Host receive time minus device RTC timestamp, per new timestamp."),
+            ("aqs_writer_flush_seconds", "flush_latency", f"Log file flush latency, timed on 1 in {FLUSH_SAMPLE} flushes."),
+        ):
+            out.append(f"# HELP {metric} {help_text}")
+            out.append(f"# TYPE {metric} histogram")
+            for m in ports:
+                h = getattr(m, attr)
+                label = f'port="{_escape(m.port)}"'
+                for bound, total in h.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append(f'{metric}_bucket{{{label},le="{le}"}} {total}')
+                out.append(f"{metric}_sum{{{label}}} {h.sum}")
+                out.append(f"{metric}_count{{{label}}} {h.count}")
+        for (name, port), read in list(self.gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                continue
+            label = "" if port is None else f'{{port="{_escape(port)}"}}'
+            out.append(f"# TYPE {name} gauge")
+            out.append(f"{name}{label} {value}")
+        return "\n".join(out) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_dict(h: Histogram) -> dict:
+    return {"count": h.count, "sum": h.sum,
+            "buckets": {("+Inf" if b == float("inf") else repr(b)): n for b, n in h.cumulative()}}
+
+
+def serve_metrics(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """ Serve /metrics in Prometheus format and /metrics.json from a daemon thread. """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = registry.prometheus().encode()
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body = json.dumps(registry.snapshot()).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep the console for log lines
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def dump_metrics_periodically(registry: MetricsRegistry, path: str, interval: float) -> threading.Thread:
+    """ Every interval seconds, atomically write a JSON snapshot with per-port rates since the last dump. """
+
+    def run():
+        previous = registry.snapshot()
+        while True:
+            time.sleep(interval)
+            current = registry.snapshot()
+            elapsed = max(current["time"] - previous["time"], 1e-9)
+            for name, port in current["ports"].items():
+                before = previous["ports"].get(name, {})
+                port["bytes_per_second"] = (port["bytes_total"] - before.get("bytes_total", 0)) / elapsed
+                port["lines_per_second"] = (port["lines_total"] - before.get("lines_total", 0)) / elapsed
+            tmp = path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(current, f, indent=2)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"Error: could not write metrics to {path}: {e}")
+            previous = current
+
+    thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,170 @@
+""" Parsing helpers for serial logs: serial_logger text files and raw $AQS captures. """
+
+import calendar
+import gzip
+import re
+import time
+
+# Fields of the $AQS CSV line printed by SDLogger.print_sensor_data (after the "$AQS" tag and timestamp).
+# Note the device prints PM10, PM2.5 then PM1.0, and temperatures in its display unit (display.temp_unit).
+AQS_FIELDS = ("temp", "humidity", "dew_point", "co2", "voc_raw", "voc_index",
+              "nox_raw", "nox_index", "pm10", "pm25", "pm1")
+
+# Columns of the CSV rows SDLogger.log_data writes to the SD card (after the timestamp). Here pm10 is
+# PM1.0 and pm100 is PM10, as on the board, and temp is in the unit named in the file's header row.
+SD_FIELDS = ("temp", "humidity", "co2", "voc_raw", "voc_index", "nox_raw", "nox_index", "pm1", "pm25", "pm10")
+
+# Fields recognised in the human-readable lines (SDLogger text output and older firmware)
+RECORD_FIELDS = AQS_FIELDS + ("score",)
+
+_NUMBER = r"(-?[0-9.]+|----|None)"
+_TEXT_PATTERNS = (
+    ("co2", re.compile(r"CO2: " + _NUMBER + " ppm")),
+    ("temp", re.compile(r"\bT: " + _NUMBER + " ([CF])")),
+    ("humidity", re.compile(r"RH: " + _NUMBER + "%")),
+    ("dew_point", re.compile(r"DP: " + _NUMBER + " ([CF])")),
+    ("voc_raw", re.compile(r"VOC(?: Raw)?: " + _NUMBER)),
+    ("voc_index", re.compile(r"VOC Index: " + _NUMBER)),
+    ("nox_raw", re.compile(r"NOx Raw: " + _NUMBER)),
+    ("nox_index", re.compile(r"NOx Index: " + _NUMBER)),
+    ("pm10", re.compile(r"PM10: " + _NUMBER + r"|'pm100 env': " + _NUMBER)),
+    ("pm25", re.compile(r"PM2\.5: " + _NUMBER + r"|'pm25 env': " + _NUMBER)),
+    ("pm1", re.compile(r"PM1\.0: " + _NUMBER + r"|'pm10 env': " + _NUMBER)),
+    ("score", re.compile(r"Score: " + _NUMBER)),
+)
+_RTC_PREFIX = "RTC "
+
+# "YYYY-MM-DD HH:MM:SS - " prefix written by serial_logger
+_HOST_PREFIX_LEN = 22
+
+
+def open_log(path: str):
+    """ Open a log for reading as text, transparently decompressing rotated .gz segments. """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def parse_timestamp(text: str) -> float | None:
+    """ Parse 'YYYY-MM-DD HH:MM:SS' into seconds since the epoch (naive, treated as UTC), or None. """
+    if len(text) < 19 or text[4] != '-' or text[10] != ' ':
+        return None
+    try:
+        return float(calendar.timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                                      int(text[11:13]), int(text[14:16]), int(text[17:19]), 0, 0, 0)))
+    except ValueError:
+        return None
+
+
+def format_timestamp(ts: float) -> str:
+    """ Inverse of parse_timestamp. """
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts))
+
+
+def split_logged_line(line: str, parse_ts=parse_timestamp) -> tuple[float | None, str]:
+    """ Split a serial_logger line into (host timestamp, payload). Raw captures return (None, line).
+    parse_ts (here and in the parsers below) replaces parse_timestamp, e.g. with a cached one. """
+    if len(line) > _HOST_PREFIX_LEN and line[19:22] == " - ":
+        ts = parse_ts(line)
+        if ts is not None:
+            return ts, line[_HOST_PREFIX_LEN:]
+    return None, line
+
+
+def parse_aqs(payload: str, parse_ts=parse_timestamp) -> tuple[float | None, dict] | None:
+    """ Parse a '$AQS,timestamp,...' payload into (device timestamp, {field: value}).
+    Missing readings ('None' or '----') become None. Returns None if the payload is not an $AQS line. """
+    if not payload.startswith("$AQS,"):
+        return None
+    parts = payload.rstrip("\r\n").split(",")
+    if len(parts) != len(AQS_FIELDS) + 2:
+        return None
+    values = {}
+    for name, raw in zip(AQS_FIELDS, parts[2:]):
+        try:
+            values[name] = float(raw)
+        except ValueError:
+            values[name] = None
+    return parse_ts(parts[1]), values
+
+
+def parse_sd_row(line: str, temp_unit: str = "C", parse_ts=parse_timestamp) -> tuple[float, dict] | None:
+    """ Parse one row of an SD card log ('YYYY-MM-DD HH:MM:SS,temp,...') into (timestamp, {field: value}).
+    Missing readings ('None' or '----') become None; temperatures are converted to C when temp_unit is 'F'.
+    Returns None for the header row and anything else that is not a data row. """
+    parts = line.rstrip("\r\n").split(",")
+    if len(parts) != len(SD_FIELDS) + 1:
+        return None
+    ts = parse_ts(parts[0])
+    if ts is None:
+        return None
+    values = {}
+    for name, raw in zip(SD_FIELDS, parts[1:]):
+        try:
+            values[name] = float(raw)
+        except ValueError:
+            values[name] = None
+    if temp_unit == "F" and values["temp"] is not None:
+        values["temp"] = (values["temp"] - 32.0) * 5.0 / 9.0
+    return ts, values
+
+
+def sd_header_unit(line: str) -> str | None:
+    """ Temperature unit ('C' or 'F') named in an SD log header row, or None if line is not the header. """
+    if line.startswith("timestamp,temp (") and len(line) > 16:
+        return line[16]
+    return None
+
+
+def frame_timestamp(line: str) -> tuple[float | None, str]:
+    """ Best-effort (timestamp, payload) for a logged or raw line: the host stamp if present,
+    else the $AQS device stamp, else None. """
+    ts, payload = split_logged_line(line)
+    if ts is None and payload.startswith("$AQS,"):
+        ts = parse_timestamp(payload[5:24])
+    return ts, payload
+
+
+def _number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_text(payload: str, parse_ts=parse_timestamp) -> tuple[float | None, dict] | None:
+    """ Parse a human-readable reading line into (device timestamp or None, {field: value}).
+    Temperatures printed in F are converted to C. Returns None if no field is recognised. """
+    values = {}
+    for name, pattern in _TEXT_PATTERNS:
+        match = pattern.search(payload)
+        if not match:
+            continue
+        value = _number(match.group(1) if match.group(1) is not None else match.group(2))
+        if name in ("temp", "dew_point") and value is not None and match.group(2) == "F":
+            value = (value - 32.0) * 5.0 / 9.0
+        values[name] = value
+    if not values:
+        return None
+    ts = parse_ts(payload[len(_RTC_PREFIX):]) if payload.startswith(_RTC_PREFIX) else None
+    return ts, values
+
+
+def parse_record(line: str, clock: str = "host", parse_ts=parse_timestamp) -> tuple[float, dict] | None:
+    """ Parse one log line ($AQS or text, with or without the serial_logger prefix) into
+    (timestamp, {field: value}). clock picks the 'host' or 'device' timestamp when both exist,
+    falling back to whichever is present. Returns None for lines that are not readings. """
+    host_ts, payload = split_logged_line(line.rstrip("\r\n"), parse_ts)
+    parsed = parse_aqs(payload, parse_ts)
+    if parsed is None:
+        parsed = parse_text(payload, parse_ts)
+    if parsed is None:
+        return None
+    device_ts, values = parsed
+    if clock == "device":
+        ts = device_ts if device_ts is not None else host_ts
+    else:
+        ts = host_ts if host_ts is not None else device_ts
+    if ts is None:
+        return None
+    return ts, values
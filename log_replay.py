@@ -0,0 +1,194 @@
+""" Replay logged serial data into pseudo-terminals so the host tools can be load tested without boards.
+
+Each simulated device gets its own pty; point serial_logger / read_serial_port at the printed port paths:
+
+    python log_replay.py logs/*.txt --devices 20 --speed 10
+    python serial_logger.py --port /dev/pts/7 --file replay_7.txt
+
+Lines are paced by their original timestamps divided by --speed. Optional faults: timing jitter,
+lines split across writes and garbage bytes. If a reader falls behind, the pty buffer fills and the
+unsent backlog is reported per device, which is the signal that the host is past its sustainable load.
+POSIX only (uses os.openpty).
+"""
+
+import argparse
+import glob
+import heapq
+import os
+import random
+import time
+import tty
+
+from log_parser import frame_timestamp, open_log
+
+LINE_END = b"\r\n"  # CircuitPython print() line ending
+
+
+def iter_frames(paths, loop=False):
+    """ Yield (timestamp, payload) for every non-empty line of the files, streaming. """
+    while True:
+        for path in paths:
+            with open_log(path) as f:
+                for line in f:
+                    line = line.rstrip("\r\n")
+                    if line:
+                        yield frame_timestamp(line)
+        if not loop:
+            return
+
+
+class ReplayDevice:
+    """ One simulated board: a pty plus its position in the replayed stream. """
+
+    def __init__(self, index, paths, args, rng):
+        self.index = index
+        self.args = args
+        self.rng = rng
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # no echo or newline translation, like a USB CDC port
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.frames = iter_frames(paths, loop=args.loop)
+        self.last_ts = None
+        self.pending = bytearray()
+        self.split_rest = None
+        self.split_ts = None
+        self.lines = 0
+        self.bytes = 0
+        self.dropped = 0
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+    def emit(self, now):
+        """ Queue the next frame (or the rest of a split one). Returns when to call again, or None when done. """
+        args = self.args
+        if self.split_rest is not None:
+            self.pending += self.split_rest
+            self.split_rest = None
+            self.lines += 1
+            return now + self._gap(self.split_ts)
+
+        try:
+            ts, payload = next(self.frames)
+        except StopIteration:
+            return None
+
+        data = payload.encode("utf-8", errors="replace") + LINE_END
+        if args.garbage and self.rng.random() < args.garbage:
+            self.pending += bytes(self.rng.randrange(256) for _ in range(self.rng.randint(1, 16)))
+        if args.partial and self.rng.random() < args.partial and len(data) > 2:
+            cut = self.rng.randrange(1, len(data) - 1)
+            self.pending += data[:cut]
+            self.split_rest = data[cut:]
+            self.split_ts = ts
+            self.bytes += len(data)
+            return now + self.rng.uniform(0.005, 0.05)
+
+        self.pending += data
+        self.bytes += len(data)
+        self.lines += 1
+        return now + self._gap(ts)
+
+    def _gap(self, ts):
+        """ Wall-clock delay before the next frame, from the recorded timestamps. """
+        args = self.args
+        if ts is None or self.last_ts is None:
+            gap = args.default_gap
+        else:
+            gap = min(max(ts - self.last_ts, 0.0), args.max_gap)
+        if ts is not None:
+            self.last_ts = ts
+        gap /= args.speed
+        if args.jitter:
+            gap = max(gap + self.rng.gauss(0.0, args.jitter), 0.0)
+        return gap
+
+    def flush(self):
+        """ Write as much of the backlog as the pty accepts without blocking. """
+        if not self.pending:
+            return
+        try:
+            written = os.write(self.master, self.pending)
+        except BlockingIOError:
+            written = 0
+        del self.pending[:written]
+        if len(self.pending) > self.args.max_backlog:
+            excess = len(self.pending) - self.args.max_backlog
+            del self.pending[:excess]
+            self.dropped += excess
+
+
+def report(devices, elapsed):
+    lines = sum(d.lines for d in devices)
+    sent = sum(d.bytes for d in devices)
+    backlog = sum(len(d.pending) for d in devices)
+    dropped = sum(d.dropped for d in devices)
+    behind = sum(1 for d in devices if d.pending or d.dropped)
+    print(f"{elapsed:8.1f} s | {lines / elapsed:9.1f} lines/s | {sent / elapsed / 1024:8.1f} KiB/s | "
+          f"backlog {backlog} B | dropped {dropped} B | devices behind {behind}/{len(devices)}")
+
+
+def main():
+    """ Parse arguments, open the ptys and pace the frames until the input runs out or Ctrl+C. """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="log files or globs (serial_logger .txt or raw $AQS captures)")
+    parser.add_argument("--devices", type=int, default=1, help="number of simulated boards")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed multiplier over real time")
+    parser.add_argument("--loop", action="store_true", help="restart the inputs when they run out")
+    parser.add_argument("--jitter", type=float, default=0.0, help="std dev (s) of timing noise per line")
+    parser.add_argument("--partial", type=float, default=0.0, help="probability a line is split across writes")
+    parser.add_argument("--garbage", type=float, default=0.0, help="probability of garbage bytes before a line")
+    parser.add_argument("--max-gap", type=float, default=60.0, help="cap (s, recorded time) on gaps between lines")
+    parser.add_argument("--default-gap", type=float, default=5.0, help="gap (s) for lines without a timestamp")
+    parser.add_argument("--max-backlog", type=int, default=1 << 20, help="unsent bytes kept per device before dropping")
+    parser.add_argument("--wait", type=float, default=0.0, help="seconds to wait after opening ports before sending")
+    parser.add_argument("--report", type=float, default=5.0, help="seconds between throughput reports")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = [p for pattern in args.inputs for p in (sorted(glob.glob(pattern)) or [pattern])]
+    rng = random.Random(args.seed)
+    devices = [ReplayDevice(i, paths, args, random.Random(rng.random())) for i in range(args.devices)]
+    for device in devices:
+        print(f"device {device.index}: {device.port}")
+    if args.wait:
+        time.sleep(args.wait)
+
+    start = time.monotonic()
+    # Stagger the first lines so the devices are not in lockstep
+    schedule = [(start + rng.uniform(0.0, args.default_gap / args.speed), d.index) for d in devices]
+    heapq.heapify(schedule)
+    next_report = start + args.report
+    try:
+        while schedule:
+            now = time.monotonic()
+            while schedule and schedule[0][0] <= now:
+                _, index = heapq.heappop(schedule)
+                due = devices[index].emit(now)
+                if due is not None:
+                    heapq.heappush(schedule, (due, index))
+            for device in devices:
+                device.flush()
+            if now >= next_report:
+                report(devices, now - start)
+                next_report += args.report
+            wake = schedule[0][0] if schedule else now + 0.01
+            time.sleep(min(max(wake - time.monotonic(), 0.0), 0.01))
+        # Give readers a moment to drain what is still buffered
+        drain_deadline = time.monotonic() + 2.0
+        while any(d.pending for d in devices) and time.monotonic() < drain_deadline:
+            for device in devices:
+                device.flush()
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        print("\nReplay stopped by user.")
+    finally:
+        report(devices, max(time.monotonic() - start, 1e-9))
+        for device in devices:
+            device.close()
+
+
+if __name__ == "__main__":
+    main()
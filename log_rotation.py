@@ -0,0 +1,209 @@
+""" Rotating log writer for serial_logger: size/period rotation, background gzip and a segment manifest.
+
+Segments are named like the original logs (data_log.txt, data_log(1).txt, ...). Each closed segment is
+recorded in <directory>/manifest.jsonl with its first/last line timestamps so readers can pick the
+files for a time range without opening them (select_segments, used by fleet_align and daily_report
+--start/--end); rotated segments are then gzipped by a worker thread and re-recorded under their .gz
+name (the last entry for a segment wins).
+"""
+
+import gzip
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def next_free_counter(directory: str, stem: str, extension: str) -> int:
+    """ Counter for the next unused '<stem>(N)<extension>' name (0 means '<stem><extension>'),
+    from one directory listing. Compressed segments count as used. """
+    pattern = re.compile(rf"^{re.escape(stem)}(?:\((\d+)\))?{re.escape(extension)}(?:\.gz)?$")
+    used = -1
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            used = max(used, int(match.group(1) or 0))
+    return used + 1
+
+
+def segment_name(stem: str, extension: str, counter: int) -> str:
+    return f"{stem}{extension}" if counter == 0 else f"{stem}({counter}){extension}"
+
+
+def log_stem(file_name: str) -> str:
+    """ The log name a segment file belongs to: 'data_log(3).txt.gz' -> 'data_log'. """
+    name = os.path.basename(file_name)
+    name = os.path.splitext(name[:-3] if name.endswith(".gz") else name)[0]
+    return re.sub(r"\(\d+\)$", "", name)
+
+
+def read_manifest(directory: str) -> list[dict]:
+    """ Latest manifest entry per segment, in the order the segments were closed. """
+    entries = {}
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                entries[entry["segment"]] = entry
+    except FileNotFoundError:
+        pass
+    return list(entries.values())
+
+
+def _overlaps(entry: dict, start: str | None, end: str | None) -> bool:
+    return entry["first"] is not None and (end is None or entry["first"] <= end) and \
+        (start is None or entry["last"] >= start)
+
+
+def manifest_entries(paths) -> dict:
+    """ {path: manifest entry} for each of paths that the manifest in its directory lists. """
+    manifests = {}
+    entries = {}
+    for path in paths:
+        directory = os.path.dirname(path)
+        if directory not in manifests:
+            manifests[directory] = {e["file"]: e for e in read_manifest(directory or ".")}
+        entry = manifests[directory].get(os.path.basename(path))
+        if entry is not None:
+            entries[path] = entry
+    return entries
+
+
+def select_segments(paths, start: str | None = None, end: str | None = None) -> list[str]:
+    """ paths without the rotated segments whose manifest time range misses [start, end], so readers
+    can skip them unopened. Files the manifest doesn't list (the segment still being written, logs
+    from before rotation) are kept. Ranges are serial_logger's host timestamps. """
+    if start is None and end is None:
+        return list(paths)
+    listed = manifest_entries(paths)
+    return [p for p in paths if p not in listed or _overlaps(listed[p], start, end)]
+
+
+class RotatingLogWriter:
+    """ File-like writer (write/flush/close) that serial_logger.log_serial can use in place of a file.
+
+    Lines are expected to start with serial_logger's 'YYYY-MM-DD HH:MM:SS' stamp, which is used for the
+    manifest time ranges. max_bytes / period of 0 disable size / wall-clock rotation.
+    """
+
+    def __init__(self, directory: str, file_name: str, max_bytes: int = 0, period: float = 0,
+                 compress: bool = True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.period = period
+        self.compress = compress
+        self._stem, self._extension = os.path.splitext(file_name)
+        self._counter = next_free_counter(directory, self._stem, self._extension)
+        self._file = None
+        self._jobs = queue.Queue()
+        self._worker = threading.Thread(target=self._work, name="log-compressor", daemon=True)
+        self._worker.start()
+        self._open_segment()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def pending_jobs(self) -> int:
+        """ Manifest/compression jobs not yet done by the background worker. """
+        return self._jobs.qsize()
+
+    def _open_segment(self):
+        self._name = segment_name(self._stem, self._extension, self._counter)
+        self._counter += 1
+        self._path = os.path.join(self.directory, self._name)
+        self._file = open(self._path, "a", encoding="utf-8", errors="replace")
+        self._bytes = 0
+        self._lines = 0
+        self._first = None
+        self._last = None
+        self._period_index = int(time.time() // self.period) if self.period else None
+
+    def _close_segment(self, compress: bool):
+        self._file.flush()
+        os.fsync(self._file.fileno())  # on disk before it is compressed or a journal checkpoint moves past it
+        self._file.close()
+        if not self._lines and self._bytes == 0:
+            os.remove(self._path)  # nothing was logged; don't leave an empty segment behind
+            return
+        entry = {"segment": self._name, "file": self._name, "first": self._first, "last": self._last,
+                 "lines": self._lines, "bytes": self._bytes, "closed": time.strftime("%Y-%m-%d %H:%M:%S")}
+        self._jobs.put(("manifest", entry))
+        if compress:
+            self._jobs.put(("compress", entry))
+
+    def write(self, text: str) -> int:
+        if self._lines and ((self.max_bytes and self._bytes >= self.max_bytes) or
+                            (self.period and int(time.time() // self.period) != self._period_index)):
+            self.rotate()
+        written = self._file.write(text)
+        self._bytes += len(text.encode("utf-8", "replace"))
+        self._lines += 1
+        stamp = text[:19]
+        if self._first is None:
+            self._first = stamp
+        self._last = stamp
+        return written
+
+    def flush(self):
+        self._file.flush()
+
+    def fileno(self) -> int:
+        """ File descriptor of the current segment (for os.fsync / os.fstat). """
+        return self._file.fileno()
+
+    def rotate(self):
+        """ Close the current segment (queueing it for compression) and start the next one. """
+        self._close_segment(self.compress)
+        self._open_segment()
+
+    def close(self):
+        """ Close the last segment uncompressed and wait for the worker to finish queued jobs. """
+        if self._file is None:
+            return
+        self._close_segment(compress=False)
+        self._file = None
+        self._jobs.put(None)
+        self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _work(self):
+        """ Background worker: appends manifest entries and gzips closed segments, in order. """
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        for job in iter(self._jobs.get, None):
+            kind, entry = job
+            try:
+                if kind == "compress":
+                    entry = self._compress(entry)
+                with open(manifest_path, "a", encoding="utf-8") as manifest:
+                    manifest.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Error: could not {kind} {entry['file']}: {e}")
+
+    def _compress(self, entry: dict) -> dict:
+        source = os.path.join(self.directory, entry["file"])
+        target = source + ".gz"
+        tmp = target + ".tmp"
+        with open(source, "rb") as f_in, gzip.open(tmp, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, 1 << 20)
+        os.replace(tmp, target)
+        os.remove(source)
+        entry = dict(entry)
+        entry["file"] = entry["file"] + ".gz"
+        entry["compressed_bytes"] = os.path.getsize(target)
+        return entry
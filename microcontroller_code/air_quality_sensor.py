@@ -1,61 +1,87 @@
 """Main CircuitPython code that collects data from the I2C sensors and prints to serial."""
 
 import asyncio
-
-from adafruit_scd4x import SCD4X # type: ignore
-from adafruit_sht4x import SHT4x # type: ignore
-from adafruit_sgp41.sgp41 import SGP41 # type: ignore
-from adafruit_pm25.i2c import PM25_I2C # type: ignore
+import time
 
 from sd_logger import SDLogger
 from button import Button
 from i2c import I2C
-from utils import calculate_dew_point, calculate_air_score_color
+from sample import Sample
+from utils import calculate_dew_point
+from sinks import build_sinks
+from sd_transfer import SDTransfer
 from aqs_settings import load_settings, get
+from scd4x_single_shot import non_blocking, start_single_shot
 
 class AirQualitySensor:
     """
     AirQuality class that takes sensor measurements and handles all high level processes.
     """
 
-    def __init__(self, led) -> None:
-        # Load settings from TOML
-        self.cfg = load_settings()
+    def __init__(self, led, cfg: dict|None = None, boot_start: float|None = None) -> None:
+        # Reuse the settings code.main already parsed; only parse when constructed on its own
+        self.cfg = cfg if cfg is not None else load_settings()
+        self._boot_start: float = boot_start if boot_start is not None else time.monotonic()
+        self.first_sample_s: float|None = None
+        self.power_mode: str = get(self.cfg, "power.mode", "continuous")
+        self.scd4x_mode: str = get(self.cfg, "power.scd4x", "single_shot")
 
-        # Initialize the AirQuality class with button, RTC, and logger
+        # Start the sensors first so their warm-up overlaps SD mount and RTC sync
         i2c = I2C()
+        self._init_sensors(i2c)
+
+        # Initialize the AirQuality class with button, RTC, and logger
         self.button = Button()
         self.sd_logger = SDLogger(i2c, led,
                                    should_print=get(self.cfg, "display.should_print", True),
                                    temp_unit=get(self.cfg, "display.temp_unit", "C"),
-                                  print_in_csv_format = get(self.cfg, "display.print_in_csv_format", False))
-
-        # Initialize sensors
-        self.co2_sensor = SCD4X(i2c) # CO2 / T / RH: SCD4x
-        self.co2_sensor.start_periodic_measurement()
-        self.temp_humidity_sensor = SHT4x(i2c) # Temp / RH: SHT4x
-        self.gas_sensor = SGP41(i2c) # VOC/NOx: SGP41
-        self.pm_sensor = PM25_I2C(i2c, reset_pin=None) # PM: PMSA003I via adafruit_pm25 (I2C)
-
-        # Initialize sensor values
-        self.co2_value: int|None = None
-        self.temp_value: float|None = None
-        self.dew_point: float|None = None
-        self.humidity_value: float|None = None
-        self.voc_raw: int|None = None
-        self.voc_index: int|None = None
-        self.nox_raw: int|None = None
-        self.nox_index: int|None = None
-        self.pm: dict|None = None
+                                  print_in_csv_format = get(self.cfg, "display.print_in_csv_format", False),
+                                  mount_path=get(self.cfg, "sd.mount_path", "/sd"))
+
+        # Latest readings, updated in place and fanned out to the sinks from [sinks]
+        self.sample = Sample()
+        self.sinks = build_sinks(self.cfg, self.sd_logger)
+        self._score_sink = self.sinks.get("score")  # sets the LED colour while not logging
+
+        # SD log downloads over the USB data channel (enabled in boot.py)
+        self.transfer = None
+        if get(self.cfg, "transfer.enabled", False):
+            self.transfer = SDTransfer(self.sd_logger.mount_path, chunk_size=get(self.cfg, "transfer.chunk", 4096))
+        self.transfer_poll_interval: float = get(self.cfg, "transfer.poll_interval", 0.25)
+        self.transfer_idle_poll_max: float = get(self.cfg, "transfer.idle_poll_max", 2.0)
+        self.transfer_busy_poll: float = get(self.cfg, "transfer.busy_poll", SDTransfer.BUSY_POLL)
 
         # Settings
         self.shutdown_hold = get(self.cfg, "button.shutdown_hold", 2.0)
+        self.button_poll_interval: float = get(self.cfg, "button.poll_interval", 0.1)
+        self.button_scan_interval: float = get(self.cfg, "button.scan_interval", 0.25)
+        self._button_released = asyncio.Event()  # set by _scan_button, waited on by monitor_button
 
         # Initialize intervals from settings
         self.voc_index_interval: float = get(self.cfg, "intervals.voc_index", 1.0)
         self.sensor_interval: float = get(self.cfg, "intervals.sensor", 5.0)
-        self.print_interval: float = get(self.cfg, "intervals.print", 5.0)
-        self.log_interval: float = get(self.cfg, "intervals.log", 5.0)
+        self.first_sample_poll: float = get(self.cfg, "boot.first_sample_poll", 0.1)
+        self.first_sample_timeout: float = get(self.cfg, "boot.first_sample_timeout", 10.0)
+
+        # Low-power mode
+        self.power_cycle: float = get(self.cfg, "power.cycle", 300.0)
+        self.pm_warmup: float = get(self.cfg, "power.pm_warmup", 30.0)
+        self.min_sleep: float = get(self.cfg, "power.min_sleep", 1.0)
+        self.single_shot_time: float = get(self.cfg, "power.single_shot_time", 5.0)
+        self._pm_power = None
+        pm_set_pin = get(self.cfg, "power.pm_set_pin", "")
+        if self.power_mode == "low_power" and pm_set_pin:
+            import board # type: ignore
+            import digitalio # type: ignore
+            self._pm_power = digitalio.DigitalInOut(getattr(board, pm_set_pin))
+            self._pm_power.direction = digitalio.Direction.OUTPUT
+            self._pm_power.value = False  # PMSA003I SET low = sleep (fan and laser off)
+        elif self.power_mode == "low_power":
+            self.sd_logger.log_info(msg="Low-power mode without power.pm_set_pin: the PM sensor stays powered.",
+                                    color='yellow')
+        if self.power_mode == "low_power" and self.scd4x_mode == "single_shot" and not non_blocking(self.co2_sensor):
+            self.sd_logger.log_info(msg="SCD4x driver has no _send_command: each single shot blocks for ~5 s.",
+                                    color='yellow')
 
         # Flags
         self._logging: bool = False
@@ -65,6 +91,31 @@ class AirQualitySensor:
         self.sd_logger.log_info(msg="System initialized and ready.", color='magenta')
 
 
+    def _init_sensors(self, i2c) -> None:
+        """
+        Bring up the sensor drivers, SCD4x first: its periodic measurement (~5 s to first reading)
+        is started before the other three drivers are imported, so it runs while they load.
+        The imports are in here only for that ordering; all four drivers are imported and
+        initialized during construction, none is deferred to first use.
+        In low-power mode the SCD4x is left idle for single shots, or runs its 30 s low-power periodic mode.
+        """
+        from adafruit_scd4x import SCD4X # type: ignore
+        self.co2_sensor = SCD4X(i2c) # CO2 / T / RH: SCD4x
+        if self.power_mode != "low_power":
+            self.co2_sensor.start_periodic_measurement()
+        elif self.scd4x_mode == "low_periodic":
+            self.co2_sensor.start_low_periodic_measurement()
+
+        from adafruit_sgp41.sgp41 import SGP41 # type: ignore
+        self.gas_sensor = SGP41(i2c) # VOC/NOx: SGP41
+
+        from adafruit_sht4x import SHT4x # type: ignore
+        self.temp_humidity_sensor = SHT4x(i2c) # Temp / RH: SHT4x
+
+        from adafruit_pm25.i2c import PM25_I2C # type: ignore
+        self.pm_sensor = PM25_I2C(i2c, reset_pin=None) # PM: PMSA003I via adafruit_pm25 (I2C)
+
+
     def __enter__(self):
         return self
 
@@ -78,125 +129,238 @@ class AirQualitySensor:
         self.sd_logger.log_info("Safe shutdown initiated.")
         self.sd_logger.unmount()
         self._shutdown = True  # Set shutdown flag
+        self._button_released.set()  # let monitor_button see the flag
 
 
     async def read_sensors(self) -> None:
         """
-        Reads all connected air quality sensors, handling I2C and runtime errors gracefully.
-        Returns:
-            tuple: (self.co2_value, self.temp_value, humidity_value, self.voc_raw, pm)
-                self.co2_value (float or None): CO2 concentration in ppm, or None if read failed
-                self.temp_value (float or None): Temperature in Celsius, or None if read failed
-                humidity_value (float or None): Relative humidity in %, or None if read failed
-                self.voc_raw (int or None): Raw VOC sensor value, or None if read failed
-                pm (dict or None): PM sensor readings dictionary, or None if read failed
+        Reads all connected air quality sensors into self.sample, handling I2C and runtime errors gracefully.
+        Fields whose read failed are set to None.
         """
+        await self._wait_for_first_co2()
 
         while not self._shutdown:
-            try:
-                # SCD4x CO2
-                if self.co2_sensor.data_ready:
-                    self.co2_value = self.co2_sensor.CO2
-            except (OSError, RuntimeError) as e:
-                self.co2_value = None
-                self.sd_logger.log_info(msg=f"Error reading CO2 sensor: {e}", color='red')
+            self._read_co2()
+            self._read_temp_humidity()
+            self._read_gas_raw()
+            self._read_pm()
+            self._sample_updated()
 
-            try:
-                # SHT4x temp / RH
-                self.temp_value = self.temp_humidity_sensor.temperature
-                self.humidity_value = self.temp_humidity_sensor.relative_humidity
-                # Calculate dew point
-                self.dew_point = calculate_dew_point(self.temp_value, self.humidity_value)
-            except (OSError, RuntimeError) as e:
-                self.temp_value = None
-                self.humidity_value = None
-                self.sd_logger.log_info(msg=f"Error reading temperature/humidity sensor: {e}", color='red')
+            if self.first_sample_s is None:
+                self.first_sample_s = time.monotonic() - self._boot_start
+                self.sd_logger.log_info(msg=f"First sample {self.first_sample_s:.2f} s after boot.")
 
-            try:
-                # SGP41 raw VOC & NOx reading
-                self.voc_raw, self.nox_raw = self.gas_sensor.measure_raw(self.temp_value, self.humidity_value)
-            except (OSError, RuntimeError) as e:
-                self.voc_raw = None
-                self.nox_raw = None
-                self.sd_logger.log_info(msg=f"Error reading VOC/NOx sensor: {e}", color='red')
+            await asyncio.sleep(self.sensor_interval)  # Yield to event loop, check button frequently
 
-            try:
-                # PM25 dict
-                self.pm = self.pm_sensor.read()
-            except (OSError, RuntimeError) as e:
-                self.pm = None
-                self.sd_logger.log_info(msg=f"Error reading PM sensor: {e}", color='red')
-
-            # Extract relevant PM values
-            if self.pm:
-                self.pm10 = self.pm.get("pm10 env")
-                self.pm25 = self.pm.get("pm25 env")
-                self.pm100 = self.pm.get("pm100 env")
-            else:
-                self.pm10 = None
-                self.pm25 = None
-                self.pm100 = None
 
-            await asyncio.sleep(self.sensor_interval)  # Yield to event loop, check button frequently
+    def _read_co2(self) -> None:
+        """SCD4x CO2, if a new measurement is ready."""
+        try:
+            if self.co2_sensor.data_ready:
+                self.sample.co2 = self.co2_sensor.CO2
+        except (OSError, RuntimeError) as e:
+            self.sample.co2 = None
+            self.sd_logger.log_info(msg=f"Error reading CO2 sensor: {e}", color='red')
+
+
+    def _read_temp_humidity(self) -> None:
+        """SHT4x temperature / RH and the dew point from them."""
+        sample = self.sample
+        try:
+            sample.temp = self.temp_humidity_sensor.temperature
+            sample.humidity = self.temp_humidity_sensor.relative_humidity
+            # Calculate dew point
+            sample.dew_point = calculate_dew_point(sample.temp, sample.humidity)
+        except (OSError, RuntimeError) as e:
+            sample.temp = None
+            sample.humidity = None
+            self.sd_logger.log_info(msg=f"Error reading temperature/humidity sensor: {e}", color='red')
+
+
+    def _read_gas_raw(self) -> None:
+        """SGP41 raw VOC & NOx reading."""
+        sample = self.sample
+        try:
+            sample.voc_raw, sample.nox_raw = self.gas_sensor.measure_raw(sample.temp, sample.humidity)
+        except (OSError, RuntimeError) as e:
+            sample.voc_raw = None
+            sample.nox_raw = None
+            self.sd_logger.log_info(msg=f"Error reading VOC/NOx sensor: {e}", color='red')
+
+
+    def _read_pm(self) -> None:
+        """PM25 dict and the PM values derived from it."""
+        try:
+            pm = self.pm_sensor.read()
+        except (OSError, RuntimeError) as e:
+            pm = None
+            self.sd_logger.log_info(msg=f"Error reading PM sensor: {e}", color='red')
+        self.sample.set_pm(pm)
+
+
+    def _sample_updated(self) -> None:
+        """Mark the sample as read, with a new seq so the sinks re-format it. The SD log and console
+        stamp their output with the RTC time when they write it."""
+        self.sample.ready = True
+        self.sample.seq += 1
+
+
+    async def _wait_for_first_co2(self) -> None:
+        """
+        Poll SCD4x data_ready until its first measurement instead of sleeping a full sensor interval.
+        Gives up after first_sample_timeout so a faulty sensor does not stall the other readings.
+        """
+        deadline = time.monotonic() + self.first_sample_timeout
+        while not self._shutdown and time.monotonic() < deadline:
+            try:
+                if self.co2_sensor.data_ready:
+                    return
+            except (OSError, RuntimeError):
+                return  # Let read_sensors report the error
+            await asyncio.sleep(self.first_sample_poll)
 
 
     async def read_voc_nox_index(self) -> None:
         """
-        Reads voc and nox indices from gas sensor.
-        Returns self.voc_index (int or None): Calculated VOC Index, or None if read failed
-        Returns self.nox_index (int or None): Calculated NOx Index, or None if read failed
+        Reads VOC and NOx indices from the gas sensor into self.sample (None if the read failed).
         """
+        sample = self.sample
         while not self._shutdown:
             try:
-                self.voc_index, self.nox_index = self.gas_sensor.measure_index(self.temp_value, self.humidity_value)
+                sample.voc_index, sample.nox_index = self.gas_sensor.measure_index(sample.temp, sample.humidity)
             except (OSError, RuntimeError) as e:
-                self.voc_index = None
-                self.nox_index = None
+                sample.voc_index = None
+                sample.nox_index = None
                 self.sd_logger.log_info(msg=f"Error reading VOC/NOx indices: {e}", color='red')
+            sample.seq += 1
             await asyncio.sleep(self.voc_index_interval)
 
 
-    async def print_data(self) -> None:
+    async def publish(self) -> None:
         """
-        Prints sensor data to console and calculates air score and sets led color by score if not logging.
+        Writes the sample to each enabled sink (score/LED, console, SD log, ...) on its own interval,
+        starting once the first reading is in.
         """
+        while not self._shutdown and not self.sample.ready:
+            await asyncio.sleep(self.first_sample_poll)
         while not self._shutdown:
-            self.sd_logger.print_sensor_data(
-                self.temp_value, self.humidity_value,
-                self.dew_point, self.co2_value,
-                self.voc_raw, self.voc_index,
-                self.nox_raw, self.nox_index,
-                self.pm10, self.pm25, self.pm100
-            )
+            await asyncio.sleep(self.sinks.write_due(self.sample, time.monotonic()))
 
-            if not self._logging:
-                air_score_color = calculate_air_score_color(self.co2_value, self.temp_value,
-                                                self.humidity_value, self.voc_index, self.nox_index, self.pm)
 
-                self.sd_logger.led.set_color(air_score_color)
+    async def duty_cycle(self) -> None:
+        """
+        Low-power acquisition: once per power_cycle, wake, power the PM sensor, take one reading of
+        every sensor, print/log it, then light sleep until the next cycle. The SCD4x single shot
+        (~5 s) runs inside the PM warm-up, and both are slept through (the button still wakes the board).
+        The VOC/NOx indices need 1 Hz sampling, so only the raw SGP41 values are reported.
+        """
+        next_cycle = time.monotonic()
+        while not self._shutdown:
+            self._set_pm_power(True)
+            pm_ready = time.monotonic() + self.pm_warmup
+
+            self._read_temp_humidity()
+            self._read_gas_raw()
+            co2_ready = self._start_single_shot() if self.scd4x_mode == "single_shot" else 0.0
+
+            await self._sleep_until(max(pm_ready, co2_ready))
+            self._read_co2()
+            self._read_pm()
+            self._set_pm_power(False)
 
-            await asyncio.sleep(self.print_interval)  # Wait for the next logging interval
+            self._sample_updated()
 
+            if self.first_sample_s is None:
+                self.first_sample_s = time.monotonic() - self._boot_start
+                self.sd_logger.log_info(msg=f"First sample {self.first_sample_s:.2f} s after boot.")
+            self.sinks.write_all(self.sample)
 
-    async def log_data(self) -> None:
+            # Keep the cadence; if a cycle overran, start the next one a full cycle from now
+            next_cycle += self.power_cycle
+            if next_cycle < time.monotonic():
+                next_cycle = time.monotonic() + self.power_cycle
+            if not self._logging and self._score_sink is None:
+                self.sd_logger.led.off()  # otherwise the score sink keeps showing the air score colour
+            await self._sleep_until(next_cycle)
+
+
+    def _start_single_shot(self) -> float:
         """
-        Logs data if self._logging is True.
+        Start an SCD4x single shot and return the monotonic time its result is due: single_shot_time
+        from now, or 0.0 if the driver could only take it blocking (see scd4x_single_shot.py).
         """
-        while not self._shutdown:
-            if self._logging:
-                self.sd_logger.log_data(self.co2_value, self.temp_value,
-                                        self.humidity_value, self.voc_raw,
-                                        self.voc_index, self.nox_raw, self.nox_index, self.pm)
+        try:
+            if not start_single_shot(self.co2_sensor):
+                return 0.0
+        except (OSError, RuntimeError) as e:
+            self.sd_logger.log_info(msg=f"Error starting CO2 single shot: {e}", color='red')
+        return time.monotonic() + self.single_shot_time
 
-            await asyncio.sleep(self.log_interval)  # Wait for the next logging interval
+
+    def _set_pm_power(self, on: bool) -> None:
+        if self._pm_power is not None:
+            self._pm_power.value = on
+
+
+    async def _sleep_until(self, deadline: float) -> None:
+        """
+        Light sleep until the monotonic deadline, waking early on a button press. The press is then
+        handled by monitor_button (which needs the pin back from the alarm) before sleeping again.
+        """
+        import alarm # type: ignore
+        import board # type: ignore
+        while not self._shutdown:
+            # Drain the queue and finish timing a press before giving up the pin (deinit drops queued events)
+            self._scan_button()
+            while self.button.pressed and not self._shutdown:
+                await asyncio.sleep(self.button_poll_interval)
+                self._scan_button()
+            await asyncio.sleep(0)  # let monitor_button handle a release
+            remaining = deadline - time.monotonic()
+            if remaining <= self.min_sleep:
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                return
+
+            self.button.deinit()
+            time_alarm = alarm.time.TimeAlarm(monotonic_time=deadline)
+            pin_alarm = alarm.pin.PinAlarm(pin=board.BUTTON, value=False, pull=True)
+            woke = alarm.light_sleep_until_alarms(time_alarm, pin_alarm)
+            self.button = Button()
+            if woke is not pin_alarm:
+                return
+            # keypad reports the still-held button as a new press on its first scan
+            await asyncio.sleep(self.button_poll_interval)
+            self._scan_button()
+
+
+    def _scan_button(self) -> None:
+        """
+        Drain the keypad event queue and wake monitor_button if a press was released.
+        CircuitPython has no callback for keypad events, so this is called by monitor_button every
+        button_scan_interval in continuous mode, and by light sleep (on a button wake and before sleeping).
+        """
+        if self.button.update():
+            self._button_released.set()
 
 
     async def monitor_button(self) -> None:
         """
         Monitors button for short press (starts logging) or long press (initiates safe shutdown).
+        keypad debounces and timestamps presses in the background, so press durations stay exact and
+        the queue only needs draining now and then. In continuous mode this task drains it every
+        button_scan_interval (the reaction to a release comes at most that late); in low-power mode it
+        only wakes when light sleep has seen a release, since the button wakes the board.
         """
         while not self._shutdown:
-            self.button.update()  # Update button state
+            if self.power_mode == "low_power":
+                await self._button_released.wait()
+            else:
+                await asyncio.sleep(self.button_scan_interval)
+                self._scan_button()
+                if not self._button_released.is_set():
+                    continue
+            self._button_released.clear()
             held_duration = self.button.held()
 
             # Logging toggle only if not holding for shutdown
@@ -214,17 +378,36 @@ class AirQualitySensor:
             elif held_duration >= self.shutdown_hold:
                 raise KeyboardInterrupt("Button held for safe shutdown.")
 
-            await asyncio.sleep(0.01)
+
+    async def serve_transfers(self) -> None:
+        """
+        Answers SD log download requests from the host (sd_transfer.py). A transfer runs to the
+        end of its window of chunks before yielding.
+        In low-power mode they are answered while the board is awake.
+        """
+        busy_until = 0.0
+        idle_poll = self.transfer_poll_interval
+        while not self._shutdown:
+            if self.transfer.poll():
+                busy_until = time.monotonic() + self.transfer.BUSY_TIME
+                idle_poll = self.transfer_poll_interval
+            # Check for the next window often while a download is under way, without spinning the CPU;
+            # when idle, back off (doubling up to transfer_idle_poll_max) until the next request
+            if time.monotonic() < busy_until:
+                await asyncio.sleep(self.transfer_busy_poll)
+            else:
+                await asyncio.sleep(idle_poll)
+                idle_poll = min(idle_poll * 2, self.transfer_idle_poll_max)
 
 
     async def run(self) -> None:
         """
         Main function that runs all async functions concurrently.
         """
-        await asyncio.gather(
-            self.read_sensors(),
-            self.read_voc_nox_index(),
-            self.print_data(),
-            self.log_data(),
-            self.monitor_button(),
-        )
+        if self.power_mode == "low_power":
+            tasks = [self.duty_cycle(), self.monitor_button()]
+        else:
+            tasks = [self.read_sensors(), self.read_voc_nox_index(), self.publish(), self.monitor_button()]
+        if self.transfer is not None and self.transfer.available:
+            tasks.append(self.serve_transfers())
+        await asyncio.gather(*tasks)
@@ -1,36 +1,68 @@
-def load_settings(path="aqs_settings.toml"):
+import binascii
+
+CACHE_MODULE = "aqs_settings_cache"
+
+
+def load_settings(path="aqs_settings.toml", cache_module=CACHE_MODULE):
+    """Load settings, using the precompiled cache module instead of parsing when one is installed
+    and matches the TOML file. The TOML is read once either way, and only checksummed when a cache
+    module imports. Only worth deploying the cache as .mpy: test_boot_time.py measures a cold import
+    of the .py version (compiled on every boot) at several times the cost of parsing."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        print(f"Settings file '{path}' not found, using defaults.")
+        return {}
+    if cache_module:
+        try:
+            cache = __import__(cache_module)
+            if cache.SOURCE_KEY == _source_key(data):
+                return dict(cache.SETTINGS)
+        except (ImportError, AttributeError):
+            pass
+    return _parse_lines(data.decode("utf-8").split("\n"))
+
+
+def parse_settings(path="aqs_settings.toml"):
     """Parse a simple TOML file into a flat dict with 'section.key' keys.
     Supports strings, booleans, ints, and floats. Lines starting with # are comments."""
-    settings = {}
-    section = ""
     try:
         with open(path, "r") as f:
-            for line in f:
-                line = line.strip()
-                # Skip empty lines and comments
-                if not line or line.startswith("#"):
-                    continue
-                # Section header
-                if line.startswith("[") and line.endswith("]"):
-                    section = line[1:-1].strip()
-                    continue
-                # Key = value
-                if "=" not in line:
-                    continue
-                key, value = line.split("=", 1)
-                key = key.strip()
-                value = value.strip()
-                # Strip inline comments
-                for i, ch in enumerate(value):
-                    if ch == "#" and (i == 0 or value[i - 1] == " "):
-                        value = value[:i].strip()
-                        break
-                # Parse value type
-                value = _parse_value(value)
-                full_key = f"{section}.{key}" if section else key
-                settings[full_key] = value
+            return _parse_lines(f)
     except OSError:
         print(f"Settings file '{path}' not found, using defaults.")
+        return {}
+
+
+def _parse_lines(lines):
+    """parse_settings over an iterable of TOML lines."""
+    settings = {}
+    section = ""
+    for line in lines:
+        line = line.strip()
+        # Skip empty lines and comments
+        if not line or line.startswith("#"):
+            continue
+        # Section header
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1].strip()
+            continue
+        # Key = value
+        if "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        key = key.strip()
+        value = value.strip()
+        # Strip inline comments
+        for i, ch in enumerate(value):
+            if ch == "#" and (i == 0 or value[i - 1] == " "):
+                value = value[:i].strip()
+                break
+        # Parse value type
+        value = _parse_value(value)
+        full_key = f"{section}.{key}" if section else key
+        settings[full_key] = value
     return settings
 
 
@@ -58,3 +90,26 @@ def _parse_value(value):
 def get(settings, key, default=None):
     """Get a value from settings dict with a default fallback."""
     return settings.get(key, default)
+
+
+def _source_key(data):
+    """(size, crc32) of the TOML file's bytes, used to detect a stale cache.
+    Content based because copying to the board does not preserve mtimes."""
+    return (len(data), binascii.crc32(data))
+
+
+def compile_settings(path="aqs_settings.toml", out_path=CACHE_MODULE + ".py"):
+    """Write the parsed settings as an importable module (optionally mpy-cross it for the board).
+    The TOML is read once; the parse and the staleness key both come from those bytes."""
+    with open(path, "rb") as f:
+        data = f.read()
+    settings = _parse_lines(data.decode("utf-8").split("\n"))
+    with open(out_path, "w") as f:
+        f.write("# Generated by aqs_settings.compile_settings from {}; do not edit.\n".format(path))
+        f.write("SOURCE_KEY = {!r}\n".format(_source_key(data)))
+        f.write("SETTINGS = {!r}\n".format(settings))
+    return out_path
+
+
+if __name__ == "__main__":
+    print("Wrote {}".format(compile_settings()))
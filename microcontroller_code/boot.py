@@ -0,0 +1,9 @@
+"""Runs before USB starts (changes take effect after a hard reset).
+Enables the second USB serial port that sd_transfer serves SD log downloads on, only when
+[transfer] enabled is true in aqs_settings.toml; the REPL console is unchanged."""
+
+import usb_cdc # type: ignore
+
+from aqs_settings import get, load_settings
+
+usb_cdc.enable(console=True, data=bool(get(load_settings(), "transfer.enabled", False)))
@@ -1,33 +1,37 @@
-import digitalio # type: ignore
+import keypad # type: ignore
 import board # type: ignore
-import time
+
+# keypad event timestamps are supervisor.ticks_ms(), which wraps at 2**29
+_TICKS_MASK = (1 << 29) - 1
 
 class Button:
-    def __init__(self, pin=board.BUTTON, pull=digitalio.Pull.UP):
-        self._btn = digitalio.DigitalInOut(pin)
-        self._btn.direction = digitalio.Direction.INPUT
-        self._btn.pull = pull
-        self._last = self._btn.value
-        self._press_start = None
+    def __init__(self, pin=board.BUTTON, pull=True, debounce=0.02):
+        # keypad scans and debounces the pin in the background and queues timestamped
+        # press/release events, so update() does not need to run every few milliseconds
+        self._keys = keypad.Keys((pin,), value_when_pressed=False, pull=pull, interval=debounce)
+        self._event = keypad.Event()  # reused for every event, no allocation per read
+        self._press_ms = None
         self._hold_time = 0.0
-        self._released = True
 
     def update(self):
-        """Call this method frequently to update button state."""
-        current = self._btn.value
-        # Button pressed (active low)
-        if not current and self._released:
-            self._press_start = time.monotonic()
-            self._released = False
-        elif current and not self._released:
-            # Button released
-            if self._press_start is not None:
-                self._hold_time = time.monotonic() - self._press_start
-            else:
-                self._hold_time = 0.0
-            self._press_start = None
-            self._released = True
-        self._last = current
+        """Drain queued button events. Hold time is measured from the event timestamps,
+        so it is exact however long after the release this is called.
+        Returns True if a press was released (held() has a new hold time)."""
+        events = self._keys.events
+        event = self._event
+        released = False
+        while events.get_into(event):
+            if event.pressed:
+                self._press_ms = event.timestamp
+            elif self._press_ms is not None:
+                # Button released
+                self._hold_time = ((event.timestamp - self._press_ms) & _TICKS_MASK) / 1000
+                self._press_ms = None
+                released = True
+        if events.overflowed:
+            events.clear()  # missed events; don't pair a stale press with a later release
+            self._press_ms = None
+        return released
 
     def held(self):
         """Return the time the button was held (in seconds) since last release, and reset hold time."""
@@ -36,3 +40,12 @@ class Button:
             self._hold_time = 0.0
             return t
         return 0.0
+
+    @property
+    def pressed(self):
+        """True while a press seen by update() has not been released yet."""
+        return self._press_ms is not None
+
+    def deinit(self):
+        """Release the pin (e.g. so it can be used as a wake alarm during light sleep)."""
+        self._keys.deinit()
@@ -1,3 +1,6 @@
+import time
+boot_start = time.monotonic()
+
 import asyncio
 
 from led import LED
@@ -5,7 +8,7 @@ from air_quality_sensor import AirQualitySensor
 from aqs_settings import load_settings, get
 
 def main():
-    # Load settings
+    # Load settings once and share them with AirQualitySensor
     cfg = load_settings()
 
     # Initialize LED
@@ -13,7 +16,7 @@ def main():
 
     try:
         # Initialize AirQualitySensor with LED
-        with AirQualitySensor(led) as air_quality:
+        with AirQualitySensor(led, cfg, boot_start) as air_quality:
 
             try:
                 asyncio.run(air_quality.run())
@@ -0,0 +1,437 @@
+"""
+Hardware stubs for running the board code on CPython.
+
+install() registers fake CircuitPython modules (board, busio, digitalio, keypad, alarm, storage, usb_cdc, ...)
+and sensor drivers in sys.modules so air_quality_sensor, sd_logger, etc. import unchanged.
+The fakes sleep for typical hardware latencies (scaled by LATENCY_SCALE) and record a
+timeline of hardware events in EVENTS for the test_*.py harness scripts.
+"""
+
+import sys
+import time
+import types
+
+# Typical latencies (seconds) of the real parts, from datasheets and driver delays
+LATENCY = {
+    "scd4x_init": 0.5,                # driver stops periodic measurement on init
+    "scd4x_first_measurement": 5.0,   # periodic measurement interval
+    "scd4x_single_shot": 5.0,
+    "scd4x_low_periodic": 30.0,       # low-power periodic measurement interval
+    "sht4x_measure": 0.01,
+    "sgp41_init": 0.01,
+    "sgp41_measure": 0.05,
+    "pm25_init": 0.05,
+    "pm25_read": 0.01,
+    "rtc_read": 0.002,
+    "sd_mount": 0.3,
+}
+LATENCY_SCALE = 1.0
+
+# (seconds since install(), event name)
+EVENTS = []
+_t0 = time.monotonic()
+
+
+def record(name: str) -> None:
+    EVENTS.append((time.monotonic() - _t0, name))
+
+
+def _delay(name: str) -> None:
+    seconds = LATENCY[name] * LATENCY_SCALE
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+class _Anything:
+    """Attribute bag standing in for board pins and enum-like namespaces."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return _Anything(f"{self._name}.{attr}")
+
+    def __repr__(self):
+        return self._name
+
+
+# --- CircuitPython core modules ---
+
+class _DigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = None
+        self.pull = None
+        self._value = True
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        if value != self._value:
+            record(f"pin {self.pin} {'high' if value else 'low'}")
+        self._value = value
+
+    def deinit(self):
+        pass
+
+
+class _KeyEvent:
+    def __init__(self, key_number=0, pressed=True, timestamp=0):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+
+# Scheduled button edges: (monotonic time, pressed), in time order; see press_button()
+BUTTON_EDGES = []
+
+
+class _EventQueue:
+    def __init__(self, max_events=64):
+        self._events = []
+        self._max_events = max_events
+        self.overflowed = False
+
+    def _scan(self):
+        """Queue the scheduled button edges that have happened by now, as the keypad scanner would."""
+        now = time.monotonic()
+        while BUTTON_EDGES and BUTTON_EDGES[0][0] <= now:
+            at, pressed = BUTTON_EDGES.pop(0)
+            if len(self._events) >= self._max_events:
+                self.overflowed = True
+                continue
+            self._events.append((0, pressed, int(at * 1000) & ((1 << 29) - 1)))
+
+    def get_into(self, event):
+        self._scan()
+        if not self._events:
+            return False
+        event.key_number, event.pressed, event.timestamp = self._events.pop(0)
+        return True
+
+    def clear(self):
+        self._events.clear()
+        self.overflowed = False
+
+    def __len__(self):
+        self._scan()
+        return len(self._events)
+
+
+class _Keys:
+    def __init__(self, pins, *, value_when_pressed, pull=True, interval=0.02, max_events=64):
+        self.pins = pins
+        self.events = _EventQueue(max_events)
+
+    def deinit(self):
+        pass
+
+
+def ticks_ms() -> int:
+    """supervisor.ticks_ms(): milliseconds, wrapping at 2**29."""
+    return int(time.monotonic() * 1000) & ((1 << 29) - 1)
+
+
+def press_button(seconds: float, delay: float = 0.0) -> None:
+    """Schedule a button press `delay` seconds from now, released `seconds` later."""
+    at = time.monotonic() + delay
+    BUTTON_EDGES.extend(((at, True), (at + seconds, False)))
+    BUTTON_EDGES.sort()
+
+
+# --- alarm (light sleep) ---
+
+# Light sleep totals for the harness scripts
+SLEEP = {"count": 0, "seconds": 0.0, "pin_wakes": 0}
+
+
+class _TimeAlarm:
+    def __init__(self, *, monotonic_time=None, epoch_time=None):
+        self.monotonic_time = monotonic_time if monotonic_time is not None else \
+            time.monotonic() + (epoch_time - time.time())
+
+
+class _PinAlarm:
+    def __init__(self, pin, value, edge=False, pull=False):
+        self.pin = pin
+        self.value = value
+
+
+def _light_sleep_until_alarms(*alarms):
+    """Sleep until the earliest TimeAlarm, or until the next scheduled button press if a PinAlarm is set."""
+    start = time.monotonic()
+    woke, wake_at = None, float("inf")
+    for a in alarms:
+        if isinstance(a, _TimeAlarm) and a.monotonic_time < wake_at:
+            woke, wake_at = a, a.monotonic_time
+    pin_alarm = next((a for a in alarms if isinstance(a, _PinAlarm)), None)
+    press = next((at for at, pressed in BUTTON_EDGES if pressed), None)
+    if pin_alarm is not None and press is not None and press < wake_at:
+        woke, wake_at = pin_alarm, max(press, start)
+        SLEEP["pin_wakes"] += 1
+    if wake_at > start:
+        time.sleep(wake_at - start)
+    SLEEP["count"] += 1
+    SLEEP["seconds"] += time.monotonic() - start
+    return woke
+
+
+class _I2C:
+    def __init__(self, scl=None, sda=None, frequency=100_000):
+        self.frequency = frequency
+
+    def try_lock(self):
+        return True
+
+    def unlock(self):
+        pass
+
+
+class _VfsFat:
+    def __init__(self, block_device):
+        self.block_device = block_device
+
+
+def _mount(vfs, path):
+    import os
+    _delay("sd_mount")
+    os.makedirs(path, exist_ok=True)
+    record("sd mounted")
+
+
+def _umount(path):
+    record("sd unmounted")
+
+
+class _RTC:
+    def __init__(self):
+        self.datetime = time.localtime()
+
+
+class _NeoPixel:
+    def __init__(self, pin, n, brightness=1.0, auto_write=True):
+        self.pixels = [(0, 0, 0)] * n
+        self.brightness = brightness
+
+    def fill(self, color):
+        self.pixels = [color] * len(self.pixels)
+
+    def show(self):
+        pass
+
+
+# --- Sensor drivers ---
+
+class _SCD4X:
+    def __init__(self, i2c):
+        _delay("scd4x_init")
+        self._ready_at = None
+        self._interval = None
+        record("scd4x ready")
+
+    def start_periodic_measurement(self):
+        self._interval = LATENCY["scd4x_first_measurement"] * LATENCY_SCALE
+        self._ready_at = time.monotonic() + self._interval
+        record("scd4x measuring")
+
+    def start_low_periodic_measurement(self):
+        self._interval = LATENCY["scd4x_low_periodic"] * LATENCY_SCALE
+        self._ready_at = time.monotonic() + self._interval
+        record("scd4x measuring (low power)")
+
+    def stop_periodic_measurement(self):
+        self._ready_at = None
+        self._interval = None
+
+    @property
+    def data_ready(self):
+        return self._ready_at is not None and time.monotonic() >= self._ready_at
+
+    def _send_command(self, cmd, cmd_delay=0):
+        """Like the driver's: send cmd, then sleep cmd_delay. Only the single shot (0x219D) is modelled."""
+        if cmd == 0x219D:
+            record("scd4x single shot")
+            self._ready_at = time.monotonic() + LATENCY["scd4x_single_shot"] * LATENCY_SCALE
+        time.sleep(cmd_delay * LATENCY_SCALE)
+
+    def measure_single_shot(self):
+        self._send_command(0x219D, cmd_delay=LATENCY["scd4x_single_shot"])
+
+    @property
+    def CO2(self):
+        if self._interval is None:
+            self._ready_at = None  # single shot result consumed
+        elif self.data_ready:
+            self._ready_at += self._interval * ((time.monotonic() - self._ready_at) // self._interval + 1)
+        return 612
+
+    @property
+    def temperature(self):
+        return 22.5
+
+    @property
+    def relative_humidity(self):
+        return 45.0
+
+
+class _SHT4x:
+    def __init__(self, i2c):
+        record("sht4x ready")
+
+    @property
+    def temperature(self):
+        _delay("sht4x_measure")
+        return 22.37
+
+    @property
+    def relative_humidity(self):
+        return 44.81
+
+
+class _SGP41:
+    def __init__(self, i2c):
+        _delay("sgp41_init")
+        record("sgp41 ready")
+
+    def measure_raw(self, temperature=25, humidity=50):
+        _delay("sgp41_measure")
+        return 29500, 15100
+
+    def measure_index(self, temperature=25, humidity=50):
+        _delay("sgp41_measure")
+        return 100, 1
+
+
+class _PM25_I2C:
+    def __init__(self, i2c, reset_pin=None):
+        _delay("pm25_init")
+        record("pm25 ready")
+
+    def read(self):
+        _delay("pm25_read")
+        return {
+            "pm10 standard": 1, "pm25 standard": 3, "pm100 standard": 4,
+            "pm10 env": 1, "pm25 env": 3, "pm100 env": 4,
+            "particles 03um": 420, "particles 05um": 120, "particles 10um": 20,
+            "particles 25um": 2, "particles 50um": 0, "particles 100um": 0,
+        }
+
+
+class _PCF8523:
+    def __init__(self, i2c):
+        pass
+
+    @property
+    def datetime(self):
+        _delay("rtc_read")
+        return time.localtime()
+
+
+class DataPort:
+    """usb_cdc.Serial stand-in backed by a pty, so host tools can open `path` like a board's data port.
+    line_rate (bytes/s) paces writes like a real link; corrupt is the chance that a write of 512 bytes
+    or more (a transfer chunk, not a reply line) arrives with one byte flipped. POSIX only."""
+
+    def __init__(self, line_rate: float|None = None, corrupt: float = 0.0, seed: int = 0):
+        import os
+        import random
+        import tty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.path = os.ttyname(self._slave)
+        self.line_rate = line_rate
+        self.corrupt = corrupt
+        self.corrupted = 0
+        self._rng = random.Random(seed)
+        self._next_write = 0.0
+
+    @property
+    def in_waiting(self) -> int:
+        import fcntl
+        import struct
+        import termios
+        return struct.unpack("i", fcntl.ioctl(self._master, termios.FIONREAD, b"\0\0\0\0"))[0]
+
+    def read(self, n: int) -> bytes:
+        import os
+        return os.read(self._master, n)
+
+    def write(self, data) -> int:
+        import os
+        data = bytes(data)
+        if self.corrupt and len(data) >= 512 and self._rng.random() < self.corrupt:
+            i = self._rng.randrange(len(data))
+            data = data[:i] + bytes((data[i] ^ 0xFF,)) + data[i + 1:]
+            self.corrupted += 1
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._master, view):]
+        if self.line_rate:
+            now = time.monotonic()
+            self._next_write = max(self._next_write, now) + len(data) / self.line_rate
+            if self._next_write > now:
+                time.sleep(self._next_write - now)
+        return len(data)
+
+    def close(self) -> None:
+        import os
+        os.close(self._master)
+        os.close(self._slave)
+
+
+def open_data_port(line_rate: float|None = None, corrupt: float = 0.0, seed: int = 0) -> DataPort:
+    """Create a DataPort and make it usb_cdc.data, as if boot.py had enabled the data channel."""
+    port = DataPort(line_rate, corrupt, seed)
+    sys.modules["usb_cdc"].data = port
+    return port
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install(latency_scale: float = 1.0) -> None:
+    """Register the fake modules. Call before importing any board code."""
+    global LATENCY_SCALE, _t0
+    LATENCY_SCALE = latency_scale
+    _t0 = time.monotonic()
+    EVENTS.clear()
+    BUTTON_EDGES.clear()
+    SLEEP.update(count=0, seconds=0.0, pin_wakes=0)
+
+    board = _module("board", SCL="SCL", SDA="SDA", BUTTON="BUTTON", NEOPIXEL="NEOPIXEL", D5="D5", D10="D10")
+    board.SPI = lambda: "SPI"
+    _module("busio", I2C=_I2C)
+    _module("digitalio", DigitalInOut=_DigitalInOut,
+            Direction=_Anything("Direction"), Pull=_Anything("Pull"))
+    _module("keypad", Keys=_Keys, Event=_KeyEvent)
+    _module("supervisor", ticks_ms=ticks_ms)
+    alarm = _module("alarm", light_sleep_until_alarms=_light_sleep_until_alarms)
+    alarm.time = _module("alarm.time", TimeAlarm=_TimeAlarm)
+    alarm.pin = _module("alarm.pin", PinAlarm=_PinAlarm)
+    _module("storage", VfsFat=_VfsFat, mount=_mount, umount=_umount)
+    _module("sdcardio", SDCard=lambda spi, cs: "SDCard")
+    _module("rtc", RTC=_RTC)
+    _module("neopixel", NeoPixel=_NeoPixel)
+    # data is None until open_data_port(), like a board without the data channel enabled in boot.py
+    _module("usb_cdc", data=None, console=None,
+            enable=lambda console=True, data=False: record(f"usb_cdc enable data={data}"))
+
+    _module("adafruit_scd4x", SCD4X=_SCD4X)
+    _module("adafruit_sht4x", SHT4x=_SHT4x)
+    _module("adafruit_sgp41")
+    _module("adafruit_sgp41.sgp41", SGP41=_SGP41)
+    _module("adafruit_pm25")
+    _module("adafruit_pm25.i2c", PM25_I2C=_PM25_I2C)
+    _module("adafruit_pcf8523")
+    _module("adafruit_pcf8523.pcf8523", PCF8523=_PCF8523)
@@ -0,0 +1,91 @@
+"""Psychrometrics: dew point, absolute humidity and humidex from the Magnus formula.
+
+The per-sample functions use the same constants as utils.calculate_dew_point (unrounded).
+The *_batch functions evaluate the same formulas over whole columns on the host (numpy),
+for archived logs with millions of rows.
+
+Opt-in: read_sensors uses utils.calculate_dew_point. An interpolation-table version of this
+module was slower per call than math.log on CPython and cost ~2000 exp/log calls to build at
+boot, so it was dropped in favour of the formulas (see test_psychrometrics.py).
+"""
+
+import math
+
+# Magnus formula constants for water vapor over water (see utils.calculate_dew_point)
+MAGNUS_A = 17.62
+MAGNUS_B = 243.12  # °C
+MAGNUS_E0 = 6.112  # hPa, saturation vapor pressure at 0 °C
+
+# g/m3 per hPa*K: 100 Pa/hPa * 1000 g/kg / Rv (461.5 J/(kg*K))
+_AH_FACTOR = 216.68
+
+
+def _valid(temp_c, rh) -> bool:
+    return temp_c is not None and rh is not None and 0.0 < rh <= 100.0
+
+
+def _gamma(temp_c):
+    return (MAGNUS_A * temp_c) / (MAGNUS_B + temp_c)
+
+
+def _saturation_vp(temp_c):
+    return MAGNUS_E0 * math.exp(_gamma(temp_c))
+
+
+def dew_point(temp_c: float|None, rh: float|None) -> float|None:
+    """Dew point (°C) given temperature (°C) and relative humidity (%), or None if inputs are invalid."""
+    if not _valid(temp_c, rh):
+        return None
+    alpha = _gamma(temp_c) + math.log(rh / 100.0)
+    return (MAGNUS_B * alpha) / (MAGNUS_A - alpha)
+
+
+def absolute_humidity(temp_c: float|None, rh: float|None) -> float|None:
+    """Absolute humidity (g/m3) given temperature (°C) and relative humidity (%), or None if invalid."""
+    if not _valid(temp_c, rh):
+        return None
+    return _saturation_vp(temp_c) * rh / 100.0 * _AH_FACTOR / (273.15 + temp_c)
+
+
+def humidex(temp_c: float|None, rh: float|None) -> float|None:
+    """Humidex (°C) given temperature (°C) and relative humidity (%), or None if invalid."""
+    if not _valid(temp_c, rh):
+        return None
+    return temp_c + 0.5555 * (_saturation_vp(temp_c) * rh / 100.0 - 10.0)
+
+
+# Batch functions for the host. numpy is imported on first use so the board never needs it.
+def _batch_inputs(temps, rhs):
+    import numpy as np
+    t = np.asarray(temps, dtype=float)
+    rh = np.asarray(rhs, dtype=float)
+    # Invalid rows become NaN up front, so each formula runs once over the column
+    rh = np.where((rh > 0.0) & (rh <= 100.0), rh, np.nan)
+    return np, t, rh
+
+
+def dew_point_batch(temps, rhs):
+    """Dew points (°C) as a numpy array for columns of temperatures (°C) and RH (%); NaN where invalid."""
+    np, t, rh = _batch_inputs(temps, rhs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        alpha = (MAGNUS_A * t) / (MAGNUS_B + t) + np.log(rh / 100.0)
+        return (MAGNUS_B * alpha) / (MAGNUS_A - alpha)
+
+
+def _vapor_pressure_batch(np, t, rh):
+    """Vapor pressure (hPa) for numpy columns."""
+    with np.errstate(invalid="ignore", over="ignore"):
+        return MAGNUS_E0 * np.exp((MAGNUS_A * t) / (MAGNUS_B + t)) * rh / 100.0
+
+
+def absolute_humidity_batch(temps, rhs):
+    """Absolute humidities (g/m3) as a numpy array for columns of temperatures (°C) and RH (%); NaN where invalid."""
+    np, t, rh = _batch_inputs(temps, rhs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return _vapor_pressure_batch(np, t, rh) * _AH_FACTOR / (273.15 + t)
+
+
+def humidex_batch(temps, rhs):
+    """Humidex values (°C) as a numpy array for columns of temperatures (°C) and RH (%); NaN where invalid."""
+    np, t, rh = _batch_inputs(temps, rhs)
+    return t + 0.5555 * (_vapor_pressure_batch(np, t, rh) - 10.0)
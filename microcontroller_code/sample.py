@@ -0,0 +1,75 @@
+"""One set of sensor readings, allocated once and updated in place every cycle."""
+
+from utils import format_value, c_to_f
+
+class Sample:
+    """
+    Latest readings from every sensor plus the derived values the sinks share.
+    Fields are None until read (or after a failed read). format() turns them into
+    display strings once per update, however many sinks use them.
+    """
+
+    __slots__ = ("ready", "temp", "humidity", "dew_point", "co2",
+                 "voc_raw", "voc_index", "nox_raw", "nox_index",
+                 "pm", "pm10", "pm25", "pm100", "score",
+                 "seq", "_formatted_seq", "text")
+
+    # Order of the strings in Sample.text
+    FIELDS = ("temp", "humidity", "dew_point", "co2", "voc_raw", "voc_index",
+              "nox_raw", "nox_index", "pm10", "pm25", "pm100")
+
+    def __init__(self):
+        self.ready: bool = False  # set after the first full read
+        self.temp: float|None = None
+        self.humidity: float|None = None
+        self.dew_point: float|None = None
+        self.co2: int|None = None
+        self.voc_raw: int|None = None
+        self.voc_index: int|None = None
+        self.nox_raw: int|None = None
+        self.nox_index: int|None = None
+        self.pm: dict|None = None
+        self.pm10: int|None = None
+        self.pm25: int|None = None
+        self.pm100: int|None = None
+        self.score: float|None = None
+        self.seq: int = 0  # bumped by AirQualitySensor after each update
+        self._formatted_seq: int = -1
+        self.text: list = ["----"] * len(self.FIELDS)
+
+
+    def set_pm(self, pm: dict|None) -> None:
+        """Store the PM25 dict and the PM1.0 / PM2.5 / PM10 values used for display and scoring."""
+        self.pm = pm
+        if pm:
+            self.pm10 = pm.get("pm10 env")
+            self.pm25 = pm.get("pm25 env")
+            self.pm100 = pm.get("pm100 env")
+        else:
+            self.pm10 = None
+            self.pm25 = None
+            self.pm100 = None
+
+
+    def format(self, temp_unit: str = "C") -> list:
+        """Fill self.text (in FIELDS order) unless it is already current for this update."""
+        if self._formatted_seq == self.seq:
+            return self.text
+        text = self.text
+        if temp_unit == "F":
+            text[0] = format_value(c_to_f(self.temp), 2)
+            text[2] = format_value(c_to_f(self.dew_point), 2)
+        else:
+            text[0] = format_value(self.temp, 2)
+            text[2] = format_value(self.dew_point, 2)
+        text[1] = format_value(self.humidity, 2)
+        text[3] = format_value(self.co2)
+        text[4] = format_value(self.voc_raw)
+        text[5] = format_value(self.voc_index)
+        text[6] = format_value(self.nox_raw)
+        text[7] = format_value(self.nox_index)
+        text[8] = format_value(self.pm10)
+        text[9] = format_value(self.pm25)
+        text[10] = format_value(self.pm100)
+        self._formatted_seq = self.seq
+        return text
@@ -0,0 +1,31 @@
+"""Non-blocking SCD4x single shot for the Adafruit driver.
+
+The driver's measure_single_shot() sends the measure_single_shot command (0x219D) and then sleeps
+through the 5 s measurement, which would stall the asyncio loop. start_single_shot() sends the same
+command through the driver's _send_command(cmd, cmd_delay) with no delay and returns at once; the
+result is read from CO2 as usual once it is due.
+
+_send_command is private to adafruit_circuitpython_scd4x (1.x: measure_single_shot() is
+_send_command(0x219D, cmd_delay=5)), so it is only used here, and a driver without it falls back
+to the blocking call.
+"""
+
+MEASURE_SINGLE_SHOT = 0x219D
+
+
+def non_blocking(sensor) -> bool:
+    """True if start_single_shot can start a measurement on this driver without blocking."""
+    return callable(getattr(sensor, "_send_command", None))
+
+
+def start_single_shot(sensor) -> bool:
+    """
+    Start an SCD4x single shot. Returns True if it runs in the background (result due in ~5 s),
+    False if the driver has no _send_command and the blocking measure_single_shot() was used
+    instead (result ready on return).
+    """
+    if not non_blocking(sensor):
+        sensor.measure_single_shot()
+        return False
+    sensor._send_command(MEASURE_SINGLE_SHOT, cmd_delay=0)
+    return True
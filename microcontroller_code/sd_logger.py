@@ -4,10 +4,11 @@ import sdcardio # type: ignore
 import rtc # type: ignore
 
 from clock import Clock
-from utils import format_value, c_to_f
+from utils import c_to_f
 
 class SDLogger:
-    def __init__(self, i2c, led, should_print: bool = True, print_in_csv_format = False, temp_unit: str = "C"):
+    def __init__(self, i2c, led, should_print: bool = True, print_in_csv_format = False, temp_unit: str = "C",
+                 mount_path: str = "/sd"):
         # Update system clock
         self.system_rtc = rtc.RTC()
         self.clock = Clock(i2c)
@@ -18,7 +19,6 @@ class SDLogger:
         # Set up SPI and SD card
         spi = board.SPI()
         cs_pin=board.D10
-        mount_path="/sd"
         self.sdcard = sdcardio.SDCard(spi, cs_pin)
         self.mount_path = mount_path
         # Mount SD card
@@ -76,44 +76,34 @@ class SDLogger:
         return temp_c
 
 
-    def log_data(self, co2_value: int|str|None, temp_value: float|str|None, humidity_value: float|str|None,
-                       voc_raw: int|str|None, voc_index: int|str|None, nox_raw: int|str|None, nox_index: int|str|None, pm:dict|None):
+    def log_data(self, sample):
+        """Append the sample (a sample.Sample) to the current log file, values as read ('None' if missing)."""
         if not self.active or not self.file_path:
             return
-        temp = self._convert_temp(temp_value)
-        pm10 = pm.get("pm10 env") if pm else None
-        pm25 = pm.get("pm25 env") if pm else None
-        pm100 = pm.get("pm100 env") if pm else None
         with open(self.file_path, "a") as f:
-            f.write(f"{self.clock.now},{temp},{humidity_value},{co2_value},{voc_raw},{voc_index},{nox_raw},{nox_index},{pm10},{pm25},{pm100}\n")
+            f.write(f"{self.clock.now},{self._convert_temp(sample.temp)},{sample.humidity},{sample.co2},"
+                    f"{sample.voc_raw},{sample.voc_index},{sample.nox_raw},{sample.nox_index},"
+                    f"{sample.pm10},{sample.pm25},{sample.pm100}\n")
 
         if self.led:
             self.led.blink_once('blue')
 
 
-    def print_sensor_data(self, temp_c, humidity, dew_point_c, co2, voc_raw, voc_index, nox_raw, nox_index, pm10, pm25, pm100):
-        """Build and print a formatted sensor data message."""
+    def print_sensor_data(self, sample):
+        """Build and print a formatted sensor data message from a sample.Sample."""
         if not self.should_print:
             return
-        temp = format_value(self._convert_temp(temp_c), 2)
-        dp = format_value(self._convert_temp(dew_point_c), 2)
+        t = sample.format(self.temp_unit)
         if self.print_in_csv_format:
-            print(f"$AQS,{self.clock.now},{temp},{humidity},{dp},{co2},{voc_raw},{voc_index},{nox_raw},{nox_index},{pm100},{pm25},{pm10}")
+            # Only temperature and dew point are formatted; the rest go out as read ('None' if missing)
+            print(f"$AQS,{self.clock.now},{t[0]},{sample.humidity},{t[2]},{sample.co2},{sample.voc_raw},"
+                  f"{sample.voc_index},{sample.nox_raw},{sample.nox_index},{sample.pm100},{sample.pm25},{sample.pm10}")
 
         else:
             msg = ("T: {} {} RH: {}% -> DP: {} {} | CO2: {} ppm | "
                    "VOC Raw: {} VOC Index: {} | NOx Raw: {} NOx Index: {} | PM10: {} PM2.5: {} PM1.0: {}".format(
-                        temp, self.temp_unit,
-                        format_value(humidity, 2),
-                        dp, self.temp_unit,
-                        format_value(co2),
-                        format_value(voc_raw),
-                        format_value(voc_index),
-                        format_value(nox_raw),
-                        format_value(nox_index),
-                        format_value(pm100),
-                        format_value(pm25),
-                        format_value(pm10),
+                        t[0], self.temp_unit, t[1], t[2], self.temp_unit,
+                        t[3], t[4], t[5], t[6], t[7], t[10], t[9], t[8],
             ))
             self.print_with_timestamp(msg)
 
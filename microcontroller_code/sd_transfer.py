@@ -0,0 +1,135 @@
+"""SD card log download over the USB CDC data channel (enabled in boot.py), so logs can be
+fetched without removing the card. sd_download.py on the host is the client.
+
+Requests are text lines; replies are text lines, plus raw chunk bytes after each CHUNK line:
+
+    LIST                       -> FILE <name> <size> <mtime> per log_*.csv, then END <count>
+    GET <name> <offset> <n>    -> up to n of: CHUNK <offset> <length> <crc32 hex> + <length> bytes,
+                                  then END <next offset>, or EOF <size> at the end of the file
+    CRC <name> <length>        -> CRC <crc32 hex> of the first length bytes (to check a resume point)
+    anything else / failures   -> ERR <message>
+
+The host asks for a window of n chunks at a time and re-requests from the first chunk whose CRC
+doesn't match, so a corrupted or interrupted transfer resumes without starting over.
+"""
+
+import os
+import binascii
+
+class SDTransfer:
+    """Serves LIST / GET / CRC requests for the logs in mount_path."""
+
+    MAX_REQUEST = 128  # bytes; longer request lines are discarded
+    BUSY_TIME = 1.0  # seconds to keep polling every BUSY_POLL after a request, while the host sends the next
+    BUSY_POLL = 0.005  # seconds; short enough not to slow a download, long enough to let the CPU idle
+
+    def __init__(self, mount_path: str, port=None, chunk_size: int = 4096):
+        """port: a usb_cdc.Serial-like object; defaults to usb_cdc.data (None if boot.py didn't enable it)."""
+        if port is None:
+            import usb_cdc # type: ignore
+            port = usb_cdc.data
+        self.port = port
+        self.mount_path = mount_path
+        self.chunk_size = chunk_size
+        self._buf = bytearray(chunk_size)
+        self._view = memoryview(self._buf)
+        self._request = bytearray()
+
+    @property
+    def available(self) -> bool:
+        return self.port is not None
+
+
+    def poll(self) -> bool:
+        """Handle every complete request line waiting on the port. Returns at once if there is none.
+        Returns True if any request was handled."""
+        port = self.port
+        if port is None:
+            return False
+        waiting = port.in_waiting
+        if not waiting:
+            return False
+        self._request += port.read(waiting)
+        handled = False
+        while True:
+            end = self._request.find(b"\n")
+            if end < 0:
+                if len(self._request) > self.MAX_REQUEST:
+                    self._request = bytearray()
+                return handled
+            line = bytes(self._request[:end]).decode("utf-8", "replace").strip()
+            self._request = self._request[end + 1:]
+            if line:
+                self.handle(line)
+                handled = True
+
+
+    def handle(self, line: str) -> None:
+        """Run one request line and write its reply."""
+        parts = line.split()
+        try:
+            if parts[0] == "LIST" and len(parts) == 1:
+                self._list()
+            elif parts[0] == "GET" and len(parts) == 4:
+                self._get(self._path(parts[1]), int(parts[2]), int(parts[3]))
+            elif parts[0] == "CRC" and len(parts) == 3:
+                self._crc(self._path(parts[1]), int(parts[2]))
+            else:
+                self._reply(f"ERR unknown request: {line[:40]}")
+        except (OSError, ValueError) as e:
+            self._reply(f"ERR {e}")
+
+
+    def _reply(self, text: str) -> None:
+        self.port.write(text.encode("utf-8") + b"\n")
+
+
+    def _path(self, name: str) -> str:
+        """Full path of a log file name, refusing anything that isn't a log in mount_path."""
+        if not (name.startswith("log_") and name.endswith(".csv")) or "/" in name or ".." in name:
+            raise ValueError(f"not a log file: {name}")
+        return f"{self.mount_path}/{name}"
+
+
+    def _list(self) -> None:
+        count = 0
+        for name in sorted(os.listdir(self.mount_path)):
+            if not (name.startswith("log_") and name.endswith(".csv")):
+                continue
+            st = os.stat(f"{self.mount_path}/{name}")
+            self._reply(f"FILE {name} {st[6]} {int(st[8])}")
+            count += 1
+        self._reply(f"END {count}")
+
+
+    def _get(self, path: str, offset: int, chunks: int) -> None:
+        size = os.stat(path)[6]
+        if offset < 0 or offset > size:
+            raise ValueError(f"offset {offset} outside 0..{size}")
+        port = self.port
+        view = self._view
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for _ in range(chunks):
+                n = f.readinto(self._buf) if offset < size else 0
+                if not n:
+                    self._reply(f"EOF {offset}")
+                    return
+                data = view[:n]
+                self._reply(f"CHUNK {offset} {n} {binascii.crc32(data) & 0xFFFFFFFF:08x}")
+                port.write(data)
+                offset += n
+        self._reply(f"END {offset}" if offset < size else f"EOF {offset}")
+
+
+    def _crc(self, path: str, length: int) -> None:
+        crc = 0
+        with open(path, "rb") as f:
+            while length > 0:
+                n = f.readinto(self._buf)
+                if not n:
+                    raise ValueError("length past end of file")
+                n = min(n, length)
+                crc = binascii.crc32(self._view[:n], crc)
+                length -= n
+        self._reply(f"CRC {crc & 0xFFFFFFFF:08x}")
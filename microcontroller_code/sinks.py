@@ -0,0 +1,133 @@
+"""Sinks fed from the shared Sample: console, SD card, air score / LED and an in-memory ring buffer.
+
+Each sink runs on its own interval; which sinks run, and in what order, comes from the
+[sinks] section of aqs_settings.toml. Sinks read the Sample in place and allocate nothing per write
+beyond the strings they output.
+"""
+
+from array import array
+
+from sample import Sample
+from utils import calculate_air_score, calculate_color_by_score
+from aqs_settings import get
+
+class ScoreSink:
+    """Air score into sample.score, shown on the LED while not logging (logging uses the LED for blinks)."""
+
+    def __init__(self, sd_logger):
+        self.sd_logger = sd_logger
+
+    def write(self, sample: Sample) -> None:
+        sample.score = calculate_air_score(sample.co2, sample.temp, sample.humidity,
+                                           sample.voc_index, sample.nox_index, sample.pm)
+        if not self.sd_logger.active:
+            self.sd_logger.led.set_color(calculate_color_by_score(sample.score))
+
+
+class ConsoleSink:
+    """Serial console output ($AQS CSV or text, per display settings)."""
+
+    def __init__(self, sd_logger):
+        self.sd_logger = sd_logger
+
+    def write(self, sample: Sample) -> None:
+        self.sd_logger.print_sensor_data(sample)
+
+
+class SDSink:
+    """Rows in the current SD card log file; does nothing while logging is off."""
+
+    def __init__(self, sd_logger):
+        self.sd_logger = sd_logger
+
+    def write(self, sample: Sample) -> None:
+        self.sd_logger.log_data(sample)
+
+
+class RingBufferSink:
+    """The last `size` samples of each numeric field (plus the score) in preallocated float arrays.
+    Missing readings are stored as NaN."""
+
+    FIELDS = Sample.FIELDS + ("score",)
+
+    def __init__(self, size: int = 720):
+        self.size = size
+        self.count = 0  # samples written so far (the buffer holds the last min(count, size))
+        self._next = 0
+        self._columns = {name: array("f", [float("nan")] * size) for name in self.FIELDS}
+
+    def write(self, sample: Sample) -> None:
+        i = self._next
+        for name, column in self._columns.items():
+            value = getattr(sample, name)
+            column[i] = float("nan") if value is None else value
+        self._next = (i + 1) % self.size
+        self.count += 1
+
+    def values(self, name: str):
+        """Stored values of one field, oldest first."""
+        column = self._columns[name]
+        n = min(self.count, self.size)
+        start = (self._next - n) % self.size
+        for k in range(n):
+            yield column[(start + k) % self.size]
+
+
+class SinkPipeline:
+    """Runs each sink when its interval has elapsed."""
+
+    def __init__(self, sinks: list):
+        """sinks: list of (name, sink, interval seconds), in the order they run."""
+        self.names = [name for name, _, _ in sinks]
+        self.sinks = [sink for _, sink, _ in sinks]
+        self.intervals = [interval for _, _, interval in sinks]
+        self._due = [0.0] * len(sinks)
+
+    def get(self, name: str):
+        """The sink registered under name, or None if it is not enabled."""
+        return self.sinks[self.names.index(name)] if name in self.names else None
+
+    def write_due(self, sample: Sample, now: float) -> float:
+        """Write the sample to every sink that is due. Returns seconds until the next one is due."""
+        due = self._due
+        wait = None
+        for i, sink in enumerate(self.sinks):
+            if now >= due[i]:
+                sink.write(sample)
+                # Keep the cadence, but after a stall (or the first write) restart it from now
+                # rather than writing again straight away to catch up
+                due[i] += self.intervals[i]
+                if due[i] <= now:
+                    due[i] = now + self.intervals[i]
+            remaining = due[i] - now
+            if wait is None or remaining < wait:
+                wait = remaining
+        return 1.0 if wait is None else wait
+
+    def write_all(self, sample: Sample) -> None:
+        """Write the sample to every sink now (one-sample-per-cycle low-power mode)."""
+        for sink in self.sinks:
+            sink.write(sample)
+
+
+def build_sinks(cfg: dict, sd_logger) -> SinkPipeline:
+    """Create the sinks named in sinks.enabled, with their intervals from [intervals]."""
+    print_interval = get(cfg, "intervals.print", 5.0)
+    factories = {
+        "score": (lambda: ScoreSink(sd_logger), get(cfg, "intervals.score", print_interval)),
+        "console": (lambda: ConsoleSink(sd_logger), print_interval),
+        "sd": (lambda: SDSink(sd_logger), get(cfg, "intervals.log", 5.0)),
+        "ring": (lambda: RingBufferSink(get(cfg, "sinks.ring_size", 720)),
+                 get(cfg, "intervals.ring", get(cfg, "intervals.sensor", 5.0))),
+    }
+    sinks = []
+    for name in get(cfg, "sinks.enabled", "score,console,sd").split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in factories:
+            sd_logger.log_info(msg=f"Unknown sink '{name}' in settings, skipped.", color='red')
+            continue
+        factory, interval = factories[name]
+        sinks.append((name, factory(), interval))
+    return SinkPipeline(sinks)
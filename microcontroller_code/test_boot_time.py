@@ -0,0 +1,87 @@
+"""
+Boot-to-first-sample timing on CPython using the hardware stubs in hw_stubs.py
+"""
+import hw_stubs
+hw_stubs.install()
+
+import asyncio
+import importlib
+import os
+import py_compile
+import sys
+import tempfile
+import time
+
+boot_start = time.monotonic()
+
+from aqs_settings import load_settings, parse_settings, compile_settings
+from led import LED
+from air_quality_sensor import AirQualitySensor
+
+
+def time_settings(repeats=200):
+    """Compare parsing the TOML with a cold import of the cache module (popped from sys.modules
+    each time, as at boot): from source, compiled on every import like a .py on the board, and
+    precompiled to a sourceless .pyc, standing in for an .mpy."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parse_settings()
+    parse_us = (time.perf_counter() - start) / repeats * 1e6
+
+    cache_us = []
+    with tempfile.TemporaryDirectory() as tmp:
+        source = compile_settings(out_path=os.path.join(tmp, "aqs_settings_cache.py"))
+        sys_path = list(sys.path)
+        sys.path.insert(0, tmp)
+        dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = True
+        try:
+            for precompiled in (False, True):
+                if precompiled:
+                    py_compile.compile(source, cfile=source + "c")
+                    os.remove(source)
+                importlib.invalidate_caches()
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    sys.modules.pop("aqs_settings_cache", None)
+                    load_settings()
+                cache_us.append((time.perf_counter() - start) / repeats * 1e6)
+                if not sys.modules["aqs_settings_cache"].__file__.endswith(".pyc" if precompiled else ".py"):
+                    raise RuntimeError("cache module imported from the wrong file")
+        finally:
+            sys.path[:] = sys_path
+            sys.dont_write_bytecode = dont_write_bytecode
+            sys.modules.pop("aqs_settings_cache", None)
+    return parse_us, cache_us[0], cache_us[1]
+
+
+async def until_first_sample(air_quality):
+    task = asyncio.create_task(air_quality.run())
+    while air_quality.first_sample_s is None:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+with tempfile.TemporaryDirectory() as sd_dir:
+    cfg = load_settings()
+    cfg["sd.mount_path"] = sd_dir
+    cfg["display.should_print"] = False
+    led = LED(brightness=0.0)
+    with AirQualitySensor(led, cfg, boot_start) as air_quality:
+        init_done = time.monotonic() - boot_start
+        asyncio.run(until_first_sample(air_quality))
+
+print("Boot timeline (s since stubs installed):")
+for t, name in hw_stubs.EVENTS:
+    print(f"{t:7.3f}\t{name}")
+print(f"\nAirQualitySensor ready after {init_done:.2f} s")
+print(f"Boot to first sample: {air_quality.first_sample_s:.2f} s "
+      f"(SCD4x first measurement alone takes {hw_stubs.LATENCY['scd4x_first_measurement']:.1f} s)")
+
+parse_us, source_us, compiled_us = time_settings()
+print(f"\nSettings (CPython, cold import each time): parse TOML {parse_us:.0f} us, "
+      f"cache module from source {source_us:.0f} us, precompiled {compiled_us:.0f} us")
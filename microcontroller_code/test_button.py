@@ -0,0 +1,81 @@
+"""
+Button handling on CPython using the keypad stub in hw_stubs.py: short press toggles logging,
+long press shuts down, and the reaction time is bounded by button.scan_interval, independent of the
+sensor intervals (the monitor task drains the keypad queue on its own cadence instead of 10 ms polling)
+"""
+import hw_stubs
+hw_stubs.install(latency_scale=0.0)
+
+import asyncio
+import tempfile
+import time
+
+from aqs_settings import load_settings
+from led import LED
+from air_quality_sensor import AirQualitySensor
+
+
+async def react(air_quality, hold, latencies):
+    """Press for hold seconds and wait for the log toggle (recording its delay after the release)."""
+    toggles.clear()
+    released = time.monotonic() + hold
+    hw_stubs.press_button(hold)
+    while not toggles and time.monotonic() - released < 5.0:
+        await asyncio.sleep(0.01)
+    if toggles:
+        latencies.append(toggles[0] - released)
+
+
+async def press_sequence(air_quality, latencies):
+    await asyncio.sleep(0.5)
+    await react(air_quality, 0.3, latencies)
+    print(f"Short press (0.3 s): logging {'started' if air_quality._logging else 'NOT started'}")
+    await react(air_quality, 1.5, latencies)
+    print(f"Short press (1.5 s): logging {'stopped' if not air_quality._logging else 'NOT stopped'}")
+    hw_stubs.press_button(air_quality.shutdown_hold + 0.5)
+
+
+async def scenario(air_quality, latencies):
+    presses = asyncio.create_task(press_sequence(air_quality, latencies))
+    try:
+        await air_quality.monitor_button()
+        print("Long press: no shutdown requested")
+    except KeyboardInterrupt:
+        print(f"Long press ({air_quality.shutdown_hold + 0.5:g} s): shutdown requested")
+    await presses
+
+
+with tempfile.TemporaryDirectory() as sd_dir:
+    cfg = load_settings()
+    cfg["sd.mount_path"] = sd_dir
+    cfg["display.should_print"] = False
+    cfg["intervals.voc_index"] = 30.0  # slow sensor loop: must not delay the button
+    air_quality = AirQualitySensor(LED(brightness=0.0), cfg)
+
+    # Count how often the monitor task wakes to scan the keypad queue
+    scans = [0]
+    scan = air_quality._scan_button
+    def counted_scan():
+        scans[0] += 1
+        scan()
+    air_quality._scan_button = counted_scan
+
+    # Record when monitor_button starts / stops a log (before the LED blink it does afterwards)
+    toggles = []
+    for name in ("start_new_log", "stop_log"):
+        def recorded(toggle=getattr(air_quality.sd_logger, name)):
+            toggles.append(time.monotonic())
+            toggle()
+        setattr(air_quality.sd_logger, name, recorded)
+
+    latencies = []
+    start = time.monotonic()
+    asyncio.run(scenario(air_quality, latencies))
+    elapsed = time.monotonic() - start
+    air_quality.safe_shutdown()
+
+bound = air_quality.button_scan_interval
+worst = max(latencies) if latencies else float("nan")
+print(f"\nReaction after release: worst {worst:.2f} s, bound {bound:g} s (button.scan_interval) with a "
+      f"{cfg['intervals.voc_index']:g} s VOC/NOx interval ({'OK' if worst <= bound + 0.05 else 'FAIL'})")
+print(f"Button task wakeups: {scans[0] / elapsed:.1f}/s, was 100/s with 10 ms polling")
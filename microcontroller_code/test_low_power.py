@@ -0,0 +1,91 @@
+"""
+Low-power duty cycle on CPython using the hardware stubs in hw_stubs.py.
+Time is compressed by SCALE (hardware latencies and the [power] timings alike), so the
+reported fractions and per-hour rates are those of the real cadence.
+"""
+import hw_stubs
+
+SCALE = 0.005  # 300 s cycle -> 1.5 s
+CYCLES = 12
+hw_stubs.install(latency_scale=SCALE)
+
+import asyncio
+import tempfile
+import time
+
+from aqs_settings import load_settings
+from led import LED
+from air_quality_sensor import AirQualitySensor
+
+
+async def snapshot(at, into):
+    """Record (event time, light sleep totals) at a point of the run; presses are kept out of the window
+    because they are human-length, not time-compressed."""
+    await asyncio.sleep(max(at - time.monotonic(), 0.0))
+    hw_stubs.record("snapshot")
+    into.append((hw_stubs.EVENTS[-1][0], dict(hw_stubs.SLEEP)))
+
+
+async def scenario(air_quality, window):
+    cycle = air_quality.power_cycle
+    start = time.monotonic()
+    # Short press while asleep in the second cycle (starts logging), long press to stop
+    hw_stubs.press_button(0.3, delay=cycle * 1.5)
+    hw_stubs.press_button(air_quality.shutdown_hold + 0.5, delay=cycle * (CYCLES + 2.5))
+    snapshots = [asyncio.create_task(snapshot(start + cycle * 2.5, window)),
+                 asyncio.create_task(snapshot(start + cycle * (CYCLES + 2.5) - 0.2, window))]
+    duty = asyncio.create_task(air_quality.duty_cycle())
+    try:
+        await air_quality.monitor_button()  # raises KeyboardInterrupt on the long press
+    except KeyboardInterrupt:
+        pass
+    duty.cancel()
+    try:
+        await duty
+    except asyncio.CancelledError:
+        pass
+    await asyncio.gather(*snapshots)
+
+
+def on_seconds(pin, t0, t1):
+    """Seconds the pin was driven high between t0 and t1, from the stub's event timeline."""
+    on_s, since = 0.0, None
+    for t, name in hw_stubs.EVENTS:
+        if name == f"pin {pin} high":
+            since = t
+        elif name == f"pin {pin} low" and since is not None:
+            on_s += max(min(t, t1) - max(since, t0), 0.0)
+            since = None
+    return on_s
+
+
+with tempfile.TemporaryDirectory() as sd_dir:
+    cfg = load_settings()
+    cfg["sd.mount_path"] = sd_dir
+    cfg["display.should_print"] = False
+    cfg["power.mode"] = "low_power"
+    cfg["power.pm_set_pin"] = "D5"
+    for key in ("power.cycle", "power.pm_warmup", "power.min_sleep", "power.single_shot_time"):
+        cfg[key] = cfg[key] * SCALE
+    led = LED(brightness=0.0)
+    # The log-write LED blink sleeps in real time; compress it like everything else
+    led.blink_once = lambda color='red', duration=0.25: LED.blink_once(led, color, duration * SCALE)
+    air_quality = AirQualitySensor(led, cfg)
+    window = []
+    asyncio.run(scenario(air_quality, window))
+    logged = air_quality._logging
+    air_quality.safe_shutdown()
+
+(t0, sleep0), (t1, sleep1) = window
+elapsed = t1 - t0
+events = [name for t, name in hw_stubs.EVENTS if t0 <= t <= t1]
+hours = elapsed / SCALE / 3600
+awake = 1.0 - (sleep1["seconds"] - sleep0["seconds"]) / elapsed
+print(f"Measured {elapsed / SCALE / 60:.0f} simulated min at a {air_quality.power_cycle / SCALE:g} s cycle "
+      f"({events.count('pin D5 high')} cycles, {events.count('scd4x single shot')} SCD4x single shots)")
+print(f"Logging started by a press during sleep: {'yes' if logged else 'no'} "
+      f"({sleep1['pin_wakes']} button wakes, including the shutdown press)")
+print(f"Awake (not in light sleep): {awake:.1%} of the time")
+print(f"PM sensor powered: {on_seconds('D5', t0, t1) / elapsed:.1%} of the time")
+print(f"Wakes per hour: {(sleep1['count'] - sleep0['count']) / hours:.0f} "
+      f"(continuous mode: always awake, PM always on, VOC/NOx loop 1x/s, button scan 4x/s)")
@@ -0,0 +1,81 @@
+"""
+Accuracy and speed report for psychrometrics.py: the numpy batch functions against the per-sample
+formulas, and against utils.calculate_dew_point
+"""
+import math
+import random
+import time
+
+from utils import calculate_dew_point
+from psychrometrics import (
+    dew_point, absolute_humidity, humidex,
+    dew_point_batch, absolute_humidity_batch, humidex_batch,
+)
+
+
+def per_call_ns(fn, pairs):
+    start = time.perf_counter()
+    for t, rh in pairs:
+        fn(t, rh)
+    return (time.perf_counter() - start) / len(pairs) * 1e9
+
+
+def archive_columns(n, seed=1):
+    """Random-walk T/RH quantized to 0.01, like logged SHT4x readings."""
+    rng = random.Random(seed)
+    t, rh = 22.0, 45.0
+    temps, rhs = [], []
+    for _ in range(n):
+        t = min(max(t + rng.gauss(0, 0.02), 15.0), 30.0)
+        rh = min(max(rh + rng.gauss(0, 0.05), 20.0), 70.0)
+        temps.append(round(t, 2))
+        rhs.append(round(rh, 2))
+    return temps, rhs
+
+
+def accuracy_report(n=100_000):
+    """Batch results against the per-sample functions over the SHT4x range, plus invalid rows."""
+    rng = random.Random(0)
+    temps = [rng.uniform(-40.0, 85.0) for _ in range(n)]
+    rhs = [rng.uniform(0.5, 100.0) for _ in range(n)]
+    print("Batch vs per-sample formulas (T -40..85 C, RH 0.5..100 %):")
+    for name, single, batch in (
+        ("Dew point (C)", dew_point, dew_point_batch),
+        ("Abs humidity (g/m3)", absolute_humidity, absolute_humidity_batch),
+        ("Humidex (C)", humidex, humidex_batch),
+    ):
+        got = batch(temps, rhs).tolist()
+        worst = max(abs(g - single(t, rh)) for g, t, rh in zip(got, temps, rhs))
+        invalid = batch([20.0, 20.0, 20.0], [0.0, -5.0, 101.0]).tolist()
+        nan_ok = all(math.isnan(v) for v in invalid)
+        print(f"{name:<20}\tmax error {worst:.2e}\tinvalid RH -> NaN: {'OK' if nan_ok else 'FAIL'}")
+
+
+def per_sample_report(n=200_000):
+    rng = random.Random(0)
+    pairs = [(rng.uniform(-40.0, 85.0), rng.uniform(5.0, 100.0)) for _ in range(n)]
+    print("\nPer-sample cost (CPython):")
+    print(f"utils.calculate_dew_point\t{per_call_ns(calculate_dew_point, pairs):.0f} ns/call")
+    print(f"psychrometrics.dew_point\t{per_call_ns(dew_point, pairs):.0f} ns/call (unrounded)")
+
+
+def batch_report(n=1_000_000):
+    """calculate_dew_point in a loop vs dew_point_batch over n archive-like rows (host, numpy)."""
+    temps, rhs = archive_columns(n)
+    start = time.perf_counter()
+    reference = [calculate_dew_point(t, rh) for t, rh in zip(temps, rhs)]
+    loop_s = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = dew_point_batch(temps, rhs)
+    batch_s = time.perf_counter() - start
+    worst = max(abs(a - b) for a, b in zip(batch.tolist(), reference))
+    print(f"\nBatch over {n} archived rows (host, numpy):")
+    print(f"calculate_dew_point loop\t{loop_s:.3f} s")
+    print(f"dew_point_batch\t\t\t{batch_s:.3f} s ({loop_s / batch_s:.1f}x)")
+    print(f"max |batch - calculate_dew_point| = {worst:.4f} C (reference rounds to 0.01)")
+
+
+if __name__ == "__main__":
+    accuracy_report()
+    per_sample_report()
+    batch_report()
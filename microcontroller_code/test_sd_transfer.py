@@ -0,0 +1,161 @@
+"""
+SD log download protocol (sd_transfer.py) on CPython using the data port stub in hw_stubs.py:
+LIST / GET / CRC replies and errors as the host sees them, chunk CRCs catching corruption, and how
+often AirQualitySensor.serve_transfers polls while idle (backing off) and during a download. POSIX only.
+"""
+import hw_stubs
+hw_stubs.install(latency_scale=0.0)
+
+import asyncio
+import binascii
+import os
+import select
+import tempfile
+import threading
+import time
+
+from aqs_settings import load_settings
+from led import LED
+from air_quality_sensor import AirQualitySensor
+from sd_transfer import SDTransfer
+
+
+class Host:
+    """The host end of a DataPort: request lines out, reply lines and chunk bytes in."""
+
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        self.buf = b""
+
+    def request(self, line):
+        os.write(self.fd, line.encode() + b"\n")
+
+    def _fill(self, timeout=5.0):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            raise TimeoutError("no reply from the board")
+        self.buf += os.read(self.fd, 65536)
+
+    def readline(self):
+        while b"\n" not in self.buf:
+            self._fill()
+        line, self.buf = self.buf.split(b"\n", 1)
+        return line.decode()
+
+    def read(self, n):
+        while len(self.buf) < n:
+            self._fill()
+        data, self.buf = self.buf[:n], self.buf[n:]
+        return data
+
+    def get(self, name, offset, chunks):
+        """One GET: (data of the chunks that passed their CRC, offsets of those that didn't, last line)."""
+        self.request(f"GET {name} {offset} {chunks}")
+        data, bad = b"", []
+        while True:
+            parts = self.readline().split()
+            if parts[0] != "CHUNK":
+                return data, bad, " ".join(parts)
+            chunk = self.read(int(parts[2]))
+            if f"{binascii.crc32(chunk):08x}" == parts[3]:
+                data += chunk
+            else:
+                bad.append(int(parts[1]))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def check(label, ok, detail=""):
+    print(f"{label}: {'OK' if ok else 'FAIL'}{f' ({detail})' if detail else ''}")
+
+
+def serve_in_thread(air_quality):
+    thread = threading.Thread(target=asyncio.run, args=(air_quality.serve_transfers(),), daemon=True)
+    thread.start()
+    return thread
+
+
+with tempfile.TemporaryDirectory() as sd_dir:
+    logs = {"log_2026-01-01_00-00-00.csv": os.urandom(50_000), "log_2026-01-02_00-00-00.csv": b"timestamp\n"}
+    for name, content in logs.items():
+        with open(os.path.join(sd_dir, name), "wb") as f:
+            f.write(content)
+    with open(os.path.join(sd_dir, "notes.txt"), "w") as f:
+        f.write("not a log")
+
+    cfg = load_settings()
+    cfg["sd.mount_path"] = sd_dir
+    cfg["display.should_print"] = False
+    air_quality = AirQualitySensor(LED(brightness=0.0), cfg)
+    port = hw_stubs.open_data_port()
+    air_quality.transfer = SDTransfer(sd_dir, port, chunk_size=4096)
+    polls = [0]
+    poll = air_quality.transfer.poll
+    def counted_poll():
+        polls[0] += 1
+        return poll()
+    air_quality.transfer.poll = counted_poll
+    serving = serve_in_thread(air_quality)
+    host = Host(port.path)
+
+    polls[0] = 0
+    idle_time = 4.0 * air_quality.transfer_idle_poll_max
+    time.sleep(idle_time)
+    idle_rate = polls[0] / idle_time
+
+    name = "log_2026-01-01_00-00-00.csv"
+    content = logs[name]
+    # After a long idle spell the first request waits at most one backed-off poll interval
+    started = time.monotonic()
+    host.request("LIST")
+    listing = [host.readline()]
+    first_reply = time.monotonic() - started
+    listing += [host.readline() for _ in range(2)]
+    check("First request after idling answered within transfer.idle_poll_max",
+          first_reply <= air_quality.transfer_idle_poll_max + 0.1, f"{first_reply:.2f} s")
+    check("LIST", [line.split()[:3] for line in listing] ==
+          [["FILE", n, str(len(c))] for n, c in sorted(logs.items())] + [["END", "2"]], "; ".join(listing))
+
+    polls[0] = 0
+    started = time.monotonic()
+    data, bad, last = host.get(name, 0, 4)
+    while last.startswith("END"):
+        more, more_bad, last = host.get(name, int(last.split()[1]), 4)
+        data += more
+        bad += more_bad
+    busy_rate = polls[0] / (time.monotonic() - started)
+    check("GET whole file in windows of 4 chunks", data == content and not bad and last == f"EOF {len(content)}", last)
+    data, _, last = host.get(name, 40_000, 1)
+    check("GET from an offset", data == content[40_000:44_096] and last == "END 44096", last)
+    _, _, last = host.get(name, len(content), 4)
+    check("GET at the end of the file", last == f"EOF {len(content)}", last)
+
+    host.request(f"CRC {name} 12345")
+    reply = host.readline()
+    check("CRC of a prefix", reply == f"CRC {binascii.crc32(content[:12345]):08x}", reply)
+
+    for request, expected in ((f"GET {name} {len(content) + 1} 1", "ERR offset"),
+                              ("GET ../aqs_settings.toml 0 1", "ERR not a log file"),
+                              ("GET notes.txt 0 1", "ERR not a log file"),
+                              (f"CRC {name} {len(content) + 1}", "ERR length past end"),
+                              ("GET log_missing.csv 0 1", "ERR"),
+                              ("DELETE everything", "ERR unknown request")):
+        host.request(request)
+        reply = host.readline()
+        check(f"{request!r} refused", reply.startswith(expected), reply)
+
+    # Every chunk write corrupted in transit: the host must see every chunk fail its CRC
+    port.corrupt = 1.0
+    data, bad, last = host.get(name, 0, 4)
+    port.corrupt = 0.0
+    check("Corrupted chunks caught by their CRC", not data and bad == [0, 4096, 8192, 12288], f"{port.corrupted} corrupted")
+
+    air_quality._shutdown = True
+    serving.join(timeout=2.0)
+    host.close()
+    port.close()
+    air_quality.safe_shutdown()
+
+print(f"\nserve_transfers polls: {idle_rate:.1f}/s over {idle_time:g} s idle (backing off from "
+      f"{air_quality.transfer_poll_interval:g} s to {air_quality.transfer_idle_poll_max:g} s, was 4/s), "
+      f"{busy_rate:.0f}/s during a download (busy poll {air_quality.transfer_busy_poll:g} s, was a busy spin)")
@@ -0,0 +1,105 @@
+"""
+SCD4x single shot in the low-power duty cycle (scd4x_single_shot.py) on CPython using the hardware stubs:
+the command is sent without blocking the event loop, a driver without _send_command falls back to the
+blocking measure_single_shot (with a startup warning) and still gets its reading, and the air score
+colour stays on the LED between cycles while not logging.
+"""
+import hw_stubs
+
+SCALE = 0.01  # 5 s single shot -> 50 ms
+hw_stubs.install(latency_scale=SCALE)
+
+import asyncio
+import sys
+import tempfile
+import time
+
+from aqs_settings import load_settings
+from led import LED
+from air_quality_sensor import AirQualitySensor
+from sd_logger import SDLogger
+
+StubSCD4X = sys.modules["adafruit_scd4x"].SCD4X
+
+
+class BlockingOnlySCD4X:
+    """The stub driver without _send_command, like a driver version that only has measure_single_shot."""
+
+    def __init__(self, i2c):
+        self._driver = StubSCD4X(i2c)
+
+    def __getattr__(self, name):
+        if name == "_send_command":
+            raise AttributeError(name)
+        return getattr(self._driver, name)
+
+
+def check(label, ok, detail=""):
+    print(f"{label}: {'OK' if ok else 'FAIL'}{f' ({detail})' if detail else ''}")
+
+
+def one_cycle(driver, sinks="score,console,sd"):
+    """Run the duty cycle for one cycle with the given SCD4x driver class.
+    Returns (sensor, seconds spent starting each single shot, log messages)."""
+    sys.modules["adafruit_scd4x"].SCD4X = driver
+    with tempfile.TemporaryDirectory() as sd_dir:
+        cfg = load_settings()
+        cfg["sd.mount_path"] = sd_dir
+        cfg["display.should_print"] = False
+        cfg["power.mode"] = "low_power"
+        cfg["power.scd4x"] = "single_shot"
+        cfg["sinks.enabled"] = sinks
+        for key in ("power.cycle", "power.pm_warmup", "power.min_sleep", "power.single_shot_time"):
+            cfg[key] = cfg[key] * SCALE
+        messages = []
+        # Collect the messages logged during construction too
+        log_info = SDLogger.log_info
+        SDLogger.log_info = lambda self, msg, color=None: messages.append(msg)
+        try:
+            air_quality = AirQualitySensor(LED(brightness=0.0), cfg)
+        finally:
+            SDLogger.log_info = log_info
+        air_quality.sd_logger.log_info = lambda msg, color=None: messages.append(msg)
+
+        starting = [0.0, 0]  # seconds, single shots
+        start_single_shot = air_quality._start_single_shot
+        def timed_start():
+            started = time.monotonic()
+            try:
+                return start_single_shot()
+            finally:
+                starting[0] += time.monotonic() - started
+                starting[1] += 1
+        air_quality._start_single_shot = timed_start
+
+        async def run():
+            cycle = asyncio.create_task(air_quality.duty_cycle())
+            # Stop after the first reading (light sleep blocks the loop, so a second cycle may start first)
+            while not air_quality.sample.ready:
+                await asyncio.sleep(air_quality.min_sleep)
+            air_quality._shutdown = True
+            await cycle
+        asyncio.run(run())
+        air_quality.safe_shutdown()
+    sys.modules["adafruit_scd4x"].SCD4X = StubSCD4X
+    return air_quality, starting[0] / max(starting[1], 1), messages
+
+
+shot = hw_stubs.LATENCY["scd4x_single_shot"] * SCALE
+
+air_quality, starting, messages = one_cycle(StubSCD4X)
+check("Single shot started without blocking", starting < shot / 5, f"{starting * 1000:.1f} ms")
+check("CO2 read after the single shot", air_quality.sample.co2 == 612, air_quality.sample.co2)
+check("No blocking warning with _send_command", not any("_send_command" in m for m in messages))
+pixel = air_quality.sd_logger.led.pixels.pixels[0]
+check("Air score colour left on the LED while not logging", pixel != (0, 0, 0), pixel)
+
+air_quality, starting, messages = one_cycle(BlockingOnlySCD4X)
+check("Fallback: measure_single_shot blocks for the measurement", starting >= shot * 0.9, f"{starting * 1000:.1f} ms")
+check("Fallback: CO2 read", air_quality.sample.co2 == 612, air_quality.sample.co2)
+check("Fallback: warning logged at startup", any("_send_command" in m for m in messages),
+      next((m for m in messages if "_send_command" in m), "no warning"))
+
+air_quality, _, _ = one_cycle(StubSCD4X, sinks="console,sd")
+pixel = air_quality.sd_logger.led.pixels.pixels[0]
+check("LED off between cycles without the score sink", pixel == (0, 0, 0), pixel)
@@ -0,0 +1,47 @@
+"""
+Sink scheduling in sinks.py: each sink writes once per interval, including at startup and after a stall
+"""
+from sinks import SinkPipeline
+
+
+class RecordingSink:
+    def __init__(self):
+        self.times = []
+
+    def write(self, sample):
+        self.times.append(self.now)
+
+
+def run(pipeline, sinks, times):
+    """Call write_due at each time in times; returns the waits it returned."""
+    waits = []
+    for now in times:
+        for sink in sinks:
+            sink.now = now
+        waits.append(pipeline.write_due(None, now))
+    return waits
+
+
+fast, slow = RecordingSink(), RecordingSink()
+pipeline = SinkPipeline([("fast", fast, 5.0), ("slow", slow, 30.0)])
+
+# Startup: the monotonic clock is well past zero, and the first write must not be followed by a second at once
+waits = run(pipeline, (fast, slow), [1000.0, 1000.0])
+print(f"Startup: fast wrote at {fast.times}, slow at {slow.times}, next wait {waits[-1]:.1f} s "
+      f"({'OK' if fast.times == [1000.0] and slow.times == [1000.0] and waits[-1] == 5.0 else 'FAIL: duplicate write'})")
+
+# Steady cadence: following the returned waits gives one write per interval, on schedule
+now = 1000.0
+for _ in range(11):
+    now += waits[-1]
+    waits += run(pipeline, (fast, slow), [now])
+expected_fast = [1000.0 + 5.0 * k for k in range(12)]
+print(f"Cadence: fast {len(fast.times)} writes every 5 s, slow {len(slow.times)} every 30 s "
+      f"({'OK' if fast.times == expected_fast and slow.times == [1000.0, 1030.0] else 'FAIL'})")
+
+# Stall: a 100 s gap writes once and restarts the cadence from then, without catching up
+stalled = now + 100.0
+fast.times.clear()
+waits = run(pipeline, (fast, slow), [stalled, stalled, stalled + 5.0])
+print(f"Stall of 100 s: fast wrote at +{[t - stalled for t in fast.times]} s, waits {waits[:2]} "
+      f"({'OK' if fast.times == [stalled, stalled + 5.0] and waits[1] == 5.0 else 'FAIL: catch-up writes'})")
@@ -0,0 +1,607 @@
+""" Publish parsed readings to an MQTT broker in compact batches, for fleet-wide aggregation.
+
+Records are batched per device topic (<prefix>/<device>/readings) and sent as QoS 1 messages, with at most
+max_inflight batches awaiting the broker's acknowledgement. Batches that can't be sent (broker down,
+or the window and the in-memory queue full) go to an on-disk spool and are sent, oldest first, once
+the broker is back. Delivery is at least once: a batch in flight when the connection or the process
+dies may arrive twice. Needs paho-mqtt (pip install .[mqtt]).
+
+    python serial_logger.py --port /dev/ttyACM0 --file kitchen.txt --mqtt localhost --mqtt-device kitchen
+    python mqtt_publisher.py --subscribe localhost                  # print decoded batches
+    python mqtt_publisher.py --benchmark localhost --devices 100
+
+Payload (little-endian): version u8, field mask u16 (bit i = RECORD_FIELDS[i] present), base
+timestamp u32, record count u16; then per record a u16 offset from the base timestamp and one value
+per field in the mask: temperatures, humidity and score as i16 hundredths, the rest as u16, with
+-32768 / 65535 for a missing (or NaN / infinite) reading; other readings are clamped to the range
+left. A 60-record batch of full readings is ~1.6 kB, against ~6 kB of logged $AQS lines.
+"""
+
+import argparse
+import collections
+import math
+import os
+import socket
+import statistics
+import struct
+import threading
+import time
+import zlib
+
+from log_parser import RECORD_FIELDS, format_timestamp
+
+PAYLOAD_VERSION = 1
+_HEADER = struct.Struct("<BHIH")
+_CENTI = ("temp", "humidity", "dew_point", "score")
+_CODES = tuple("h" if name in _CENTI else "H" for name in RECORD_FIELDS)
+_MISSING = {"h": -32768, "H": 65535}
+_RANGE = {"h": (-32767, 32767), "H": (0, 65534)}  # encodable readings, short of the missing codes
+_records_structs = {}
+
+
+def _record_struct(mask):
+    """ Struct for one record (timestamp offset + values) of the fields in mask, cached per mask. """
+    rs = _records_structs.get(mask)
+    if rs is None:
+        rs = struct.Struct("<H" + "".join(c for i, c in enumerate(_CODES) if mask >> i & 1))
+        _records_structs[mask] = rs
+    return rs
+
+
+def _encode_value(v, scale, low, high, missing):
+    """ One reading as an integer code: missing for None, NaN or inf, otherwise clamped to low..high. """
+    if v is None or not math.isfinite(v):
+        return missing
+    return min(max(round(v * scale), low), high)
+
+
+def encode_batch(records):
+    """ Encode [(timestamp, {field: value})] (timestamps at most 65535 s after the first) as one payload.
+    NaN or infinite readings are sent as missing; out-of-range ones are clamped (a sensor glitch),
+    keeping the missing-value codes free. """
+    base = int(records[0][0])
+    columns = [[int(ts) - base for ts, _ in records]]
+    mask = 0
+    for i, name in enumerate(RECORD_FIELDS):
+        column = [values.get(name) for _, values in records]
+        absent = column.count(None)
+        if absent == len(column):
+            continue
+        present = [v for v in column if v is not None] if absent else column
+        mask |= 1 << i
+        code = _CODES[i]
+        scale = 100 if code == "h" else 1
+        low, high = _RANGE[code]
+        missing = _MISSING[code]
+        total = sum(present)
+        # A column at a time: one comprehension per field rather than a branch per value, unless
+        # the column holds a non-finite (total - total is NaN) or out-of-range reading
+        if total - total == 0 and low <= min(present) * scale and max(present) * scale <= high:
+            columns.append([missing if v is None else round(v * scale) for v in column])
+        else:
+            columns.append([_encode_value(v, scale, low, high, missing) for v in column])
+    rs = _record_struct(mask)
+    header = _HEADER.pack(PAYLOAD_VERSION, mask, base, len(records))
+    return header + struct.pack("<" + rs.format[1:] * len(records), *[v for row in zip(*columns) for v in row])
+
+
+def decode_batch(payload):
+    """ Inverse of encode_batch: [(timestamp, {field: value or None})]. """
+    version, mask, base, count = _HEADER.unpack_from(payload)
+    if version != PAYLOAD_VERSION:
+        raise ValueError(f"unknown payload version {version}")
+    fields = [(name, _CODES[i]) for i, name in enumerate(RECORD_FIELDS) if mask >> i & 1]
+    rs = _record_struct(mask)
+    records = []
+    for row in rs.iter_unpack(payload[_HEADER.size:_HEADER.size + count * rs.size]):
+        values = {}
+        for (name, code), raw in zip(fields, row[1:]):
+            if raw == _MISSING[code]:
+                values[name] = None
+            else:
+                values[name] = raw / 100 if code == "h" else float(raw)
+        records.append((float(base + row[0]), values))
+    return records
+
+
+class DiskSpool:
+    """ FIFO of (topic, payload) messages in append-only segment files. A segment is deleted once every
+    message read from it has been acknowledged, so a crash re-sends rather than loses messages.
+    Each message is stored as crc32 u32, topic length u16, payload length u32, topic, payload;
+    a torn or corrupt message ends its segment. """
+
+    _RECORD = struct.Struct("<IHI")
+
+    def __init__(self, directory, segment_bytes=1 << 20):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(int(n[:-6]) for n in os.listdir(directory)
+                                if n.endswith(".spool") and n[:-6].isdigit())
+        self._counts = {seg: [0, 0] for seg in self._segments}  # segment -> [messages read, acked]
+        self._writer = None
+        self._write_seg = None
+        self._reader = None
+        self._read_seg = None
+        self._last_pos = 0
+        self.appended = 0  # messages spooled since this process started
+
+    def _path(self, seg):
+        return os.path.join(self.directory, f"{seg:08d}.spool")
+
+    @property
+    def pending(self):
+        """ True if there may be unread messages. """
+        return bool(self._segments) and not (self._read_seg == self._segments[-1] and self._reader_at_end())
+
+    def _reader_at_end(self):
+        return self._reader is not None and self._reader.tell() >= os.fstat(self._reader.fileno()).st_size
+
+    def append(self, topic, payload):
+        if self._writer is None or self._writer.tell() >= self.segment_bytes:
+            if self._writer is not None:
+                self._writer.close()
+            seg = self._segments[-1] + 1 if self._segments else 1
+            self._writer = open(self._path(seg), "ab")
+            self._write_seg = seg
+            self._segments.append(seg)
+            self._counts[seg] = [0, 0]
+        topic_bytes = topic.encode("utf-8")
+        body = topic_bytes + payload
+        self._writer.write(self._RECORD.pack(zlib.crc32(body), len(topic_bytes), len(payload)) + body)
+        self._writer.flush()
+        self.appended += 1
+
+    def pop(self):
+        """ Next unread (topic, payload, segment), or None. Pass the segment to ack() once delivered,
+        or to unpop() to read the message again. """
+        while self._segments:
+            if self._reader is None:
+                self._read_seg = self._segments[0]
+                self._reader = open(self._path(self._read_seg), "rb")
+            self._last_pos = self._reader.tell()
+            header = self._reader.read(self._RECORD.size)
+            if len(header) == self._RECORD.size:
+                crc, topic_len, payload_len = self._RECORD.unpack(header)
+                body = self._reader.read(topic_len + payload_len)
+                if len(body) == topic_len + payload_len and zlib.crc32(body) == crc:
+                    self._counts[self._read_seg][0] += 1
+                    return body[:topic_len].decode("utf-8", "replace"), body[topic_len:], self._read_seg
+            if self._read_seg == self._write_seg:
+                # Caught up with the writer
+                self._reader.seek(self._last_pos)
+                return None
+            # End of a finished segment (or a torn message at its end)
+            self._reader.close()
+            self._reader = None
+            self._segments.remove(self._read_seg)
+            self._finish(self._read_seg)
+        return None
+
+    def unpop(self, seg):
+        """ Put back the message pop() just returned. """
+        self._reader.seek(self._last_pos)
+        self._counts[seg][0] -= 1
+
+    def ack(self, seg):
+        counts = self._counts.get(seg)
+        if counts is None:
+            return
+        counts[1] += 1
+        if seg not in self._segments:
+            self._finish(seg)
+        elif seg == self._write_seg and self._read_seg == seg and counts[0] == counts[1] and self._reader_at_end():
+            # Everything written has been delivered: start a fresh segment next time
+            self._writer.close()
+            self._writer = self._write_seg = None
+            self._reader.close()
+            self._reader = self._read_seg = None
+            self._segments.remove(seg)
+            self._finish(seg)
+
+    def _finish(self, seg):
+        """ Delete a segment that has been read to the end once all its messages are acknowledged. """
+        read, acked = self._counts[seg]
+        if acked >= read:
+            del self._counts[seg]
+            try:
+                os.remove(self._path(seg))
+            except OSError:
+                pass
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader is not None:
+            self._reader.close()
+
+
+class MQTTPublisher:
+    """ Batches readings per device topic and publishes them from a background thread.
+    add() never blocks on the network. close() sends what it can within its timeout and spools the rest. """
+
+    def __init__(self, host="localhost", port=1883, topic_prefix="aqs", batch_size=60, batch_interval=5.0,
+                 max_inflight=16, max_queued=256, spool_dir="logs/mqtt_spool", client_id=None, on_ack=None,
+                 keepalive=30):
+        """ batch_size records or batch_interval seconds, whichever comes first, close a batch.
+        on_ack(seconds), if given, is called with each batch's publish-to-PUBACK latency. """
+        try:
+            import paho.mqtt.client as mqtt
+        except ImportError as e:
+            raise ImportError("MQTT publishing needs paho-mqtt: pip install .[mqtt]") from e
+        self.topic_prefix = topic_prefix
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_inflight = max_inflight
+        self.max_queued = max_queued
+        self.on_ack = on_ack
+        self.records = 0
+        self.batches_sent = 0
+        self.batches_acked = 0
+        self.bytes_sent = 0
+
+        self._lock = threading.Lock()  # batches, closed batches (never held while calling paho)
+        self._batches = {}  # topic -> [opened monotonic time, records]
+        self._closed = collections.deque()  # (topic, payload) ready to send
+        self._acks = collections.deque()  # mids acknowledged, filled by paho's thread
+        self._inflight = {}  # mid -> (sent perf_counter, topic, payload, spool segment or None)
+        self._queued = collections.deque()  # (topic, payload) waiting for room in the window
+        self._wake = threading.Event()
+        self._stop = False
+        self._flush_requested = 0
+        self._flush_done = 0
+        self.unacked = 0  # closed batches not yet acknowledged, as of the sender's last pass
+        self.connected = False
+        self.spool = DiskSpool(spool_dir)
+
+        self._mqtt = mqtt
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id or "")
+        self.client.max_inflight_messages_set(max_inflight)
+        self.client.reconnect_delay_set(min_delay=0.2, max_delay=10)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+        self.client.connect_async(host, port, keepalive)
+        self.client.loop_start()
+        self._thread = threading.Thread(target=self._run, name="mqtt-publisher", daemon=True)
+        self._thread.start()
+
+    # paho callbacks run on its network thread, holding its locks: only hand off and wake the sender
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        self.connected = not reason_code.is_failure
+        self._wake.set()
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self.connected = False
+        self._wake.set()
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        self._acks.append(mid)
+        self._wake.set()
+
+    def add(self, device, ts, values):
+        """ Queue one reading (a parse_record result) for device. """
+        topic = f"{self.topic_prefix}/{device}/readings"
+        with self._lock:
+            self.records += 1
+            batch = self._batches.get(topic)
+            if batch is not None and not 0 <= ts - batch[1][0][0] <= 65535:
+                self._close_batch(topic, batch)  # out of the payload's timestamp range
+                batch = None
+            if batch is None:
+                batch = self._batches[topic] = [time.monotonic(), []]
+            batch[1].append((ts, values))
+            if len(batch[1]) >= self.batch_size:
+                self._close_batch(topic, batch)
+                self._wake.set()
+
+    def _close_batch(self, topic, batch):
+        del self._batches[topic]
+        self._closed.append((topic, encode_batch(batch[1])))
+
+    def _run(self):
+        """ Sender thread: closes aged batches, matches acks, and publishes, queues or spools batches. """
+        tick = max(min(self.batch_interval / 4, 0.25), 0.01)
+        while True:
+            self._wake.wait(tick)
+            self._wake.clear()
+            requested = self._flush_requested
+            self._close_aged(time.monotonic())
+            self._process_acks()
+            self._dispatch()
+            self.unacked = len(self._queued) + len(self._inflight) + (1 if self.spool.pending else 0)
+            self._flush_done = requested
+            if self._stop:
+                return
+
+    def _close_aged(self, now):
+        with self._lock:
+            for topic, batch in list(self._batches.items()):
+                if now - batch[0] >= self.batch_interval:
+                    self._close_batch(topic, batch)
+
+    def _process_acks(self):
+        acks = self._acks
+        while acks:
+            entry = self._inflight.pop(acks.popleft(), None)
+            if entry is None:
+                continue
+            self.batches_acked += 1
+            if self.on_ack is not None:
+                self.on_ack(time.perf_counter() - entry[0])
+            if entry[3] is not None:
+                self.spool.ack(entry[3])
+
+    def _dispatch(self):
+        while self._closed:
+            topic, payload = self._closed.popleft()
+            # Keep order: nothing overtakes what is already queued or spooled
+            if self.connected and len(self._queued) < self.max_queued and not self.spool.pending:
+                self._queued.append((topic, payload))
+            else:
+                self.spool.append(topic, payload)
+        if not self.connected:
+            while self._queued:
+                self.spool.append(*self._queued.popleft())
+            return
+        while len(self._inflight) < self.max_inflight:
+            if self._queued:
+                topic, payload = self._queued.popleft()
+                seg = None
+            else:
+                item = self.spool.pop()
+                if item is None:
+                    return
+                topic, payload, seg = item
+            if not self._publish(topic, payload, seg):
+                if seg is None:
+                    self._queued.appendleft((topic, payload))
+                return
+
+    def _publish(self, topic, payload, seg):
+        sent = time.perf_counter()
+        info = self.client.publish(topic, payload, qos=1)
+        # paho keeps a QoS 1 message published while disconnected and sends it on reconnecting
+        if info.rc not in (self._mqtt.MQTT_ERR_SUCCESS, self._mqtt.MQTT_ERR_NO_CONN):
+            if seg is not None:
+                self.spool.unpop(seg)
+            return False
+        self._inflight[info.mid] = (sent, topic, payload, seg)
+        self.batches_sent += 1
+        self.bytes_sent += len(payload)
+        return True
+
+    def flush(self, timeout=5.0):
+        """ Close the open batches and wait up to timeout for every batch to be acknowledged.
+        Returns True if they all were. """
+        with self._lock:
+            for topic, batch in list(self._batches.items()):
+                self._close_batch(topic, batch)
+        self._flush_requested += 1
+        requested = self._flush_requested
+        deadline = time.monotonic() + timeout
+        while True:
+            self._wake.set()
+            if self._flush_done >= requested and not self.unacked:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def close(self, timeout=5.0):
+        """ Flush for up to timeout, then stop, spooling whatever was not acknowledged. """
+        self.flush(timeout)
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+        for topic, payload in self._queued:
+            self.spool.append(topic, payload)
+        for _, topic, payload, seg in self._inflight.values():
+            if seg is None:
+                self.spool.append(topic, payload)
+        self.client.disconnect()
+        self.client.loop_stop()
+        self.spool.close()
+
+
+def subscribe(host, port, topic_prefix):
+    """ Print every decoded reading published under topic_prefix until Ctrl+C. """
+    import paho.mqtt.client as mqtt
+
+    def on_message(client, userdata, message):
+        device = message.topic.split("/")[-2]
+        for ts, values in decode_batch(message.payload):
+            shown = " ".join(f"{k}={v:g}" for k, v in values.items() if v is not None)
+            print(f"{format_timestamp(ts)} {device} {shown}")
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.on_message = on_message
+    client.on_connect = lambda c, u, f, rc, p: c.subscribe(f"{topic_prefix}/+/readings", qos=1)
+    client.connect(host, port)
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        client.disconnect()
+
+
+class _OutageProxy:
+    """ TCP relay between the benchmark's publishers and the broker that can be cut to simulate an outage. """
+
+    def __init__(self, host, port):
+        self.target = (host, port)
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self.up = True
+        self._conns = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            client, _ = self.server.accept()
+            if not self.up:
+                client.close()
+                continue
+            try:
+                upstream = socket.create_connection(self.target)
+            except OSError:
+                client.close()
+                continue
+            with self._lock:
+                self._conns += [client, upstream]
+            for a, b in ((client, upstream), (upstream, client)):
+                threading.Thread(target=self._pipe, args=(a, b), daemon=True).start()
+
+    @staticmethod
+    def _pipe(src, dst):
+        try:
+            while True:
+                data = src.recv(65536)
+                if not data:
+                    break
+                dst.sendall(data)
+        except OSError:
+            pass
+        for s in (src, dst):
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def cut(self):
+        self.up = False
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for s in conns:
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            s.close()
+
+    def restore(self):
+        self.up = True
+
+
+def benchmark(args):
+    """ Simulated devices, one publisher each as with one serial_logger per board, publishing readings
+    through a relay that drops the broker for --outage seconds halfway. A subscriber on the broker
+    checks every reading arrives. """
+    import tempfile
+    import paho.mqtt.client as mqtt
+
+    received = collections.Counter()
+    got = threading.Event()
+    expected = args.devices * args.records
+
+    def on_message(client, userdata, message):
+        device = message.topic.split("/")[-2]
+        for ts, _ in decode_batch(message.payload):
+            received[(device, ts)] += 1
+        if len(received) >= expected:
+            got.set()
+
+    prefix = f"aqsbench{os.getpid()}"
+    subscribed = threading.Event()
+    sub = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    sub.on_message = on_message
+    sub.on_subscribe = lambda *a: subscribed.set()
+    sub.on_connect = lambda c, u, f, rc, p: c.subscribe(f"{prefix}/+/readings", qos=1)
+    sub.connect(args.host, args.port)
+    sub.loop_start()
+    if not subscribed.wait(10):
+        raise SystemExit(f"Could not subscribe on {args.host}:{args.port}")
+
+    proxy = _OutageProxy(args.host, args.port)
+    latencies = []
+    with tempfile.TemporaryDirectory() as spool_root:
+        publishers = [MQTTPublisher("127.0.0.1", proxy.port, prefix, args.batch_size, args.batch_interval,
+                                    args.max_inflight, spool_dir=os.path.join(spool_root, f"dev{d:03d}"),
+                                    on_ack=latencies.append)
+                      for d in range(args.devices)]
+        deadline = time.monotonic() + 10
+        while not all(p.connected for p in publishers) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        base = 1_772_352_000.0
+        values = {"temp": 22.5, "humidity": 45.2, "dew_point": 10.1, "co2": 800.0, "voc_raw": 30000.0,
+                  "voc_index": 100.0, "nox_raw": 15000.0, "nox_index": 1.0, "pm10": 4.0, "pm25": 3.0,
+                  "pm1": 2.0, "score": 12.5}
+        interval = 1.0 / args.rate if args.rate else 0.0
+        began = time.perf_counter()
+        cut_at, restored_at = args.records // 2, None
+        for i in range(args.records):
+            if args.outage and i == cut_at:
+                proxy.cut()
+                outage_end = time.monotonic() + args.outage
+            if args.outage and restored_at is None and i > cut_at and time.monotonic() >= outage_end:
+                proxy.restore()
+                restored_at = i
+            for d, publisher in enumerate(publishers):
+                publisher.add(f"dev{d:03d}", base + i * 5, values)
+            if interval:
+                time.sleep(max(began + (i + 1) * interval - time.perf_counter(), 0.0))
+        if args.outage and restored_at is None:
+            time.sleep(max(outage_end - time.monotonic(), 0.0))
+            proxy.restore()
+        produced = time.perf_counter() - began
+        deadline = time.monotonic() + args.drain_timeout
+        for p in publishers:
+            p.flush(max(deadline - time.monotonic(), 0.0))
+        got.wait(max(deadline - time.monotonic(), 0.0))
+        elapsed = time.perf_counter() - began
+        spooled = sum(p.spool.appended for p in publishers)
+        batches = sum(p.batches_sent for p in publishers)
+        payload = sum(p.bytes_sent for p in publishers)
+        for p in publishers:
+            p.close(timeout=0)
+    sub.loop_stop()
+    sub.disconnect()
+
+    unique = len(received)
+    duplicates = sum(received.values()) - unique
+    print(f"{args.devices} devices x {args.records} readings, batches of {args.batch_size} / {args.batch_interval:g} s, "
+          f"{args.max_inflight} in flight per device"
+          + (f", {args.outage:g} s broker outage halfway" if args.outage else ""))
+    print(f"Produced in {produced:.1f} s; all delivered after {elapsed:.1f} s: "
+          f"{unique / elapsed:.0f} readings/s, {batches / elapsed:.0f} messages/s, "
+          f"{payload / max(batches, 1):.0f} B per message ({payload / max(unique, 1):.1f} B per reading)")
+    if latencies:
+        q = statistics.quantiles(latencies, n=100)
+        print(f"Publish-to-PUBACK latency: p50 {q[49] * 1e3:.1f} ms, p99 {q[98] * 1e3:.1f} ms, "
+              f"max {max(latencies) * 1e3:.1f} ms ({len(latencies)} batches)")
+    print(f"Spooled to disk during the outage: {spooled} batches")
+    print(f"Received {unique} of {expected} readings ({duplicates} duplicates)")
+    if unique < expected:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MQTT publishing of readings: subscriber and benchmark.")
+    parser.add_argument("--subscribe", metavar="HOST", default=None, help="print decoded readings from this broker")
+    parser.add_argument("--benchmark", metavar="HOST", default=None,
+                        help="publish simulated devices' readings through this broker")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--topic-prefix", default="aqs")
+    parser.add_argument("--devices", type=int, default=100, help="benchmark: simulated devices")
+    parser.add_argument("--records", type=int, default=600, help="benchmark: readings per device")
+    parser.add_argument("--rate", type=float, default=200.0,
+                        help="benchmark: readings per second per device (0 = as fast as possible)")
+    parser.add_argument("--batch-size", type=int, default=60, help="benchmark: readings per batch")
+    parser.add_argument("--batch-interval", type=float, default=1.0, help="benchmark: max batch age (s)")
+    parser.add_argument("--max-inflight", type=int, default=16, help="benchmark: unacknowledged batches per device")
+    parser.add_argument("--outage", type=float, default=1.0, help="benchmark: seconds the broker is cut off (0 = none)")
+    parser.add_argument("--drain-timeout", type=float, default=60.0,
+                        help="benchmark: seconds to wait for every reading to arrive")
+    args = parser.parse_args()
+    if args.subscribe:
+        subscribe(args.subscribe, args.port, args.topic_prefix)
+    elif args.benchmark:
+        args.host = args.benchmark
+        benchmark(args)
+    else:
+        parser.error("nothing to do: use --subscribe or --benchmark (publishing is done by serial_logger --mqtt)")
+
+
+if __name__ == "__main__":
+    main()
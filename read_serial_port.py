@@ -1,11 +1,16 @@
 """ Script to read serial data and print to console only. """
 
+import argparse
 import serial
 import time
 
 def main():
-	port = 'COM4'  # Change as needed
-	baudrate = 115200
+	parser = argparse.ArgumentParser(description="Print serial data to the console.")
+	parser.add_argument("--port", default="COM4", help="serial port (e.g. COM4, /dev/ttyACM0)")
+	parser.add_argument("--baudrate", type=int, default=115200)
+	args = parser.parse_args()
+	port = args.port
+	baudrate = args.baudrate
 	try:
 		ser = serial.Serial(port=port, baudrate=baudrate, timeout=1)
 		print(f"Connected to {ser.port}. Press Ctrl+C to stop.")
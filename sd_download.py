@@ -0,0 +1,377 @@
+""" Download SD card logs from boards over their USB data serial port, without removing the card.
+
+The board side is microcontroller_code/sd_transfer.py (the data port is enabled by boot.py). Files are
+fetched in windows of checksummed chunks; a chunk that fails its CRC is fetched again on its own. Files already downloaded with the same size and mtime are skipped, and partial downloads
+or logs that have grown since the last run resume from the local copy once its CRC matches the
+board's. Boards download in parallel, one thread per port.
+
+    python sd_download.py --port /dev/ttyACM1 --port kitchen=/dev/ttyACM3 --dest sd_logs
+    python sd_download.py --benchmark --devices 4 --corrupt 0.02
+"""
+
+import argparse
+import concurrent.futures
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+import serial
+
+DEFAULT_WINDOW = 32  # chunks per GET request
+MAX_RETRIES = 20  # consecutive failed requests before a file is given up
+
+
+class TransferError(Exception):
+    """ The board replied with an error, or the link failed or timed out. """
+
+
+class SDClient:
+    """ Client for the sd_transfer request protocol on an open serial port. """
+
+    def __init__(self, ser, window=DEFAULT_WINDOW):
+        self.ser = ser
+        self.window = window
+        self.retries = 0
+        self.bytes_read = 0  # everything received, including headers and re-sent chunks
+
+    def _send(self, line):
+        self.ser.write(line.encode("utf-8") + b"\n")
+
+    def _readline(self):
+        raw = self.ser.readline()
+        self.bytes_read += len(raw)
+        if not raw.endswith(b"\n"):
+            raise TransferError("timed out waiting for the board" if not raw else f"bad reply {raw[:40]!r}")
+        line = raw.decode("utf-8", errors="replace").strip()
+        if line.startswith("ERR"):
+            raise TransferError(line[4:])
+        return line
+
+    def _read_exact(self, n):
+        data = self.ser.read(n)
+        self.bytes_read += len(data)
+        if len(data) != n:
+            raise TransferError("timed out in a chunk")
+        return data
+
+    def resync(self):
+        """ Drop whatever is left of a garbled reply so the next request starts clean. """
+        timeout = self.ser.timeout
+        self.ser.timeout = 0.1
+        try:
+            while self.ser.read(65536):
+                pass
+        finally:
+            self.ser.timeout = timeout
+
+    def list(self):
+        """ [(name, size, mtime)] of the logs on the card. """
+        self._send("LIST")
+        files = []
+        while True:
+            parts = self._readline().split()
+            if parts[0] == "END":
+                return files
+            if parts[0] != "FILE" or len(parts) != 4:
+                raise TransferError(f"bad LIST reply {' '.join(parts)[:40]!r}")
+            files.append((parts[1], int(parts[2]), int(parts[3])))
+
+    def crc(self, name, length):
+        """ CRC32 of the first length bytes of a file on the card. """
+        self._send(f"CRC {name} {length}")
+        parts = self._readline().split()
+        if parts[0] != "CRC":
+            raise TransferError(f"bad CRC reply {' '.join(parts)[:40]!r}")
+        return int(parts[1], 16)
+
+    def fetch(self, name, offset, out):
+        """ Write the file from offset to the end into out (a seekable file). Chunks that fail their CRC
+        are fetched again one by one after their window. Returns the final offset (file size). """
+        failures = 0
+        while True:
+            self._send(f"GET {name} {offset} {self.window}")
+            status, end, missing = self._read_window(offset, out)
+            if status == "garbled":
+                failures = self._failed(failures)
+                continue
+            failures = 0
+            for chunk_offset in missing:
+                self._refetch(name, chunk_offset, out)
+            offset = end
+            if status == "eof":
+                return offset
+
+    def _refetch(self, name, offset, out):
+        failures = 0
+        while True:
+            failures = self._failed(failures)
+            self._send(f"GET {name} {offset} 1")
+            status, _, missing = self._read_window(offset, out)
+            if status != "garbled" and not missing:
+                return
+
+    def _failed(self, failures):
+        self.retries += 1
+        if failures >= MAX_RETRIES:
+            raise TransferError(f"{MAX_RETRIES} requests in a row failed")
+        return failures + 1
+
+    def _read_window(self, offset, out):
+        """ Read one GET reply, writing each chunk that passes its CRC at its offset in out.
+        Returns (status, end offset, [offsets of chunks that failed their CRC]); status is 'eof',
+        'more', or 'garbled' for an unreadable reply, after which the link is resynchronised. """
+        missing = []
+        while True:
+            parts = self._readline().split()
+            if len(parts) == 4 and parts[0] == "CHUNK" and parts[1] == str(offset) and parts[2].isdigit():
+                length = int(parts[2])
+                data = self._read_exact(length)
+                if parts[3] == f"{zlib.crc32(data):08x}":
+                    out.seek(offset)
+                    out.write(data)
+                else:
+                    missing.append(offset)
+                offset += length
+            elif len(parts) == 2 and parts[0] in ("END", "EOF"):
+                return ("eof" if parts[0] == "EOF" else "more"), offset, missing
+            else:
+                self.resync()
+                return "garbled", offset, missing
+
+
+def _file_crc(path, length):
+    crc = 0
+    with open(path, "rb") as f:
+        while length > 0:
+            data = f.read(min(length, 1 << 20))
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+            length -= len(data)
+    return crc
+
+
+def download_file(client, name, size, mtime, path):
+    """ Fetch one file to path (via path + '.part'). Resumes from a partial download, or from an
+    older copy of a log that has grown, when the board's CRC of that prefix matches.
+    Returns the number of file bytes transferred. """
+    part = path + ".part"
+    start = 0
+    for candidate in (part, path):
+        if not os.path.exists(candidate):
+            continue
+        have = os.path.getsize(candidate)
+        if 0 < have <= size and client.crc(name, have) == _file_crc(candidate, have):
+            if candidate == path:
+                os.replace(path, part)
+            start = have
+            break
+    with open(part, "r+b" if start else "wb") as f:
+        f.truncate(start)
+        f.seek(start)
+        end = client.fetch(name, start, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(part, path)
+    os.utime(path, (mtime, mtime))
+    return end - start
+
+
+def is_current(path, size, mtime):
+    """ True if path already holds the board's file, going by size and mtime. """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return st.st_size == size and int(st.st_mtime) == mtime
+
+
+def sync_device(name, port, dest, baudrate, window=DEFAULT_WINDOW, timeout=5.0):
+    """ Download every new or changed log from one board into dest/name. Returns a stats dict. """
+    directory = os.path.join(dest, name)
+    os.makedirs(directory, exist_ok=True)
+    stats = {"device": name, "files": 0, "skipped": 0, "bytes": 0, "wire_bytes": 0,
+             "seconds": 0.0, "retries": 0, "errors": []}
+    began = time.perf_counter()
+    with serial.Serial(port=port, baudrate=baudrate, timeout=timeout) as ser:
+        ser.reset_input_buffer()
+        client = SDClient(ser, window)
+        for file_name, size, mtime in client.list():
+            path = os.path.join(directory, file_name)
+            if is_current(path, size, mtime):
+                stats["skipped"] += 1
+                continue
+            try:
+                stats["bytes"] += download_file(client, file_name, size, mtime, path)
+                stats["files"] += 1
+            except TransferError as e:
+                stats["errors"].append(f"{file_name}: {e}")
+                client.resync()
+        stats["retries"] = client.retries
+        stats["wire_bytes"] = client.bytes_read
+    stats["seconds"] = time.perf_counter() - began
+    return stats
+
+
+def sync_all(ports, dest, baudrate, window=DEFAULT_WINDOW, timeout=5.0):
+    """ Run sync_device for {name: port} in parallel. Returns the stats dicts, in port order. """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(ports))) as pool:
+        futures = [pool.submit(sync_device, name, port, dest, baudrate, window, timeout)
+                   for name, port in ports.items()]
+        return [f.result() for f in futures]
+
+
+def report(all_stats, baudrate):
+    """ Print per-device results, with throughput against the line rate (8N1: baudrate / 10 bytes/s). """
+    line_rate = baudrate / 10
+    for s in all_stats:
+        rate = s["bytes"] / s["seconds"] if s["seconds"] else 0.0
+        print(f"{s['device']}: {s['files']} downloaded, {s['skipped']} up to date, {s['bytes'] / 1e3:.1f} kB "
+              f"in {s['seconds']:.1f} s = {rate / 1e3:.1f} kB/s, {rate / line_rate:.0%} of the "
+              f"{baudrate} baud line rate ({s['retries']} chunks re-sent)")
+        for error in s["errors"]:
+            print(f"  failed {error}")
+    total = sum(s["bytes"] for s in all_stats)
+    seconds = max((s["seconds"] for s in all_stats), default=0.0)
+    if len(all_stats) > 1 and seconds:
+        print(f"All {len(all_stats)} devices: {total / 1e3:.1f} kB in {seconds:.1f} s = {total / seconds / 1e3:.1f} kB/s")
+
+
+def parse_ports(specs):
+    """ {device name: port} from 'PORT' or 'NAME=PORT' arguments (name defaults to the port's basename). """
+    ports = {}
+    for spec in specs:
+        name, sep, port = spec.partition("=")
+        if not sep:
+            name, port = os.path.basename(spec), spec
+        ports[name] = port
+    return ports
+
+
+def _write_log(path, start, rows):
+    """ Append rows of an SD log in the board's CSV format (header first for a new file). """
+    new = not os.path.exists(path)
+    with open(path, "a", encoding="utf-8", newline="\n") as f:
+        if new:
+            f.write("timestamp,temp (C),humidity (%),co2 (ppm),voc_raw,voc_index,nox_raw,nox_index,"
+                    "pm10 (ug/m3),pm25 (ug/m3),pm100 (ug/m3)\n")
+        for i in range(rows):
+            t = time.gmtime(start + i * 5)
+            f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S', t)},22.{i % 100:02d},45.10,{600 + i % 400},"
+                    f"----,100,----,1,{i % 7},{i % 11},{i % 13}\n")
+
+
+def benchmark(args):
+    """ Serve synthetic SD cards from the board's SDTransfer over stub pty ports, download them in
+    parallel, then change the cards and download again to exercise skip and resume. """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "microcontroller_code"))
+    import hw_stubs
+    hw_stubs.install(latency_scale=0.0)
+    from sd_transfer import SDTransfer
+
+    line_rate = args.baudrate / 10
+    rows = int(args.file_kb * 1000 / 70)
+    stop = threading.Event()
+    with tempfile.TemporaryDirectory() as tmp:
+        cards, ports, threads, data_ports = [], {}, [], []
+        for d in range(args.devices):
+            card = os.path.join(tmp, f"card{d}")
+            os.makedirs(card)
+            for i in range(args.files):
+                _write_log(os.path.join(card, f"log_2026-03-{i + 1:02d}_08-00-00.csv"), 1_772_352_000 + i * 86400, rows)
+            port = hw_stubs.DataPort(line_rate=line_rate, corrupt=args.corrupt, seed=d)
+            transfer = SDTransfer(card, port=port, chunk_size=args.chunk)
+            thread = threading.Thread(target=_serve, args=(transfer, stop), daemon=True)
+            thread.start()
+            cards.append(card)
+            ports[f"dev{d}"] = port.path
+            threads.append(thread)
+            data_ports.append(port)
+        dest = os.path.join(tmp, "downloads")
+        total = sum(os.path.getsize(os.path.join(c, n)) for c in cards for n in os.listdir(c))
+
+        print(f"{args.devices} devices x {args.files} logs, {total / 1e3:.0f} kB, {args.chunk} B chunks, "
+              f"windows of {args.window}, simulated line rate {args.baudrate} baud, "
+              f"{args.corrupt:.0%} of chunks corrupted")
+        print("-- first download")
+        first = sync_all(ports, dest, args.baudrate, args.window)
+        report(first, args.baudrate)
+        wire = sum(s["wire_bytes"] for s in first)
+        payload = sum(s["bytes"] for s in first)
+        print(f"Protocol overhead (headers, replies, re-sent chunks): {wire / payload - 1:.1%}; "
+              f"{sum(p.corrupted for p in data_ports)} chunks corrupted in transit")
+
+        # The active log grows, one download is cut short, everything else is unchanged
+        for d, card in enumerate(cards):
+            names = sorted(os.listdir(card))
+            _write_log(os.path.join(card, names[-1]), 1_772_352_000 + 9 * 86400, rows // 10)
+            local = os.path.join(dest, f"dev{d}", names[0])
+            with open(local, "rb") as f:
+                head = f.read(os.path.getsize(local) // 3)
+            os.remove(local)
+            with open(local + ".part", "wb") as f:
+                f.write(head)
+        print("-- second download (one log grown, one interrupted per device)")
+        second = sync_all(ports, dest, args.baudrate, args.window)
+        report(second, args.baudrate)
+        stop.set()
+
+        ok = all(not s["errors"] for s in first + second)
+        for d, card in enumerate(cards):
+            for name in os.listdir(card):
+                ok &= filecmp.cmp(os.path.join(card, name), os.path.join(dest, f"dev{d}", name), shallow=False)
+            ok &= not any(n.endswith(".part") for n in os.listdir(os.path.join(dest, f"dev{d}")))
+        resent = sum(s["bytes"] for s in second)
+        print(f"Second run transferred {resent / 1e3:.1f} kB of {total / 1e3:.0f} kB; "
+              f"downloads identical to the cards: {'yes' if ok else 'NO'}")
+        for port in data_ports:
+            port.close()
+        shutil.rmtree(dest, ignore_errors=True)
+    if not ok:
+        sys.exit(1)
+
+
+def _serve(transfer, stop):
+    """ Board loop for the benchmark, like AirQualitySensor.serve_transfers. """
+    busy_until = 0.0
+    while not stop.is_set():
+        if transfer.poll():
+            busy_until = time.monotonic() + transfer.BUSY_TIME
+        time.sleep(transfer.BUSY_POLL if time.monotonic() < busy_until else 0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download SD card logs from boards over USB serial.")
+    parser.add_argument("--port", action="append", default=[],
+                        help="board data port, as PORT or NAME=PORT; repeat for several boards")
+    parser.add_argument("--dest", default="sd_logs", help="download directory (one subdirectory per board)")
+    parser.add_argument("--baudrate", type=int, default=None,
+                        help="line rate to report throughput against; USB CDC ports transfer at USB speed "
+                             "(default 115200, benchmark: 2000000, which the simulated ports are paced to)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="chunks per GET request")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for the board to reply")
+    parser.add_argument("--benchmark", action="store_true", help="download from simulated boards over ptys")
+    parser.add_argument("--devices", type=int, default=4, help="benchmark: simulated boards")
+    parser.add_argument("--files", type=int, default=4, help="benchmark: logs per card")
+    parser.add_argument("--file-kb", type=float, default=256.0, help="benchmark: size of each log")
+    parser.add_argument("--chunk", type=int, default=4096, help="benchmark: board chunk size (transfer.chunk)")
+    parser.add_argument("--corrupt", type=float, default=0.01, help="benchmark: fraction of chunks corrupted")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        args.baudrate = args.baudrate or 2_000_000
+        benchmark(args)
+        return
+    args.baudrate = args.baudrate or 115200
+    if not args.port:
+        parser.error("no --port given")
+    report(sync_all(parse_ports(args.port), args.dest, args.baudrate, args.window, args.timeout), args.baudrate)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,196 @@
 """ Main python code that collects data from the serial port and logs it to a text file. """
 
+import argparse
+import os
 import serial
 import time
-import os
+
+from log_rotation import RotatingLogWriter
+from ingest_metrics import FLUSH_SAMPLE, MetricsRegistry, serve_metrics, dump_metrics_periodically
+from ingest_journal import Journal, SYNC_MODES, recover
+from log_parser import parse_record
+from mqtt_publisher import MQTTPublisher
+
+def log_serial(ser, log_file, metrics=None, journal=None, batch_lines=1, batch_interval=0.0,
+               publisher=None, device=None):
+    """ Read lines from the serial port and append them with a host timestamp until Ctrl+C.
+    metrics (ingest_metrics.PortMetrics, optional) collects per-line counters and flush latency.
+    The log file is flushed every batch_lines lines or batch_interval seconds, whichever comes first.
+    journal (ingest_journal.Journal, optional) takes every line as it arrives, so lines waiting in a
+    batch survive a crash; log_file must then be a RotatingLogWriter.
+    publisher (mqtt_publisher.MQTTPublisher, optional) is given every parsed reading, as from device. """
+    if journal is not None:
+        journal.checkpoint(log_file.path, os.fstat(log_file.fileno()).st_size)
+    pending = 0
+    batch_started = 0.0
+    while True:
+        try:
+            # Read a line from the serial port
+            raw_line = ser.readline()
+            try:
+                line = raw_line.decode('utf-8', errors='replace').strip()
+            except Exception as decode_error:
+                print(f"Decoding error: {decode_error}")
+                line = raw_line  # Log raw data for debugging
+
+            if line:
+                # Log the data with a timestamp
+                timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+                record = f"{timestamp} - {line}\n"
+                log_file.write(record)
+                if journal is not None:
+                    if log_file.path != journal.storage_path:
+                        # The write rotated the log; the old segment was flushed to disk when it closed
+                        journal.checkpoint(log_file.path, 0)
+                    journal.append(record.encode('utf-8', errors='replace'))
+                if publisher is not None:
+                    parsed = parse_record(record)
+                    if parsed is not None:
+                        publisher.add(device, *parsed)
+                if not pending:
+                    batch_started = time.monotonic()
+                pending += 1
+                if metrics is not None:
+                    metrics.observe_line(raw_line, line)
+                    if batch_lines > 1:  # otherwise the line is flushed below before anyone can read the gauge
+                        metrics.unflushed_lines.value = pending
+
+                # Print to console for feedback
+                print(f"{timestamp} - {line}")
+
+            if pending and (pending >= batch_lines or time.monotonic() - batch_started >= batch_interval):
+                _flush_batch(log_file, metrics, journal)
+                pending = 0
+        except KeyboardInterrupt:
+            if pending:
+                _flush_batch(log_file, metrics, journal)
+            print("\nLogging stopped by user.")
+            break
+        except Exception as e:
+            if metrics is not None:
+                metrics.serial_errors.value += 1
+            print(f"Error: {e}")
+
+
+def _flush_batch(log_file, metrics, journal):
+    """ Flush the batched lines to the log file, then checkpoint the journal past them. """
+    if metrics is None:
+        log_file.flush()
+    else:
+        metrics.flushes.value += 1
+        if metrics.flushes.value % FLUSH_SAMPLE:
+            log_file.flush()
+        else:
+            started = time.perf_counter()
+            log_file.flush()
+            metrics.flush_latency.observe(time.perf_counter() - started)
+        metrics.unflushed_lines.value = 0
+    if journal is not None:
+        if journal.sync != "none":
+            os.fsync(log_file.fileno())
+        journal.checkpoint(log_file.path, os.fstat(log_file.fileno()).st_size)
+
 
 def main():
     """ Main function that collects data from the serial port and logs it to a text file. """
+    parser = argparse.ArgumentParser(description="Log serial data to a text file.")
+    parser.add_argument("--port", default="COM4", help="serial port (e.g. COM4, /dev/ttyACM0)")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--file", default=None, help="log file name (prompted for if omitted)")
+    parser.add_argument("--rotate-bytes", type=int, default=0, help="start a new segment after this many bytes (0 = off)")
+    parser.add_argument("--rotate-period", type=float, default=0,
+                        help="start a new segment every N seconds of wall-clock time (0 = off)")
+    parser.add_argument("--no-compress", action="store_true", help="keep rotated segments uncompressed")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics (0 = off)")
+    parser.add_argument("--metrics-json", default=None, help="periodically write a JSON metrics snapshot here")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between JSON snapshots")
+    parser.add_argument("--batch-lines", type=int, default=1, help="flush the log file every N lines")
+    parser.add_argument("--batch-interval", type=float, default=0.0,
+                        help="flush the log file at least every N seconds when batching")
+    parser.add_argument("--journal", default=None,
+                        help="crash-safe journal file (e.g. logs/serial.journal); lines waiting in a batch are "
+                             "replayed from it after a crash")
+    parser.add_argument("--journal-sync", choices=SYNC_MODES, default="record",
+                        help="'record': each line reaches the disk (survives power loss); "
+                             "'none': leave it to the OS (survives the process being killed)")
+    parser.add_argument("--mqtt", default=None, metavar="HOST[:PORT]",
+                        help="also publish parsed readings to this MQTT broker (needs paho-mqtt)")
+    parser.add_argument("--mqtt-device", default=None, help="device name in the MQTT topic (default: log file name)")
+    parser.add_argument("--mqtt-topic-prefix", default="aqs", help="topics are <prefix>/<device>/readings")
+    parser.add_argument("--mqtt-batch", type=int, default=60, help="readings per MQTT message")
+    parser.add_argument("--mqtt-interval", type=float, default=5.0, help="send a partial batch after N seconds")
+    parser.add_argument("--mqtt-inflight", type=int, default=16, help="unacknowledged MQTT messages allowed")
+    parser.add_argument("--mqtt-spool", default="logs/mqtt_spool",
+                        help="directory for messages queued while the broker is unreachable")
+    args = parser.parse_args()
+
     # Open the serial port
-    port = 'COM4'
+    port = args.port
     try:
-        ser = serial.Serial(port=port, baudrate=115200, timeout=1)
+        ser = serial.Serial(port=port, baudrate=args.baudrate, timeout=1)
         print(f"Connected to {ser.port}")
     except Exception as e:
         print(f"Error: Could not open serial port {port} : {e}")
         return
 
     # Prompt user for a file name
-    file_name = input("Enter the log file name (leave blank for default 'data_log.txt'): ").strip()
+    file_name = args.file
+    if file_name is None:
+        file_name = input("Enter the log file name (leave blank for default 'data_log.txt'): ").strip()
     if not file_name:
         file_name = "data_log.txt"
 
-    # Ensure the 'logs' directory exists
-    os.makedirs('logs', exist_ok=True)
-
-    # Generate a unique file name if the default already exists
-    base_name = "data_log"
-    extension = ".txt"
-    counter = 0
-    while os.path.exists(os.path.join('logs', file_name)):
-        counter += 1
-        file_name = f"{base_name}({counter}){extension}"
-
-    file_name = os.path.join('logs', file_name)
+    # Open the rotating log writer; it picks the next free '<name>(N).txt' from one directory scan
+    try:
+        with RotatingLogWriter('logs', file_name, max_bytes=args.rotate_bytes, period=args.rotate_period,
+                               compress=not args.no_compress) as log_file:
+            # Debugging: Print the full path of the log file
+            print(f"Log file path: {log_file.path}")
+            print(f"Logging data to {log_file.path}... Press Ctrl+C to stop.")
 
-    # Debugging: Print the full path of the log file
-    print(f"Log file path: {file_name}")
+            metrics = None
+            if args.metrics_port or args.metrics_json:
+                registry = MetricsRegistry()
+                metrics = registry.port(ser.port)
+                registry.gauge("aqs_writer_unflushed_lines", lambda: metrics.unflushed_lines.value, ser.port)
+                registry.gauge("aqs_compress_queue_depth", lambda: log_file.pending_jobs, ser.port)
+                if args.metrics_port:
+                    serve_metrics(registry, args.metrics_port)
+                    print(f"Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+                if args.metrics_json:
+                    dump_metrics_periodically(registry, args.metrics_json, args.metrics_interval)
 
+            journal = None
+            if args.journal:
+                journal = Journal(args.journal, sync=args.journal_sync)
+                if journal.discarded:
+                    print(f"Journal: dropped a torn record at the end of {args.journal}")
+                replayed = recover(journal, log_file)
+                if replayed:
+                    print(f"Journal: replayed {replayed} lines lost in a crash into {journal.storage_path}")
 
+            publisher = device = None
+            if args.mqtt:
+                host, _, mqtt_port = args.mqtt.partition(":")
+                device = args.mqtt_device or os.path.splitext(os.path.basename(file_name))[0]
+                publisher = MQTTPublisher(host, int(mqtt_port or 1883), args.mqtt_topic_prefix, args.mqtt_batch,
+                                          args.mqtt_interval, args.mqtt_inflight,
+                                          spool_dir=os.path.join(args.mqtt_spool, device))
+                print(f"Publishing readings to {args.mqtt} as {args.mqtt_topic_prefix}/{device}/readings")
 
-    # Open the log file
-    try:
-        with open(file_name, 'a', encoding='utf-8', errors='replace') as log_file:
-            print(f"Logging data to {file_name}... Press Ctrl+C to stop.")
-
-            while True:
-                try:
-                    # Read a line from the serial port
-                    raw_line = ser.readline()
-                    try:
-                        line = raw_line.decode('utf-8', errors='replace').strip()
-                    except Exception as decode_error:
-                        print(f"Decoding error: {decode_error}")
-                        line = raw_line  # Log raw data for debugging
-
-                    if line:
-                        # Log the data with a timestamp
-                        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-                        log_file.write(f"{timestamp} - {line}\n")
-                        log_file.flush()
-
-                        # Print to console for feedback
-                        print(f"{timestamp} - {line}")
-                except KeyboardInterrupt:
-                    print("\nLogging stopped by user.")
-                    break
-                except Exception as e:
-                    print(f"Error: {e}")
+            try:
+                log_serial(ser, log_file, metrics, journal, args.batch_lines, args.batch_interval,
+                           publisher, device)
+            finally:
+                if journal is not None:
+                    journal.close()
+                if publisher is not None:
+                    publisher.close()
+                    if publisher.unacked:
+                        print(f"MQTT: unsent readings kept in {publisher.spool.directory} for the next run")
     except IOError as e:
-        print(f"Error: Could not open file {file_name} for writing: {e}")
+        print(f"Error: Could not open log file {file_name} for writing: {e}")
     finally:
         ser.close()
         print("Serial port closed.")